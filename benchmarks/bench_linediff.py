@@ -0,0 +1,94 @@
+"""
+Line-diff benchmark: throughput and alignment quality per algorithm.
+
+Runs every algorithm in ``yamldiff_linediff`` over the sample pairs in
+``test_files/`` and over scaled synthetic documents, and reports:
+
+- time: seconds to compute the opcodes
+- matched: lines paired as equal (higher is a better alignment)
+- blocks: non-equal opcode blocks (fewer means a more readable diff)
+
+Bulk-reordered documents are included because they are the worst case for
+Myers-style minimal diffs.
+
+    python benchmarks/bench_linediff.py --lines 10000 100000
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_linediff as linediff  # noqa: E402
+from synthetic import lines_to_services, service_pair, service_yaml, shuffled_services  # noqa: E402
+
+# SequenceMatcher is quadratic on large inputs; skip it above this many lines
+DIFFLIB_MAX_LINES = 60000
+
+
+def measure(lines1, lines2, algorithm):
+    """Return (seconds, matched lines, non-equal blocks) for one algorithm."""
+    start = time.perf_counter()
+    opcodes = linediff.diff_opcodes(lines1, lines2, algorithm)
+    elapsed = time.perf_counter() - start
+    matched = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+    blocks = sum(1 for opcode in opcodes if opcode[0] != "equal")
+    return elapsed, matched, blocks
+
+
+def sample_pairs():
+    """The interesting pairs from test_files/."""
+    names = [
+        ("config_v1.yaml", "config_v2.yaml"),
+        ("config_v1.yaml", "config_reordered.yaml"),
+        ("users_before.yaml", "users_after.yaml"),
+        ("types_original.yaml", "types_changed.yaml"),
+        ("deployment_dev.yaml", "deployment_prod.yaml"),
+    ]
+    test_dir = os.path.join(ROOT, "test_files")
+    available = set(os.path.basename(path) for path in glob.glob(os.path.join(test_dir, "*.yaml")))
+    for name1, name2 in names:
+        if name1 in available and name2 in available:
+            with open(os.path.join(test_dir, name1), encoding="utf-8") as f1, \
+                    open(os.path.join(test_dir, name2), encoding="utf-8") as f2:
+                yield f"{name1} vs {name2}", f1.read(), f2.read()
+
+
+def synthetic_pairs(sizes, change_rate):
+    """Scaled synthetic service documents with scattered edits."""
+    for lines in sizes:
+        old, new = service_pair(lines_to_services(lines), change_rate=change_rate)
+        yield f"synthetic {lines} lines", old, new
+
+    # Bulk reorder: the worst case for minimal edit scripts
+    for lines in sizes[:2]:
+        old = service_yaml(lines_to_services(lines))
+        yield f"reordered {lines} lines", old, shuffled_services(old)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="approximate synthetic document sizes in lines")
+    parser.add_argument("--change-rate", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    print(f"{'input':<45} {'algorithm':<10} {'time (s)':>9} {'matched':>8} {'blocks':>7}")
+    cases = list(sample_pairs()) + list(synthetic_pairs(args.lines, args.change_rate))
+    for name, content1, content2 in cases:
+        lines1 = content1.splitlines()
+        lines2 = content2.splitlines()
+        for algorithm in linediff.ALGORITHMS:
+            if algorithm == linediff.ALGORITHM_DIFFLIB and len(lines1) + len(lines2) > DIFFLIB_MAX_LINES:
+                print(f"{name:<45} {algorithm:<10} {'skipped':>9}")
+                continue
+            elapsed, matched, blocks = measure(lines1, lines2, algorithm)
+            print(f"{name:<45} {algorithm:<10} {elapsed:>9.4f} {matched:>8} {blocks:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Normalization benchmark: canonical sort keys vs the old ``str()`` sort keys.
+
+The previous ``normalize_data`` sorted every list with ``key=str``, which
+formats whole subtrees again at every level of nesting. This script times it
+against ``engine.normalize_data`` on list-heavy documents shaped like
+``test_files/users_before.yaml`` and on deeply nested ones, and checks that
+both hold the same content where the old version succeeds. Their order can
+differ: ``str()`` sorts ``[10, 9]`` as text, canonical keys sort it numerically.
+
+    python benchmarks/bench_normalize.py --users 1000 10000 --depth 100 5000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+from synthetic import users_yaml  # noqa: E402
+
+
+def legacy_normalize_data(data):
+    """The recursive, ``str()``-keyed normalization this benchmark compares against."""
+    if isinstance(data, dict):
+        return {k: legacy_normalize_data(v) for k, v in sorted(data.items())}
+    elif isinstance(data, list):
+        normalized_items = [legacy_normalize_data(item) for item in data]
+        try:
+            return sorted(normalized_items, key=lambda x: str(x))
+        except TypeError:
+            return normalized_items
+    else:
+        return data
+
+
+def nested_data(depth):
+    """A list-of-dicts chain ``depth`` levels deep, with a small sortable list at each level."""
+    root = node = {}
+    for level in range(depth):
+        child = {}
+        node["items"] = [child, {"level": level, "tags": ["b", "a"]}]
+        node = child
+    return root
+
+
+def measure(function, data):
+    """Return (seconds, result), or (None, error name) if the function fails."""
+    # Start from a clean heap so a full collection of the previous run's
+    # garbage is not billed to this one
+    gc.collect()
+    start = time.perf_counter()
+    try:
+        result = function(data)
+    except RecursionError as e:
+        return None, type(e).__name__
+    return time.perf_counter() - start, result
+
+
+def report(name, data):
+    legacy_time, legacy = measure(legacy_normalize_data, data)
+    new_time, new = measure(engine.normalize_data, data)
+    same = "-"
+    if legacy_time is not None:
+        # Equal canonical keys means equal content, whatever the list order
+        same = "yes" if engine.canonicalize(legacy)[1] == engine.canonicalize(new)[1] else "NO"
+    legacy_text = f"{legacy_time:.3f}" if legacy_time is not None else legacy
+    print(f"{name:<22} {legacy_text:>14} {new_time:>12.3f} {same:>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="number of users in the list-heavy documents")
+    parser.add_argument("--depth", type=int, nargs="+", default=[100, 2000, 20000],
+                        help="nesting depths of the deep documents")
+    args = parser.parse_args(argv)
+
+    print(f"{'input':<22} {'str() keys (s)':>14} {'canonical (s)':>12} {'same content':>12}")
+    for count in args.users:
+        data, _ = engine.load_with_line_index(users_yaml(count))
+        report(f"{count} users", data)
+    for depth in args.depth:
+        report(f"depth {depth}", nested_data(depth))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Render-time benchmark: per-line Textbox inserts vs batched runs.
+
+Compares the old rendering loop (one ``insert`` per line and pane) with
+``bulk_insert`` on the same aligned diff. Needs a display because the timings
+are taken against a real Tk text widget.
+
+    python benchmarks/bench_render.py --lines 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yamldiff_engine as engine  # noqa: E402
+from synthetic import lines_to_services, service_pair  # noqa: E402
+from yamldiff_view import bulk_insert  # noqa: E402
+
+
+def render_per_line(left, right, rows):
+    """The pre-batching renderer: one insert call per line and pane."""
+    for row in rows:
+        left.insert("end", engine.format_line(row.left_num, row.left_text), row.left_tag)
+        right.insert("end", engine.format_line(row.right_num, row.right_text), row.right_tag)
+
+
+def render_batched(left, right, rows):
+    """The current renderer: coalesced runs pushed in bulk."""
+    bulk_insert(left, engine.pane_runs(rows, "left"))
+    bulk_insert(right, engine.pane_runs(rows, "right"))
+
+
+def time_render(root, render, rows):
+    """Render into fresh widgets and return elapsed seconds, including Tk idle work."""
+    left = tk.Text(root)
+    right = tk.Text(root)
+    start = time.perf_counter()
+    render(left, right, rows)
+    root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    left.destroy()
+    right.destroy()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[5000, 20000, 50000],
+                        help="approximate document sizes in lines")
+    parser.add_argument("--change-rate", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    root = tk.Tk()
+    root.withdraw()
+
+    print(f"{'lines':>8} {'rows':>8} {'per-line (s)':>13} {'batched (s)':>12} {'speedup':>8}")
+    for lines in args.lines:
+        old, new = service_pair(lines_to_services(lines), change_rate=args.change_rate)
+        rows = engine.side_by_side_diff(old, new).rows
+        per_line = time_render(root, render_per_line, rows)
+        batched = time_render(root, render_batched, rows)
+        print(f"{lines:>8} {len(rows):>8} {per_line:>13.3f} {batched:>12.3f} {per_line / batched:>7.1f}x")
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
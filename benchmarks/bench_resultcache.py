@@ -0,0 +1,59 @@
+"""
+Result cache benchmark: a fresh comparison vs loading the result from disk.
+
+Writes service documents of increasing size with scattered edits to a
+temporary directory and compares them in every mode, first with an empty
+``yamldiff_resultcache.ResultCache`` (diff plus storing the entry) and then
+again (a cache hit), reporting both times and the size of the entry.
+
+    python benchmarks/bench_resultcache.py --lines 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+from synthetic import lines_to_services, service_pair  # noqa: E402
+from yamldiff_resultcache import ResultCache  # noqa: E402
+
+
+def timed(function, *args, **kwargs):
+    """Return (seconds, result)."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[5000, 20000, 100000],
+                        help="approximate document sizes in lines")
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>8} {'mode':<13} {'miss (s)':>9} {'hit (s)':>8} {'speedup':>8} {'entry MB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        path1 = os.path.join(directory, "before.yaml")
+        path2 = os.path.join(directory, "after.yaml")
+        for lines in args.lines:
+            old, new = service_pair(lines_to_services(lines))
+            with open(path1, "w", encoding="utf-8") as f:
+                f.write(old)
+            with open(path2, "w", encoding="utf-8") as f:
+                f.write(new)
+            for mode in engine.MODES:
+                cache = ResultCache(os.path.join(directory, "cache"))
+                cache.clear()
+                miss_time, _ = timed(engine.diff_files, path1, path2, mode, result_cache=cache)
+                hit_time, _ = timed(engine.diff_files, path1, path2, mode, result_cache=cache)
+                print(f"{lines:>8} {mode:<13} {miss_time:>9.3f} {hit_time:>8.3f} {miss_time / hit_time:>7.1f}x "
+                      f"{cache.size() / 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Semantic diff benchmark: structural tree diff vs DeepDiff(ignore_order=True).
+
+Both engines compare the same parsed documents, a list of service records
+with scattered edits and the right-hand entries shuffled, so every list
+item has to be matched regardless of position. Parsing is not timed. The
+tree diff matches records by ``name``; DeepDiff has to hash and pair every
+item. Runs that take longer than ``--limit`` seconds stop the DeepDiff
+column for larger sizes.
+
+    python benchmarks/bench_semantic.py --lines 1000 10000 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+import yamldiff_treediff as treediff  # noqa: E402
+from synthetic import lines_to_services, service_pair, shuffled_services  # noqa: E402
+
+
+def measure(function, data1, data2):
+    """Return (seconds, number of changed paths)."""
+    start = time.perf_counter()
+    changes = function(data1, data2)
+    return time.perf_counter() - start, sum(len(paths) for paths in changes.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="approximate synthetic document sizes in lines")
+    parser.add_argument("--limit", type=float, default=60.0,
+                        help="skip DeepDiff on larger inputs once a run took longer than this (seconds)")
+    args = parser.parse_args(argv)
+
+    print(f"{'lines':>8} {'tree (s)':>10} {'paths':>7} {'deepdiff (s)':>13} {'paths':>7}")
+    deepdiff_enabled = True
+    for lines in args.lines:
+        old, new = service_pair(lines_to_services(lines))
+        data1, _ = engine.load_with_line_index(old)
+        data2, _ = engine.load_with_line_index(shuffled_services(new))
+
+        tree_time, tree_paths = measure(treediff.diff_trees, data1, data2)
+        deepdiff_text = f"{'skipped':>13} {'-':>7}"
+        if deepdiff_enabled:
+            deepdiff_time, deepdiff_paths = measure(engine.deepdiff_changes, data1, data2)
+            deepdiff_text = f"{deepdiff_time:>13.3f} {deepdiff_paths:>7}"
+            deepdiff_enabled = deepdiff_time <= args.limit
+        print(f"{lines:>8} {tree_time:>10.3f} {tree_paths:>7} {deepdiff_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Streaming benchmark: section-by-section streaming vs whole-file comparison.
+
+Writes a pair of log-style files (a top-level sequence of events with
+scattered edits) of increasing size to a temporary directory and compares
+them with ``yamldiff_stream.stream_diff`` and with ``engine.diff_files``,
+reporting wall time and peak traced memory (tracemalloc, which slows both
+down). The streaming peak should stay flat as the files grow.
+
+    python benchmarks/bench_stream.py --events 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+import yamldiff_stream as stream  # noqa: E402
+from synthetic import events_yaml  # noqa: E402
+
+
+def measure(function, *args):
+    """Return (seconds, peak traced MB, result)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 1e6, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--events", type=int, nargs="+", default=[10000, 50000, 200000],
+                        help="number of events in the synthetic logs")
+    parser.add_argument("--mode", choices=engine.MODES, default=engine.MODE_SIDE_BY_SIDE,
+                        help="comparison mode (default: Side-by-Side)")
+    parser.add_argument("--skip-full", action="store_true",
+                        help="only time the streaming comparison")
+    args = parser.parse_args(argv)
+
+    print(f"{'events':>8} {'MB':>7} {'stream (s)':>11} {'peak MB':>8} {'full (s)':>9} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        path1 = os.path.join(directory, "before.yaml")
+        path2 = os.path.join(directory, "after.yaml")
+        for count in args.events:
+            with open(path1, "w", encoding="utf-8") as f:
+                f.write(events_yaml(count))
+            with open(path2, "w", encoding="utf-8") as f:
+                f.write(events_yaml(count, change_rate=0.01))
+            size = os.path.getsize(path1) / 1e6
+
+            stream_time, stream_peak, _ = measure(stream.stream_diff, path1, path2, args.mode)
+            full_text = f"{'-':>9} {'-':>8}"
+            if not args.skip_full:
+                full_time, full_peak, _ = measure(engine.diff_files, path1, path2, args.mode)
+                full_text = f"{full_time:>9.2f} {full_peak:>8.1f}"
+            print(f"{count:>8} {size:>7.1f} {stream_time:>11.2f} {stream_peak:>8.1f} {full_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Regression suite: parse, diff, normalize, dump and render times and peak memory.
+
+Builds synthetic pairs of several shapes at each ``--lines`` size:
+
+- ``wide-map``: one flat mapping with a key per line, 2% of values changed
+- ``deep-nesting``: branches 20 mappings deep, 2% of leaves changed
+- ``list-of-records``: a long list of service records, 2% of them edited
+- ``many-edits``: the same list with 30% of the records edited
+- ``bulk-reorder``: the same list with its records shuffled and 2% edited
+
+and measures each pair (best of ``--repeat`` runs): YAML parsing, each
+comparison mode on the parsed files, normalizing, dumping the normalized
+YAML, and rendering the side-by-side diff into a headless model of the two
+text widgets (showing it, then jumping through it page by page). The render
+time covers the Python side of drawing plus the number of widget calls; the
+cost inside Tk needs a display (see ``bench_render.py``). Peak memory of a
+complete comparison in each mode, and the memory its result still holds
+(the rows and the lines they show), is traced with tracemalloc in a separate
+run.
+
+Results are written as JSON with ``--output``. With ``--baseline`` the run
+is compared against an earlier results file: every metric that got worse by
+more than ``--threshold`` (and by more than a small noise floor) is listed
+and the script exits with status 1.
+
+    python benchmarks/bench_suite.py --lines 2000 10000 --output baseline.json
+    python benchmarks/bench_suite.py --lines 2000 10000 --baseline baseline.json
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+from synthetic import (lines_to_services, nested_yaml, service_pair, service_yaml,  # noqa: E402
+                       shuffled_services, wide_map_yaml)
+from yamldiff_view import VirtualDiffView  # noqa: E402
+
+# Format version of the results file
+RESULTS_VERSION = 1
+
+# Depth of the deep-nesting branches (each branch is about 3 lines per level)
+NESTING_DEPTH = 20
+
+# Lines the headless panes show, and how many pages the render jumps to
+VISIBLE_LINES = 40
+RENDER_JUMPS = 50
+
+# Below these differences a slower metric is treated as noise, by unit suffix
+NOISE_FLOORS = {"_s": 0.005, "_mb": 1.0, "_calls": 0}
+
+# Metrics that do not vary between runs: any growth is a regression
+EXACT_SUFFIXES = ("_calls",)
+
+
+def scenario_pair(name, lines):
+    """The (old, new) texts of a scenario at roughly ``lines`` lines."""
+    services = lines_to_services(lines)
+    if name == "wide-map":
+        return wide_map_yaml(lines), wide_map_yaml(lines, change_rate=0.02)
+    if name == "deep-nesting":
+        branches = max(1, lines // (3 * NESTING_DEPTH + 2))
+        return nested_yaml(branches, NESTING_DEPTH), nested_yaml(branches, NESTING_DEPTH, change_rate=0.02)
+    if name == "list-of-records":
+        return service_pair(services)
+    if name == "many-edits":
+        return service_pair(services, change_rate=0.3)
+    if name == "bulk-reorder":
+        return service_yaml(services), shuffled_services(service_yaml(services, change_rate=0.02))
+    raise ValueError(f"Unknown scenario: {name!r}")
+
+
+SCENARIOS = ("wide-map", "deep-nesting", "list-of-records", "many-edits", "bulk-reorder")
+
+
+class HeadlessText:
+    """
+    The parts of a Tk text widget that VirtualDiffView uses, without Tk.
+
+    Keeps the pane's text so inserts and deletes cost what building the
+    strings costs, and counts the calls a real widget would receive.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.marks = {}
+        self.calls = 0
+
+    def _offset(self, index):
+        if index == "end":
+            return len(self.text)
+        if index in self.marks:
+            return self.marks[index]
+        line, column = map(int, index.split("."))
+        offset = 0
+        for _ in range(line - 1):
+            offset = self.text.find("\n", offset) + 1
+            if offset == 0:
+                return len(self.text)
+        return offset + column
+
+    def insert(self, index, *args):
+        self.calls += 1
+        offset = self._offset(index)
+        text = "".join(args[0::2])
+        self.text = self.text[:offset] + text + self.text[offset:]
+        for mark, position in self.marks.items():
+            if position >= offset:
+                self.marks[mark] = position + len(text)
+
+    def delete(self, first, last):
+        self.calls += 1
+        start = self._offset(first)
+        end = self._offset(last)
+        self.text = self.text[:start] + self.text[end:]
+        for mark, position in self.marks.items():
+            if position > start:
+                self.marks[mark] = max(start, position - (end - start))
+
+    def mark_set(self, name, index):
+        self.calls += 1
+        self.marks[name] = self._offset(index)
+
+    def tag_add(self, tag, *ranges):
+        self.calls += 1
+
+    def yview(self, *args):
+        self.calls += 1
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, *args, **options):
+        pass
+
+
+class HeadlessScrollbar:
+    def set(self, first, last):
+        pass
+
+
+def render(rows):
+    """Show ``rows`` in a headless view and jump through them; returns the widget calls made."""
+    left, right = HeadlessText(), HeadlessText()
+    view = VirtualDiffView(left, right, HeadlessScrollbar())
+    view.visible_line_count = lambda: VISIBLE_LINES
+    view.set_content(rows)
+    for jump in range(1, RENDER_JUMPS + 1):
+        view.scroll_to(view.line_count * jump // RENDER_JUMPS)
+    return left.calls + right.calls
+
+
+def parsed_pair(old, new):
+    """Fresh YamlSources with their lines split and YAML parsed, so a mode is timed on its own."""
+    sources = engine.YamlSource(old), engine.YamlSource(new)
+    for source in sources:
+        source.lines
+        source.parsed
+    return sources
+
+
+def best_time(function, repeat, setup=None):
+    """
+    Best of ``repeat`` runs of ``function()`` in seconds, and its last result.
+
+    With ``setup``, every run calls ``function(*setup())`` and only the
+    function is timed.
+    """
+    best = None
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        # Start every run cold, as a first comparison would
+        engine.is_modification.cache_clear()
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def traced_memory(function):
+    """Peak traced memory of ``function()`` and the memory its result holds, in MB."""
+    engine.is_modification.cache_clear()
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+        # Parsed documents are freed in cycles: count only what the result keeps
+        gc.collect()
+        held, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / 1e6, held / 1e6
+
+
+def metric_name(mode):
+    return mode.lower().replace("-", "_")
+
+
+def measure_case(old, new, repeat):
+    """All metrics of one scenario pair."""
+    metrics = {"lines": len(new.splitlines())}
+    metrics["parse_s"], _ = best_time(lambda: (engine.load_with_line_index(old),
+                                               engine.load_with_line_index(new)), repeat)
+    for mode in engine.MODES:
+        metrics[f"{metric_name(mode)}_s"], _ = best_time(lambda source1, source2: engine.diff_contents(
+            source1, source2, mode), repeat, lambda: parsed_pair(old, new))
+    data = engine.load_with_line_index(new)[0]
+    metrics["normalize_s"], normalized = best_time(lambda: engine.normalize_data(data), repeat)
+    metrics["dump_s"], _ = best_time(lambda: engine.dump_sorted(normalized), repeat)
+
+    rows = engine.diff_contents(old, new).rows
+    metrics["render_s"], metrics["render_calls"] = best_time(lambda: render(rows), repeat)
+    for mode in engine.MODES:
+        metrics[f"{metric_name(mode)}_peak_mb"], metrics[f"{metric_name(mode)}_result_mb"] = traced_memory(
+            lambda: engine.diff_contents(old, new, mode))
+    return metrics
+
+
+def run_suite(scenarios, sizes, repeat):
+    """Measure every scenario at every size; returns the results document."""
+    results = {}
+    for lines in sizes:
+        for name in scenarios:
+            old, new = scenario_pair(name, lines)
+            case = f"{name}/{lines}"
+            results[case] = measure_case(old, new, repeat)
+            print(format_case(case, results[case]), flush=True)
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "yaml_backend": engine.yaml_backend,
+        "results": results,
+    }
+
+
+def format_case(case, metrics):
+    """One line of the progress table."""
+    times = " ".join(f"{key[:-2]}={value * 1000:.1f}ms" for key, value in metrics.items() if key.endswith("_s"))
+    peak = max(value for key, value in metrics.items() if key.endswith("_mb"))
+    return f"{case:<24} {times} calls={metrics['render_calls']} peak={peak:.1f}MB"
+
+
+def noise_floor(metric):
+    for suffix, floor in NOISE_FLOORS.items():
+        if metric.endswith(suffix):
+            return floor
+    return None
+
+
+def compare_results(current, baseline, threshold):
+    """
+    List ``(case, metric, baseline, current)`` for every metric that regressed.
+
+    A metric regressed when it grew by more than ``threshold`` (a fraction)
+    and by more than its noise floor; widget call counts regress when they
+    grow at all. Cases or metrics missing from either side are skipped.
+    """
+    regressions = []
+    for case, metrics in current["results"].items():
+        base_metrics = baseline["results"].get(case)
+        if base_metrics is None:
+            continue
+        for metric, value in metrics.items():
+            floor = noise_floor(metric)
+            base = base_metrics.get(metric)
+            if floor is None or base is None:
+                continue
+            allowed = 0 if metric.endswith(EXACT_SUFFIXES) else threshold
+            if value > base * (1 + allowed) and value - base > floor:
+                regressions.append((case, metric, base, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[2000, 10000],
+                        help="approximate document sizes in lines")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", dest="scenarios",
+                        help="scenario to run, may be repeated (default: all)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per timing, the best one counts (default: 3)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results file to compare against; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown or memory growth against the baseline (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != RESULTS_VERSION:
+            parser.error(f"{args.baseline} is not a version {RESULTS_VERSION} results file")
+
+    current = run_suite(args.scenarios or SCENARIOS, args.lines, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+    if baseline is None:
+        return 0
+    if baseline.get("yaml_backend") != current["yaml_backend"]:
+        print(f"Warning: baseline used the {baseline.get('yaml_backend')} YAML backend, "
+              f"this run {current['yaml_backend']}")
+    regressions = compare_results(current, baseline, args.threshold)
+    for case, metric, base, value in regressions:
+        change = f" ({value / base - 1:+.0%})" if base else ""
+        print(f"REGRESSION {case:<24} {metric:<24} {base:.4g} -> {value:.4g}{change}")
+    print(f"{len(regressions)} regression(s) against {args.baseline} (threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Watch-mode benchmark: incremental re-diff after a save vs a fresh comparison.
+
+Builds a mapping of ``--services`` services keyed by name with scattered
+edits, compares it once with ``yamldiff_incremental.IncrementalDiff`` and
+then times the re-diff after changing one line and after inserting one line
+in the middle of the right file, next to a fresh ``engine.diff_contents`` of
+the edited pair. The re-diff should stay in milliseconds as the file grows.
+
+    python benchmarks/bench_watch.py --services 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+from yamldiff_incremental import IncrementalDiff  # noqa: E402
+from synthetic import keyed_services, service_pair  # noqa: E402
+
+
+def timed(function, *args):
+    """Return (milliseconds, result)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def edits(content):
+    """A one-line change and a one-line insertion in the middle of ``content``."""
+    lines = content.splitlines()
+    middle = len(lines) // 2
+    while not lines[middle].startswith("  replicas:"):
+        middle += 1
+    changed = lines[:middle] + ["  replicas: 42"] + lines[middle + 1:]
+    inserted = lines[:middle] + ["  extra: 1"] + lines[middle:]
+    return "\n".join(changed) + "\n", "\n".join(inserted) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--services", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="number of services in the synthetic documents")
+    parser.add_argument("--mode", choices=engine.MODES, action="append",
+                        help="comparison mode, may be repeated (default: all)")
+    args = parser.parse_args(argv)
+
+    print(f"{'services':>8} {'lines':>7} {'mode':<13} {'first (ms)':>10} {'edit (ms)':>10} "
+          f"{'insert (ms)':>11} {'fresh (ms)':>10}")
+    for count in args.services:
+        old, new = (keyed_services(content) for content in service_pair(count))
+        changed, inserted = edits(new)
+        for mode in args.mode or engine.MODES:
+            incremental = IncrementalDiff(mode)
+            first_time, _ = timed(incremental.update, old, new)
+            edit_time, _ = timed(incremental.update, old, changed)
+            insert_time, _ = timed(incremental.update, old, inserted)
+            fresh_time, _ = timed(engine.diff_contents, old, inserted, mode)
+            print(f"{count:>8} {len(new.splitlines()):>7} {mode:<13} {first_time:>10.1f} {edit_time:>10.1f} "
+                  f"{insert_time:>11.1f} {fresh_time:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
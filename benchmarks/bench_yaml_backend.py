@@ -0,0 +1,61 @@
+"""
+YAML backend benchmark: libyaml (C) vs pure-Python loading and dumping.
+
+Times the two stages that dominate large comparisons, parsing with the
+line index (semantic mode) and the normalized dump, for each available
+backend, and checks that both backends produce identical data and a
+byte-identical normalized dump.
+
+    python benchmarks/bench_yaml_backend.py --lines 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import yamldiff_engine as engine  # noqa: E402
+from synthetic import lines_to_services, service_yaml  # noqa: E402
+
+
+def measure(content, backend):
+    """Return (load seconds, dump seconds, data, dump) for one backend."""
+    start = time.perf_counter()
+    data, _ = engine.load_with_line_index(content, backend)
+    loaded = time.perf_counter()
+    dump = engine.dump_normalized(data, backend)
+    dumped = time.perf_counter()
+    return loaded - start, dumped - loaded, data, dump
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="approximate synthetic document sizes in lines")
+    args = parser.parse_args(argv)
+
+    if not engine.LIBYAML_AVAILABLE:
+        print("PyYAML was built without libyaml; only the Python backend is available")
+    backends = [backend for backend in engine.YAML_BACKENDS
+                if backend != engine.YAML_BACKEND_LIBYAML or engine.LIBYAML_AVAILABLE]
+
+    print(f"{'lines':>8} {'backend':<8} {'load (s)':>9} {'dump (s)':>9}")
+    for lines in args.lines:
+        content = service_yaml(lines_to_services(lines))
+        results = {}
+        for backend in backends:
+            load_time, dump_time, data, dump = measure(content, backend)
+            results[backend] = (data, dump)
+            print(f"{lines:>8} {backend:<8} {load_time:>9.3f} {dump_time:>9.3f}")
+
+        reference_data, reference_dump = results[backends[-1]]
+        for backend, (data, dump) in results.items():
+            if data != reference_data or dump != reference_dump:
+                sys.exit(f"{backend} output differs from {backends[-1]} at {lines} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Synthetic YAML generators shared by the benchmark scripts.
+
+Each generator is deterministic for a given seed so before/after timings are
+taken on exactly the same input.
+"""
+
+import random
+
+
+def service_yaml(count, seed=0, change_rate=0.0):
+    """
+    Build a Helm-values-like document with ``count`` service entries.
+
+    With a non-zero ``change_rate`` a fraction of the services get a modified
+    image tag, an extra env var or a dropped field, which is the typical shape
+    of a release-to-release diff. Each service is about 12 lines long.
+    """
+    rng = random.Random(seed)
+    lines = ["# Generated benchmark values", "services:"]
+    for i in range(count):
+        changed = change_rate and rng.random() < change_rate
+        tag = f"1.{i % 7}.{(i + 1) if changed else i}"
+        lines.extend([
+            f"  - name: service-{i:06d}",
+            f"    image: registry.example.com/team/service-{i:06d}:{tag}",
+            f"    replicas: {i % 5 + 1}",
+            "    resources:",
+            "      limits:",
+            f"        cpu: {100 + i % 900}m",
+            f"        memory: {128 + i % 4 * 128}Mi",
+            "    env:",
+            f"      LOG_LEVEL: {'debug' if i % 3 == 0 else 'info'}",
+            f"      REGION: us-east-{i % 2 + 1}",
+        ])
+        if changed:
+            lines.append(f"      FEATURE_FLAG_{i}: 'true'")
+        if not (changed and i % 2):
+            lines.append(f"    port: {8000 + i % 1000}")
+    return "\n".join(lines) + "\n"
+
+
+def shuffled_services(content, seed=0):
+    """Return the same service document with its entries in a shuffled order."""
+    lines = content.splitlines()
+    header = lines[:2]
+    entries = []
+    for line in lines[2:]:
+        if line.startswith("  - name:"):
+            entries.append([])
+        entries[-1].append(line)
+    random.Random(seed).shuffle(entries)
+    return "\n".join(header + [line for entry in entries for line in entry]) + "\n"
+
+
+def keyed_services(content):
+    """
+    Return a service document as a mapping of services keyed by their name.
+
+    Watch mode reuses the diff of every top-level key that did not change, so
+    its benchmark needs many top-level keys rather than one long list.
+    """
+    lines = []
+    for line in content.splitlines()[2:]:
+        if line.startswith("  - name: "):
+            lines.append(line[len("  - name: "):] + ":")
+        else:
+            lines.append(line[2:])
+    return "\n".join(lines) + "\n"
+
+
+def service_pair(count, seed=0, change_rate=0.02):
+    """Return an (old, new) pair of service documents with scattered edits."""
+    return service_yaml(count, seed), service_yaml(count, seed, change_rate)
+
+
+def lines_to_services(lines):
+    """Number of services needed for a document of roughly ``lines`` lines."""
+    return max(1, lines // 12)
+
+
+def users_yaml(count, seed=0):
+    """
+    Build a list-heavy user database like ``test_files/users_before.yaml``.
+
+    Users carry permission lists and groups carry member-id lists, so
+    normalization has many lists of dicts and lists of scalars to sort.
+    Each user is about 10 lines long.
+    """
+    rng = random.Random(seed)
+    permissions = ["read", "write", "delete", "admin", "audit", "deploy"]
+    roles = ["admin", "user", "auditor", "operator"]
+    group_names = [f"group-{g:03d}" for g in range(max(1, count // 50))]
+    members = {name: [] for name in group_names}
+
+    ids = list(range(1, count + 1))
+    rng.shuffle(ids)
+    lines = ["# Generated user database", "users:"]
+    for user_id in ids:
+        lines.extend([
+            f"  - id: {user_id}",
+            f'    username: "user{user_id:06d}"',
+            f'    email: "user{user_id:06d}@example.com"',
+            f'    role: "{rng.choice(roles)}"',
+            f"    active: {'true' if rng.random() < 0.8 else 'false'}",
+            "    permissions:",
+        ])
+        lines.extend(f"      - {permission}" for permission in rng.sample(permissions, rng.randint(1, 4)))
+        members[rng.choice(group_names)].append(user_id)
+
+    lines.append("groups:")
+    for name in group_names:
+        lines.extend([
+            f"  {name}:",
+            f'    description: "Members of {name}"',
+            f"    members: [{', '.join(str(user_id) for user_id in members[name])}]",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def events_yaml(count, seed=0, change_rate=0.0):
+    """
+    Build a log-style document: a top-level sequence of ``count`` events.
+
+    With a non-zero ``change_rate`` a fraction of the events get a different
+    status and a tenth of those are dropped. Each event is 5 lines long.
+    """
+    rng = random.Random(seed)
+    lines = ["# Generated event log"]
+    for i in range(count):
+        # Draw for every event so both sides see the same random sequence
+        changed = rng.random() < change_rate
+        tags = ", ".join(rng.sample(["web", "api", "db", "cache"], 2))
+        if changed and i % 10 == 0:
+            continue
+        lines.extend([
+            f"- id: {i}",
+            f"  time: 2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            f"  user: user{i % 997:03d}",
+            f"  status: {'error' if changed else 'ok'}",
+            f"  tags: [{tags}]",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def wide_map_yaml(count, seed=0, change_rate=0.0):
+    """
+    Build one flat mapping with ``count`` scalar keys, like a big settings file.
+
+    With a non-zero ``change_rate`` a fraction of the values change and a
+    tenth of those keys are dropped. Each key is one line long.
+    """
+    rng = random.Random(seed)
+    lines = ["# Generated settings"]
+    for i in range(count):
+        # Draw for every key so both sides see the same random sequence
+        changed = rng.random() < change_rate
+        value = rng.choice(["true", "false", str(i), f"'value-{i}'", f"{i / 7:.3f}"])
+        if changed and i % 10 == 0:
+            continue
+        lines.append(f"setting_{i:07d}: {'changed-' + str(i) if changed else value}")
+    return "\n".join(lines) + "\n"
+
+
+def nested_yaml(count, depth=20, seed=0, change_rate=0.0):
+    """
+    Build ``count`` branches that are each ``depth`` mappings deep.
+
+    Every level holds a scalar and a short list next to the next level, so
+    both the parser and the normalizer recurse through the whole depth. With
+    a non-zero ``change_rate`` a fraction of the leaf values change. Each
+    branch is about ``3 * depth`` lines long.
+    """
+    rng = random.Random(seed)
+    lines = ["# Generated nested tree"]
+    for i in range(count):
+        changed = rng.random() < change_rate
+        lines.append(f"branch_{i:06d}:")
+        for level in range(depth):
+            indent = "  " * (level + 1)
+            lines.append(f"{indent}level: {level}")
+            lines.append(f"{indent}tags: [{', '.join(rng.sample(['x', 'y', 'z', 'w'], 2))}]")
+            lines.append(f"{indent}child:")
+        lines.append(f"{'  ' * (depth + 1)}leaf: {'changed' if changed else 'value'}-{i}")
+    return "\n".join(lines) + "\n"
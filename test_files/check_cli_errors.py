@@ -0,0 +1,63 @@
+"""
+Check that the command line tool reports bad inputs with exit status 2.
+
+Exit status 1 means "the files differ", so a crash must never end with it.
+Runs yamldiff_cli.py on a file with invalid UTF-8 and on a file paired with
+a directory, with and without ``--stream``, and expects status 2, an
+``Error:`` message on stderr and no traceback. In directory mode the bad
+file is listed as an error in the summary instead. Exits with status 1 on
+any failure.
+
+    python test_files/check_cli_errors.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(os.path.dirname(HERE), "yamldiff_cli.py")
+SAMPLE = os.path.join(HERE, "config_v1.yaml")
+
+
+def run(*args):
+    """Run the CLI and return (exit status, stderr)."""
+    completed = subprocess.run([sys.executable, CLI, *args], capture_output=True, text=True)
+    return completed.returncode, completed.stderr
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        bad_encoding = os.path.join(tmp, "latin1.yaml")
+        with open(bad_encoding, "wb") as f:
+            f.write("name: café\n".encode("latin-1"))
+        # A directory holding the bad file, for directory mode
+        left = os.path.join(tmp, "left")
+        right = os.path.join(tmp, "right")
+        for folder, content in ((left, b"name: cafe\n"), (right, "name: café\n".encode("latin-1"))):
+            os.mkdir(folder)
+            with open(os.path.join(folder, "app.yaml"), "wb") as f:
+                f.write(content)
+
+        cases = [
+            ("bad encoding", [bad_encoding, SAMPLE]),
+            ("bad encoding, --stream", ["--stream", bad_encoding, SAMPLE]),
+            ("file vs directory", [SAMPLE, HERE]),
+            ("file vs directory, --stream", ["--stream", SAMPLE, HERE]),
+            ("bad encoding in a directory", [left, right]),
+        ]
+        failures = 0
+        for name, args in cases:
+            status, stderr = run(*args)
+            directory_mode = os.path.isdir(args[0])
+            ok = status == 2 and (directory_mode or "Error" in stderr) and "Traceback" not in stderr
+            print(f"{'ok' if ok else 'FAIL':<4} {name} (exit {status})")
+            if not ok:
+                failures += 1
+                print(stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
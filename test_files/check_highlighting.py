@@ -0,0 +1,75 @@
+"""
+Check that semantic mode highlights exactly the changed lines of the sample pairs.
+
+Runs every pair below with both YAML backends and both semantic engines and
+compares the lines tagged "changed" on each side with the expected ones
+(1-based line numbers). Exits with status 1 on any difference.
+
+    python test_files/check_highlighting.py
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import yamldiff_engine as engine  # noqa: E402
+
+# (left file, right file): (changed left lines, changed right lines)
+EXPECTED = {
+    ("deployment_dev.yaml", "deployment_prod.yaml"): (
+        [7, 10, 13, 23, 28, 33, 35, 37, 41, 42, 44, 45],
+        [7, 10, 11, 12, 15, 25, 30, 35, 37, 39, 40, 41, 45, 46, 48, 49,
+         51, 52, 53, 54, 55, 56, 58, 59, 60, 61, 62, 63],
+    ),
+    # Values reached through merge keys are highlighted where they are defined
+    ("anchors_v1.yaml", "anchors_v2.yaml"): ([5, 25, 27], [5, 25, 27, 29]),
+}
+
+# DeepDiff with ignore_order reports a changed list item as removed and
+# re-added, so the whole item is highlighted, but never its next sibling
+DEEPDIFF_EXPECTED = {
+    ("deployment_dev.yaml", "deployment_prod.yaml"): (
+        [7, 10, 13, 23, 28, 32, 33, 34, 35, 36, 37, 41, 42, 44, 45],
+        [7, 10, 11, 12, 15, 25, 30, 34, 35, 36, 37, 38, 39, 40, 41, 45, 46,
+         48, 49, 51, 52, 53, 54, 55, 56, 58, 59, 60, 61, 62, 63],
+    ),
+}
+
+
+def changed_lines(result):
+    left = [row.left_num for row in result.rows if row.left_tag == engine.TAG_CHANGED]
+    right = [row.right_num for row in result.rows if row.right_tag == engine.TAG_CHANGED]
+    return left, right
+
+
+def main():
+    failures = 0
+    backends = [backend for backend in engine.YAML_BACKENDS
+                if backend != engine.YAML_BACKEND_LIBYAML or engine.LIBYAML_AVAILABLE]
+    for pair, tree_expected in EXPECTED.items():
+        name1, name2 = pair
+        for backend in backends:
+            engine.select_yaml_backend(backend)
+            for semantic_engine in engine.SEMANTIC_ENGINES:
+                try:
+                    result = engine.diff_files(os.path.join(HERE, name1), os.path.join(HERE, name2),
+                                               engine.MODE_SEMANTIC, semantic_engine=semantic_engine)
+                except ImportError:
+                    # DeepDiff is optional
+                    continue
+                expected = tree_expected
+                if semantic_engine == engine.SEMANTIC_ENGINE_DEEPDIFF:
+                    expected = DEEPDIFF_EXPECTED.get(pair, tree_expected)
+                actual = changed_lines(result)
+                status = "ok" if actual == expected else "FAIL"
+                print(f"{status:<4} {name1} vs {name2} ({backend}, {semantic_engine})")
+                if actual != expected:
+                    failures += 1
+                    print(f"     expected {expected}\n     got      {actual}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,29 @@
 import customtkinter as ctk
 import yaml
-import difflib
-from deepdiff import DeepDiff
-from tkinter import filedialog
-from pprint import pformat
+from tkinter import filedialog, ttk
 import os
+import tempfile
+import threading
+import time
+
+import yamldiff_directory as directory
+import yamldiff_engine as engine
+import yamldiff_linediff as linediff
+import yamldiff_stream as stream
+from yamldiff_view import CHANGED_SPAN_TAG, VirtualDiffView, banner_lines
+from yamldiff_cache import ContentCache
+from yamldiff_documents import CombinedRows, combine_rows
+from yamldiff_incremental import IncrementalDiff
+from yamldiff_profile import StageProfile
+from yamldiff_resultcache import ResultCache
+from yamldiff_watch import FileWatcher
+from yamldiff_worker import DiffWorker
+
+# How often the UI thread picks up results from the background worker
+WORKER_POLL_MS = 50
+
+# Where "Profile comparisons" writes its cProfile and memory reports
+PROFILE_DIR = os.path.join(tempfile.gettempdir(), "yamldiff-profiles")
 
 class YamlDiffApp(ctk.CTk):
     """
@@ -22,6 +41,13 @@ class YamlDiffApp(ctk.CTk):
         self.file1_path = ctk.StringVar()
         self.file2_path = ctk.StringVar()
         self.diff_mode = ctk.StringVar(value="Side-by-Side")
+        self.diff_algorithm = ctk.StringVar(value=engine.DEFAULT_ALGORITHM)
+        self.semantic_engine = ctk.StringVar(value=engine.DEFAULT_SEMANTIC_ENGINE)
+        self.intraline = ctk.BooleanVar(value=True)
+        self.streaming = ctk.BooleanVar(value=False)
+        self.watching = ctk.BooleanVar(value=False)
+        self.profiling = ctk.BooleanVar(value=False)
+        self.caching_results = ctk.BooleanVar(value=True)
 
         # --- Configure grid layout ---
         self.grid_columnconfigure(0, weight=1)
@@ -59,11 +85,77 @@ class YamlDiffApp(ctk.CTk):
         )
         self.mode_switch.grid(row=0, column=1, padx=5, pady=10, sticky="w")
 
+        self.algorithm_label = ctk.CTkLabel(self.control_frame, text="Line Diff:")
+        self.algorithm_label.grid(row=0, column=2, padx=(10, 5), pady=10)
+
+        self.algorithm_menu = ctk.CTkOptionMenu(
+            self.control_frame,
+            values=list(linediff.ALGORITHMS),
+            variable=self.diff_algorithm,
+            width=120
+        )
+        self.algorithm_menu.grid(row=0, column=3, padx=5, pady=10)
+
         self.compare_btn = ctk.CTkButton(self.control_frame, text="Compare", command=self.perform_diff, font=("", 14, "bold"))
-        self.compare_btn.grid(row=0, column=2, padx=10, pady=10, sticky="e")
+        self.compare_btn.grid(row=0, column=4, padx=10, pady=10, sticky="e")
         
         self.normalize_btn = ctk.CTkButton(self.control_frame, text="Normalize & Compare", command=self.normalize_and_compare, font=("", 12))
-        self.normalize_btn.grid(row=0, column=3, padx=10, pady=10, sticky="e")
+        self.normalize_btn.grid(row=0, column=5, padx=10, pady=10, sticky="e")
+
+        self.cancel_btn = ctk.CTkButton(self.control_frame, text="Cancel", command=self.cancel_diff, font=("", 12), state="disabled")
+        self.cancel_btn.grid(row=0, column=6, padx=10, pady=10, sticky="e")
+
+        self.intraline_check = ctk.CTkCheckBox(
+            self.control_frame,
+            text="Highlight changed characters",
+            variable=self.intraline,
+            command=lambda: self.diff_view.set_intraline(self.intraline.get())
+        )
+        self.intraline_check.grid(row=1, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
+        self.semantic_engine_label = ctk.CTkLabel(self.control_frame, text="Semantic Diff:")
+        self.semantic_engine_label.grid(row=1, column=2, padx=(10, 5), pady=(0, 10))
+
+        self.semantic_engine_menu = ctk.CTkOptionMenu(
+            self.control_frame,
+            values=list(engine.SEMANTIC_ENGINES),
+            variable=self.semantic_engine,
+            width=120
+        )
+        self.semantic_engine_menu.grid(row=1, column=3, padx=5, pady=(0, 10))
+
+        self.stream_check = ctk.CTkCheckBox(
+            self.control_frame,
+            text="Stream huge files (changed sections only)",
+            variable=self.streaming
+        )
+        self.stream_check.grid(row=1, column=6, padx=10, pady=(0, 10), sticky="e")
+
+        self.watch_check = ctk.CTkCheckBox(
+            self.control_frame,
+            text="Watch files (re-compare on save)",
+            variable=self.watching,
+            command=self._on_watch_toggled
+        )
+        self.watch_check.grid(row=2, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="w")
+
+        self.profile_check = ctk.CTkCheckBox(
+            self.control_frame,
+            text="Profile comparisons (cProfile and memory report)",
+            variable=self.profiling
+        )
+        self.profile_check.grid(row=2, column=2, columnspan=3, padx=10, pady=(0, 10), sticky="w")
+
+        self.result_cache_check = ctk.CTkCheckBox(
+            self.control_frame,
+            text="Reuse earlier results (disk cache)",
+            variable=self.caching_results
+        )
+        self.result_cache_check.grid(row=2, column=5, columnspan=2, padx=10, pady=(0, 10), sticky="e")
+
+        self.folders_btn = ctk.CTkButton(self.control_frame, text="Compare Folders...", command=self.open_folder_window, font=("", 12))
+        self.folders_btn.grid(row=1, column=4, columnspan=2, padx=10, pady=(0, 10), sticky="e")
+        self.folder_window = None
 
         # --- 3. Diff Display Frame (Side-by-Side) ---
         self.diff_frame = ctk.CTkFrame(self)
@@ -81,7 +173,7 @@ class YamlDiffApp(ctk.CTk):
         self.right_label.grid(row=0, column=2, padx=5, pady=(0, 5), sticky="ew")
 
         # Left textbox
-        self.left_box = ctk.CTkTextbox(self.diff_frame, wrap="none", font=("Courier New", 11))
+        self.left_box = ctk.CTkTextbox(self.diff_frame, wrap="none", font=("Courier New", 11), activate_scrollbars=False)
         self.left_box.grid(row=1, column=0, padx=(0, 2), pady=0, sticky="nsew")
 
         # Separator
@@ -89,9 +181,16 @@ class YamlDiffApp(ctk.CTk):
         self.separator.grid(row=1, column=1, padx=2, pady=0, sticky="ns")
 
         # Right textbox
-        self.right_box = ctk.CTkTextbox(self.diff_frame, wrap="none", font=("Courier New", 11))
+        self.right_box = ctk.CTkTextbox(self.diff_frame, wrap="none", font=("Courier New", 11), activate_scrollbars=False)
         self.right_box.grid(row=1, column=2, padx=(2, 0), pady=0, sticky="nsew")
 
+        # Shared scrollbar: the panes only hold the rows around the viewport,
+        # so the scrollbar tracks the position in the whole diff instead
+        self.scrollbar = ctk.CTkScrollbar(self.diff_frame, orientation="vertical")
+        self.scrollbar.grid(row=1, column=3, padx=(2, 0), pady=0, sticky="ns")
+        self.diff_view = VirtualDiffView(self.left_box, self.right_box, self.scrollbar)
+        self.scrollbar.configure(command=self.diff_view.on_scrollbar)
+
         # Bind scrolling to synchronize both textboxes
         self.left_box.bind("<MouseWheel>", self._on_mousewheel)
         self.right_box.bind("<MouseWheel>", self._on_mousewheel)
@@ -101,19 +200,244 @@ class YamlDiffApp(ctk.CTk):
             textbox.tag_config("added", background="#1a4d1a", foreground="#90EE90")  # Green bg
             textbox.tag_config("removed", background="#4d1a1a", foreground="#FFB6C1")  # Red bg
             textbox.tag_config("changed", background="#4d4d1a", foreground="#FFFF99")  # Yellow bg
+            textbox.tag_config(CHANGED_SPAN_TAG, background="#80801a", foreground="#FFFFFF")  # Bright yellow bg
             textbox.tag_config("empty", background="#2d2d2d", foreground="#666666")  # Gray bg
             textbox.tag_config("normal", foreground="#E0E0E0")  # Normal text
             textbox.tag_config("header", foreground="#00FFFF")  # Cyan (bold not allowed in CustomTkinter)
             textbox.tag_config("error", foreground="orange")
 
+        # --- 4. Status Bar ---
+        self.status_frame = ctk.CTkFrame(self)
+        self.status_frame.grid(row=3, column=0, padx=10, pady=(0, 10), sticky="ew")
+        self.status_frame.grid_columnconfigure(0, weight=1)
+
+        self.status_label = ctk.CTkLabel(self.status_frame, text="Ready", anchor="w")
+        self.status_label.grid(row=0, column=0, padx=10, pady=2, sticky="ew")
+
+        self.backend_label = ctk.CTkLabel(self.status_frame, text=f"YAML backend: {engine.yaml_backend}", anchor="e")
+        self.backend_label.grid(row=0, column=1, padx=10, pady=2, sticky="e")
+
+        self.progress_bar = ctk.CTkProgressBar(self.status_frame, width=200)
+        self.progress_bar.grid(row=0, column=2, padx=10, pady=2, sticky="e")
+        self.progress_bar.set(0)
+
+        # Time (and memory) of every stage of the last comparison
+        self.timing_label = ctk.CTkLabel(self.status_frame, text="", anchor="w", font=("", 11))
+        self.timing_label.grid(row=1, column=0, columnspan=3, padx=10, pady=(0, 2), sticky="ew")
+
+        # --- Background worker: comparisons never run on the Tk main thread ---
+        self.worker = DiffWorker()
+        # Finished pairs of a multi-document comparison that is still running
+        self._partial_documents = None
+        # Rows of the changed sections found so far by a streaming comparison,
+        # each after a header row
+        self._stream_parts = None
+        # Parsed files shared by every mode, so switching modes skips re-reading
+        self.content_cache = ContentCache()
+        # Finished comparisons kept on disk across launches
+        self.result_cache = ResultCache()
+        # Watch mode: the running FileWatcher and the function that re-compares
+        self._watch = None
+        self._watch_changed = threading.Event()
+        self.after(WORKER_POLL_MS, self._poll_worker)
 
     def _on_mousewheel(self, event):
         """Synchronize scrolling between both textboxes."""
         # Scroll both textboxes together
-        self.left_box.yview_scroll(int(-1*(event.delta/120)), "units")
-        self.right_box.yview_scroll(int(-1*(event.delta/120)), "units")
+        self.diff_view.scroll(int(-1*(event.delta/120)))
         return "break"  # Prevent default scrolling
 
+    def _poll_worker(self):
+        """Deliver queued worker callbacks on the Tk main thread."""
+        self.worker.drain()
+        # A save while a re-diff is running is picked up once it has finished
+        if self._watch is not None and self._watch_changed.is_set() and not self.worker.busy:
+            self._watch_changed.clear()
+            self._watch[1]()
+        self.after(WORKER_POLL_MS, self._poll_worker)
+
+    def _start_diff(self, func, on_done, on_error, on_partial=None):
+        """
+        Run ``func(progress, on_document)`` on the worker, superseding any comparison in progress.
+
+        Documents of a multi-document comparison are shown as they finish;
+        ``on_partial`` replaces that handler for other partial results.
+        Every stage, including showing the result, is timed for the status bar.
+        """
+        profiling = self.profiling.get()
+        profile = StageProfile(trace_memory=profiling, profile=profiling)
+
+        def run(progress, publish):
+            profile.progress = progress
+            try:
+                with profile.running():
+                    return func(profile, publish)
+            finally:
+                # Stop tracing memory here: a superseded job's callbacks never run
+                profile.finish()
+
+        def finish(callback):
+            def handler(value):
+                self._set_busy(False)
+                with profile.stage("Rendering"):
+                    callback(value)
+                self._show_profile(profile)
+            return handler
+
+        self._set_busy(True)
+        self._partial_documents = None
+        self.worker.submit(run, finish(on_done), finish(on_error), self._on_progress,
+                           on_partial or self._on_document)
+
+    def _show_profile(self, profile):
+        """Show the stage timings of a finished comparison and save its report when profiling."""
+        text = profile.summary()
+        if profile.profiler is not None:
+            try:
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                paths = profile.write_report(os.path.join(PROFILE_DIR, time.strftime("yamldiff-%Y%m%d-%H%M%S")))
+                text += f"; report saved to {paths[0]}"
+            except OSError as e:
+                text += f"; could not save the report: {e}"
+        self.timing_label.configure(text=text)
+
+    def _set_busy(self, busy, status=None):
+        """Toggle the Cancel button and reset the status bar."""
+        self.cancel_btn.configure(state="normal" if busy else "disabled")
+        self.progress_bar.set(0)
+        self.status_label.configure(text=status or ("Working..." if busy else "Ready"))
+
+    def _on_progress(self, stage, fraction):
+        """Show worker progress in the status bar."""
+        self.status_label.configure(text=f"{stage}...")
+        if fraction is not None:
+            self.progress_bar.set(fraction)
+
+    def _on_document(self, document):
+        """Show the finished documents of a multi-document comparison while the rest are diffed."""
+        if self._partial_documents is None:
+            self._partial_documents = [None] * document.total
+        self._partial_documents[document.position] = document
+        finished = sum(1 for part in self._partial_documents if part is not None)
+
+        msg = f"Compared {finished} of {document.total} documents...\n\n"
+        self.diff_view.set_content(combine_rows(self._partial_documents), header=banner_lines(msg, "header"),
+                                   aligned=document.result.mode != engine.MODE_SEMANTIC, keep_position=True)
+
+    def _on_section(self, section_diff):
+        """Append a changed section of a streaming comparison to the view as soon as it is found."""
+        label = f"=== {section_diff.label}: {section_diff.status} ==="
+        self._stream_parts.append([engine.DiffRow(None, label, "header", None, label, "header")])
+        self._stream_parts.append(section_diff.result.rows)
+        self.diff_view.set_content(CombinedRows(self._stream_parts),
+                                   header=banner_lines("Streaming...\n\n", "header"),
+                                   aligned=section_diff.result.mode != engine.MODE_SEMANTIC, keep_position=True)
+
+    def stream_diff(self, path1, path2, mode, label_suffix=""):
+        """Compare two files section by section, showing only the sections that differ."""
+        algorithm = self.diff_algorithm.get()
+        semantic_engine = self.semantic_engine.get()
+
+        def on_done(result):
+            self.left_label.configure(text=f"File 1{label_suffix}: {os.path.basename(path1)}")
+            self.right_label.configure(text=f"File 2{label_suffix}: {os.path.basename(path2)}")
+            counts = ", ".join(f"{result.counts[status]} {status}" for status in stream.SECTION_STATUSES)
+            if result.identical:
+                header = banner_lines(f"✅ Files are identical ({counts} sections)\n\n", "added")
+            else:
+                header = banner_lines(f"⚠️  Found {result.difference_count} difference(s) "
+                                      f"({counts} sections)\n\n", "changed")
+            self.diff_view.set_content(CombinedRows(self._stream_parts), header=header,
+                                       aligned=mode != engine.MODE_SEMANTIC, keep_position=True)
+
+        def on_error(e):
+            self.diff_view.show_message(f"An unexpected error occurred:\n{e}", "error")
+
+        self._stream_parts = []
+        self.diff_view.show_message("Streaming...", "header")
+        self._start_diff(lambda progress, on_section: stream.stream_diff(path1, path2, mode, progress, algorithm,
+                                                                         on_section, semantic_engine=semantic_engine),
+                         on_done, on_error, self._on_section)
+
+    def watch_diff(self, path1, path2, mode, label_suffix=""):
+        """
+        Compare two files, then compare them again every time either one is saved.
+
+        Re-comparisons only redo the changed part of the files (see
+        ``yamldiff_incremental``) and only redraw the rows that changed.
+        """
+        self.stop_watch()
+        incremental = IncrementalDiff(mode, self.diff_algorithm.get(), self.semantic_engine.get())
+        show = {
+            engine.MODE_SIDE_BY_SIDE: self.show_side_by_side_diff,
+            engine.MODE_SEMANTIC: self.show_semantic_diff,
+            engine.MODE_NORMALIZED: self.show_normalized_diff,
+        }[mode]
+        watcher = FileWatcher((path1, path2), lambda paths: self._watch_changed.set())
+
+        def compare():
+            started = time.perf_counter()
+            first = incremental.result is None
+
+            def on_done(update):
+                result, changed_rows = update
+                self.left_label.configure(text=f"File 1{label_suffix}: {os.path.basename(path1)}")
+                self.right_label.configure(text=f"File 2{label_suffix}: {os.path.basename(path2)}")
+                if changed_rows is None and not first:
+                    # Compared in full: every row may have changed
+                    changed_rows = (0, len(self.diff_view.rows), len(result.rows))
+                show(result, changed_rows)
+                elapsed = (time.perf_counter() - started) * 1000
+                self.status_label.configure(text=f"Watching ({watcher.backend}); compared in {elapsed:.0f} ms")
+
+            def on_error(e):
+                incremental.reset()
+                if isinstance(e, yaml.YAMLError):
+                    error_msg = f"Error: Could not parse YAML file.\n{e}"
+                else:
+                    error_msg = f"An unexpected error occurred:\n{e}"
+                self.diff_view.show_message(error_msg, "error")
+                self.status_label.configure(text=f"Watching ({watcher.backend}); waiting for the next save")
+
+            self._start_diff(lambda progress, on_document: incremental.update(engine.read_file(path1),
+                                                                              engine.read_file(path2), progress),
+                             on_done, on_error)
+
+        self._watch_changed.clear()
+        self._watch = (watcher.start(), compare)
+        compare()
+
+    def _on_watch_toggled(self):
+        """Switching watch mode off stops watching; switching it on takes effect with the next comparison."""
+        if not self.watching.get():
+            self.stop_watch()
+
+    def stop_watch(self):
+        """Stop watching the compared files."""
+        if self._watch is not None:
+            self._watch[0].stop()
+            self._watch = None
+
+    def cancel_diff(self):
+        """Abandon the comparison that is currently running (and stop watching)."""
+        self.stop_watch()
+        if self.worker.busy:
+            self.worker.cancel()
+            self._set_busy(False, "Cancelled")
+
+    def open_folder_window(self):
+        """Open (or raise) the directory comparison window."""
+        if self.folder_window is None or not self.folder_window.winfo_exists():
+            self.folder_window = FolderCompareWindow(self)
+        self.folder_window.focus()
+
+    def open_file_pair(self, path1, path2):
+        """Show one pair from a directory comparison side by side; a missing file compares as empty."""
+        self.file1_path.set(path1 or os.devnull)
+        self.file2_path.set(path2 or os.devnull)
+        self.diff_mode.set(engine.MODE_SIDE_BY_SIDE)
+        self.perform_diff()
+
     def load_file(self, path_var):
         """Opens a file dialog to select a YAML file."""
         filename = filedialog.askopenfilename(
@@ -125,368 +449,297 @@ class YamlDiffApp(ctk.CTk):
 
     def perform_diff(self):
         """The main function triggered by the 'Compare' button."""
-        # Clear both textboxes
-        self.left_box.configure(state="normal")
-        self.right_box.configure(state="normal")
-        self.left_box.delete("1.0", "end")
-        self.right_box.delete("1.0", "end")
-
         path1 = self.file1_path.get()
         path2 = self.file2_path.get()
         mode = self.diff_mode.get()
+        algorithm = self.diff_algorithm.get()
+        semantic_engine = self.semantic_engine.get()
 
+        self.stop_watch()
         if not path1 or not path2:
-            error_msg = "Error: Please select two files to compare."
-            self.left_box.insert("end", error_msg, "error")
-            self.right_box.insert("end", error_msg, "error")
-            self.left_box.configure(state="disabled")
-            self.right_box.configure(state="disabled")
+            self.diff_view.show_message("Error: Please select two files to compare.", "error")
+            return
+        if self.streaming.get():
+            self.stream_diff(path1, path2, mode)
+            return
+        if self.watching.get():
+            self.watch_diff(path1, path2, mode)
             return
 
-        try:
-            with open(path1, 'r', encoding='utf-8') as f1:
-                content1 = f1.read()
-            
-            with open(path2, 'r', encoding='utf-8') as f2:
-                content2 = f2.read()
-
+        def on_done(result):
             # Update labels with filenames
             self.left_label.configure(text=f"File 1: {os.path.basename(path1)}")
             self.right_label.configure(text=f"File 2: {os.path.basename(path2)}")
 
-            if mode == "Side-by-Side":
-                self.show_side_by_side_diff(content1, content2)
+            if result.mode == engine.MODE_SIDE_BY_SIDE:
+                self.show_side_by_side_diff(result)
             else:  # Semantic
-                self.show_semantic_diff(content1, content2)
-
-        except FileNotFoundError as e:
-            error_msg = f"Error: File not found.\n{e}"
-            self.left_box.insert("end", error_msg, "error")
-            self.right_box.insert("end", error_msg, "error")
-        except yaml.YAMLError as e:
-            error_msg = f"Error: Could not parse YAML file.\n{e}"
-            self.left_box.insert("end", error_msg, "error")
-            self.right_box.insert("end", error_msg, "error")
-        except Exception as e:
-            error_msg = f"An unexpected error occurred:\n{e}"
-            self.left_box.insert("end", error_msg, "error")
-            self.right_box.insert("end", error_msg, "error")
-        
-        self.left_box.configure(state="disabled")
-        self.right_box.configure(state="disabled")
+                self.show_semantic_diff(result)
+
+        def on_error(e):
+            if isinstance(e, FileNotFoundError):
+                error_msg = f"Error: File not found.\n{e}"
+            elif isinstance(e, yaml.YAMLError):
+                error_msg = f"Error: Could not parse YAML file.\n{e}"
+            else:
+                error_msg = f"An unexpected error occurred:\n{e}"
+            self.diff_view.show_message(error_msg, "error")
+
+        result_cache = self.result_cache if self.caching_results.get() else None
+        self._start_diff(lambda progress, on_document: engine.diff_files(path1, path2, mode, progress, algorithm,
+                                                                         self.content_cache, on_document,
+                                                                         semantic_engine=semantic_engine,
+                                                                         result_cache=result_cache),
+                         on_done, on_error)
+
+    def _show_rows(self, rows, header=(), footer=(), aligned=True, changed_rows=None):
+        """Show diff rows; after an incremental re-diff only the ``changed_rows`` are redrawn."""
+        if changed_rows is None:
+            self.diff_view.set_content(rows, header=header, footer=footer, aligned=aligned)
+        else:
+            self.diff_view.update_rows(rows, changed_rows, header, footer)
 
-    def show_side_by_side_diff(self, content1, content2):
+    def show_side_by_side_diff(self, result, changed_rows=None):
         """Shows files side-by-side with highlighted differences like VIMDIFF."""
-        lines1 = content1.splitlines()
-        lines2 = content2.splitlines()
-        
-        # Use SequenceMatcher to find matching and different blocks
-        matcher = difflib.SequenceMatcher(None, lines1, lines2)
-        
-        # Build aligned output with proper line numbers
-        left_line_num = 1
-        right_line_num = 1
-        
-        for opcode, i1, i2, j1, j2 in matcher.get_opcodes():
-            if opcode == 'equal':
-                # Lines are the same - show them normally
-                for i in range(i1, i2):
-                    left_text = f"{left_line_num:4d} | {lines1[i]}\n"
-                    right_text = f"{right_line_num:4d} | {lines2[j1 + (i - i1)]}\n"
-                    self.left_box.insert("end", left_text, "normal")
-                    self.right_box.insert("end", right_text, "normal")
-                    left_line_num += 1
-                    right_line_num += 1
-                    
-            elif opcode == 'replace':
-                # Lines in this block differ - show side-by-side with appropriate coloring
-                left_lines = lines1[i1:i2]
-                right_lines = lines2[j1:j2]
-                left_count = len(left_lines)
-                right_count = len(right_lines)
-                max_count = max(left_count, right_count)
-                
-                # Always show side-by-side, pad with empty lines as needed
-                for k in range(max_count):
-                    if k < left_count and k < right_count:
-                        # Both sides have content - check similarity
-                        left_line = left_lines[k]
-                        right_line = right_lines[k]
-                        similarity = difflib.SequenceMatcher(None, left_line, right_line).ratio()
-                        
-                        left_text = f"{left_line_num:4d} | {left_line}\n"
-                        right_text = f"{right_line_num:4d} | {right_line}\n"
-                        
-                        if similarity > 0.3:  # Similar enough to be a modification
-                            self.left_box.insert("end", left_text, "changed")
-                            self.right_box.insert("end", right_text, "changed")
-                        else:  # Too different - one removed, one added
-                            self.left_box.insert("end", left_text, "removed")
-                            self.right_box.insert("end", right_text, "added")
-                        
-                        left_line_num += 1
-                        right_line_num += 1
-                        
-                    elif k < left_count:
-                        # Only left has content - removed
-                        left_text = f"{left_line_num:4d} | {left_lines[k]}\n"
-                        self.left_box.insert("end", left_text, "removed")
-                        self.right_box.insert("end", "     | \n", "empty")
-                        left_line_num += 1
-                        
-                    else:
-                        # Only right has content - added
-                        self.left_box.insert("end", "     | \n", "empty")
-                        right_text = f"{right_line_num:4d} | {right_lines[k]}\n"
-                        self.right_box.insert("end", right_text, "added")
-                        right_line_num += 1
-                        
-            elif opcode == 'delete':
-                # Lines only in left file - removed
-                for i in range(i1, i2):
-                    left_text = f"{left_line_num:4d} | {lines1[i]}\n"
-                    self.left_box.insert("end", left_text, "removed")
-                    self.right_box.insert("end", "     | \n", "empty")
-                    left_line_num += 1
-                    
-            elif opcode == 'insert':
-                # Lines only in right file - added
-                for j in range(j1, j2):
-                    self.left_box.insert("end", "     | \n", "empty")
-                    right_text = f"{right_line_num:4d} | {lines2[j]}\n"
-                    self.right_box.insert("end", right_text, "added")
-                    right_line_num += 1
-        
         # Add summary at the bottom
-        if content1 == content2:
-            summary = "\n=== Files are identical ==="
-            self.left_box.insert("end", summary, "added")
-            self.right_box.insert("end", summary, "added")
+        footer = []
+        if result.identical:
+            footer = banner_lines("\n=== Files are identical ===", "added")
+        self._show_rows(result.rows, footer=footer, changed_rows=changed_rows)
 
-    def show_semantic_diff(self, content1, content2):
+    def show_semantic_diff(self, result, changed_rows=None):
         """Shows files side-by-side with semantic differences highlighted (order-agnostic)."""
-        data1 = yaml.safe_load(content1)
-        data2 = yaml.safe_load(content2)
-
-        # DeepDiff with order ignored
-        ddiff = DeepDiff(data1, data2, ignore_order=True, verbose_level=2)
-
-        # Extract paths that have semantic differences
-        changed_paths = set()
-        
-        if 'dictionary_item_added' in ddiff:
-            for path in ddiff['dictionary_item_added']:
-                changed_paths.add(self._extract_key_from_path(path))
-        
-        if 'dictionary_item_removed' in ddiff:
-            for path in ddiff['dictionary_item_removed']:
-                changed_paths.add(self._extract_key_from_path(path))
-        
-        if 'values_changed' in ddiff:
-            for path in ddiff['values_changed']:
-                changed_paths.add(self._extract_key_from_path(path))
-        
-        if 'type_changes' in ddiff:
-            for path in ddiff['type_changes']:
-                changed_paths.add(self._extract_key_from_path(path))
-        
-        if 'iterable_item_added' in ddiff:
-            for path in ddiff['iterable_item_added']:
-                changed_paths.add(self._extract_key_from_path(path))
-        
-        if 'iterable_item_removed' in ddiff:
-            for path in ddiff['iterable_item_removed']:
-                changed_paths.add(self._extract_key_from_path(path))
-        
         # Show header
-        if not ddiff:
+        if result.identical:
             msg = "✅ Files are SEMANTICALLY IDENTICAL (keys/values match, order ignored)\n\n"
-            self.left_box.insert("end", msg, "added")
-            self.right_box.insert("end", msg, "added")
+            header = banner_lines(msg, "added")
         else:
-            msg = f"⚠️  Found {len(changed_paths)} semantic difference(s) (order ignored)\n\n"
-            self.left_box.insert("end", msg, "changed")
-            self.right_box.insert("end", msg, "changed")
-        
+            msg = f"⚠️  Found {result.difference_count} semantic difference(s) (order ignored)\n\n"
+            header = banner_lines(msg, "changed")
+
         # Show the actual YAML content side by side with highlighting
-        lines1 = content1.splitlines()
-        lines2 = content2.splitlines()
-        
-        max_lines = max(len(lines1), len(lines2))
-        for i in range(max_lines):
-            # Determine if this line has a semantic change
-            has_change = False
-            if i < len(lines1):
-                line1 = lines1[i]
-                # Check if any changed path appears in this line
-                for path in changed_paths:
-                    if path and path in line1:
-                        has_change = True
-                        break
-                
-                left_text = f"{i+1:4d} | {line1}\n"
-                tag = "changed" if (has_change and ddiff) else "normal"
-                self.left_box.insert("end", left_text, tag)
-            else:
-                self.left_box.insert("end", "     | \n", "empty")
-            
-            has_change = False
-            if i < len(lines2):
-                line2 = lines2[i]
-                # Check if any changed path appears in this line
-                for path in changed_paths:
-                    if path and path in line2:
-                        has_change = True
-                        break
-                
-                right_text = f"{i+1:4d} | {line2}\n"
-                tag = "changed" if (has_change and ddiff) else "normal"
-                self.right_box.insert("end", right_text, tag)
-            else:
-                self.right_box.insert("end", "     | \n", "empty")
-    
+        self._show_rows(result.rows, header=header, aligned=False, changed_rows=changed_rows)
+
     def _extract_key_from_path(self, path):
         """Extract the key name from a DeepDiff path like root['key']['subkey']."""
-        import re
-        # Extract all keys from the path
-        keys = re.findall(r"\['([^']+)'\]", str(path))
-        # Return the last (most specific) key
-        return keys[-1] if keys else ""
-    
+        return engine.extract_key_from_path(path)
+
     def _normalize_data(self, data):
         """Recursively normalize data: sort dict keys AND list items."""
-        if isinstance(data, dict):
-            # Sort dictionary by keys and recursively normalize values
-            return {k: self._normalize_data(v) for k, v in sorted(data.items())}
-        elif isinstance(data, list):
-            # Sort list items (convert to string for comparison) and recursively normalize
-            normalized_items = [self._normalize_data(item) for item in data]
-            # Sort, handling both simple types and complex types
-            try:
-                return sorted(normalized_items, key=lambda x: str(x))
-            except TypeError:
-                # If items aren't comparable, just return as-is
-                return normalized_items
-        else:
-            return data
-    
+        return engine.normalize_data(data)
+
     def normalize_and_compare(self):
         """Normalize both YAML files (sort keys AND lists, consistent formatting) and compare."""
-        self.left_box.configure(state="normal")
-        self.right_box.configure(state="normal")
-        self.left_box.delete("1.0", "end")
-        self.right_box.delete("1.0", "end")
-
         path1 = self.file1_path.get()
         path2 = self.file2_path.get()
+        algorithm = self.diff_algorithm.get()
 
+        self.stop_watch()
         if not path1 or not path2:
-            error_msg = "Error: Please select two files to compare."
-            self.left_box.insert("end", error_msg, "error")
-            self.right_box.insert("end", error_msg, "error")
-            self.left_box.configure(state="disabled")
-            self.right_box.configure(state="disabled")
+            self.diff_view.show_message("Error: Please select two files to compare.", "error")
+            return
+        if self.streaming.get():
+            self.stream_diff(path1, path2, engine.MODE_NORMALIZED, " (Normalized)")
+            return
+        if self.watching.get():
+            self.watch_diff(path1, path2, engine.MODE_NORMALIZED, " (Normalized)")
             return
 
-        try:
-            with open(path1, 'r', encoding='utf-8') as f1:
-                data1 = yaml.safe_load(f1)
-            
-            with open(path2, 'r', encoding='utf-8') as f2:
-                data2 = yaml.safe_load(f2)
-
+        def on_done(result):
             # Update labels
             self.left_label.configure(text=f"File 1 (Normalized): {os.path.basename(path1)}")
             self.right_label.configure(text=f"File 2 (Normalized): {os.path.basename(path2)}")
+            self.show_normalized_diff(result)
 
-            # Normalize: Sort BOTH dict keys AND list items recursively
-            normalized_data1 = self._normalize_data(data1)
-            normalized_data2 = self._normalize_data(data2)
-            
-            # Convert to YAML with consistent formatting
-            normalized1 = yaml.dump(normalized_data1, sort_keys=True, default_flow_style=False, allow_unicode=True)
-            normalized2 = yaml.dump(normalized_data2, sort_keys=True, default_flow_style=False, allow_unicode=True)
-
-            # Show normalized comparison
-            header = "=== NORMALIZED COMPARISON (sorted keys, consistent format) ===\n\n"
-            self.left_box.insert("end", header, "header")
-            self.right_box.insert("end", header, "header")
-
-            # Now do a line-by-line diff on normalized content
-            lines1 = normalized1.splitlines()
-            lines2 = normalized2.splitlines()
-            
-            matcher = difflib.SequenceMatcher(None, lines1, lines2)
-            
-            left_line_num = 1
-            right_line_num = 1
-            
-            for opcode, i1, i2, j1, j2 in matcher.get_opcodes():
-                if opcode == 'equal':
-                    for i in range(i1, i2):
-                        left_text = f"{left_line_num:4d} | {lines1[i]}\n"
-                        right_text = f"{right_line_num:4d} | {lines2[j1 + (i - i1)]}\n"
-                        self.left_box.insert("end", left_text, "normal")
-                        self.right_box.insert("end", right_text, "normal")
-                        left_line_num += 1
-                        right_line_num += 1
-                        
-                elif opcode == 'replace':
-                    left_lines = lines1[i1:i2]
-                    right_lines = lines2[j1:j2]
-                    max_count = max(len(left_lines), len(right_lines))
-                    
-                    for k in range(max_count):
-                        if k < len(left_lines) and k < len(right_lines):
-                            similarity = difflib.SequenceMatcher(None, left_lines[k], right_lines[k]).ratio()
-                            left_text = f"{left_line_num:4d} | {left_lines[k]}\n"
-                            right_text = f"{right_line_num:4d} | {right_lines[k]}\n"
-                            
-                            if similarity > 0.3:
-                                self.left_box.insert("end", left_text, "changed")
-                                self.right_box.insert("end", right_text, "changed")
-                            else:
-                                self.left_box.insert("end", left_text, "removed")
-                                self.right_box.insert("end", right_text, "added")
-                            left_line_num += 1
-                            right_line_num += 1
-                        elif k < len(left_lines):
-                            left_text = f"{left_line_num:4d} | {left_lines[k]}\n"
-                            self.left_box.insert("end", left_text, "removed")
-                            self.right_box.insert("end", "     | \n", "empty")
-                            left_line_num += 1
-                        else:
-                            self.left_box.insert("end", "     | \n", "empty")
-                            right_text = f"{right_line_num:4d} | {right_lines[k]}\n"
-                            self.right_box.insert("end", right_text, "added")
-                            right_line_num += 1
-                            
-                elif opcode == 'delete':
-                    for i in range(i1, i2):
-                        left_text = f"{left_line_num:4d} | {lines1[i]}\n"
-                        self.left_box.insert("end", left_text, "removed")
-                        self.right_box.insert("end", "     | \n", "empty")
-                        left_line_num += 1
-                        
-                elif opcode == 'insert':
-                    for j in range(j1, j2):
-                        self.left_box.insert("end", "     | \n", "empty")
-                        right_text = f"{right_line_num:4d} | {lines2[j]}\n"
-                        self.right_box.insert("end", right_text, "added")
-                        right_line_num += 1
-            
-            if normalized1 == normalized2:
-                summary = "\n✅ Files are IDENTICAL when normalized"
-                self.left_box.insert("end", summary, "added")
-                self.right_box.insert("end", summary, "added")
-
-        except Exception as e:
+        def on_error(e):
             error_msg = f"Error normalizing files:\n{e}"
-            self.left_box.insert("end", error_msg, "error")
-            self.right_box.insert("end", error_msg, "error")
-        
-        self.left_box.configure(state="disabled")
-        self.right_box.configure(state="disabled")
+            self.diff_view.show_message(error_msg, "error")
+
+        result_cache = self.result_cache if self.caching_results.get() else None
+        self._start_diff(lambda progress, on_document: engine.diff_files(path1, path2, engine.MODE_NORMALIZED,
+                                                                         progress, algorithm, self.content_cache,
+                                                                         on_document, result_cache=result_cache),
+                         on_done, on_error)
+
+    def show_normalized_diff(self, result, changed_rows=None):
+        """Shows the normalized documents side-by-side with highlighted differences."""
+        # Show normalized comparison
+        header = banner_lines("=== NORMALIZED COMPARISON (sorted keys, consistent format) ===\n\n", "header")
+
+        footer = []
+        if result.identical:
+            footer = banner_lines("\n✅ Files are IDENTICAL when normalized", "added")
+        self._show_rows(result.rows, header=header, footer=footer, changed_rows=changed_rows)
+
+
+class FolderCompareWindow(ctk.CTkToplevel):
+    """
+    Compares two directory trees and lists every file pair with its status.
+
+    Clicking a row opens that pair in the main window's side-by-side view.
+    Column headings sort the list.
+    """
+
+    COLUMNS = (("status", "Status", 110), ("differences", "Differences", 110), ("path", "Path", 500))
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title("YAML Diff Tool - Compare Folders")
+        self.geometry("900x600")
+
+        self.folder1_path = ctk.StringVar()
+        self.folder2_path = ctk.StringVar()
+        self.mode = ctk.StringVar(value=app.diff_mode.get())
+        self.comparisons = {}
+        self.sort_key = "path"
+        self.sort_reverse = False
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        # Folder selection
+        self.folder_frame = ctk.CTkFrame(self)
+        self.folder_frame.grid(row=0, column=0, padx=10, pady=10, sticky="ew")
+        self.folder_frame.grid_columnconfigure(1, weight=1)
+        for row, (text, path_var) in enumerate((("Left Folder", self.folder1_path), ("Right Folder", self.folder2_path))):
+            button = ctk.CTkButton(self.folder_frame, text=text, command=lambda var=path_var: self.load_folder(var))
+            button.grid(row=row, column=0, padx=10, pady=5)
+            entry = ctk.CTkEntry(self.folder_frame, textvariable=path_var)
+            entry.grid(row=row, column=1, padx=10, pady=5, sticky="ew")
+
+        # Controls
+        self.control_frame = ctk.CTkFrame(self)
+        self.control_frame.grid(row=1, column=0, padx=10, pady=0, sticky="ew")
+        self.control_frame.grid_columnconfigure(0, weight=1)
+        self.mode_switch = ctk.CTkSegmentedButton(self.control_frame, values=list(engine.MODES), variable=self.mode)
+        self.mode_switch.grid(row=0, column=0, padx=10, pady=10, sticky="w")
+        self.compare_btn = ctk.CTkButton(self.control_frame, text="Compare", command=self.compare, font=("", 14, "bold"))
+        self.compare_btn.grid(row=0, column=1, padx=10, pady=10)
+        self.cancel_btn = ctk.CTkButton(self.control_frame, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.grid(row=0, column=2, padx=10, pady=10)
+
+        # Summary list (customtkinter has no table widget)
+        self.list_frame = ctk.CTkFrame(self)
+        self.list_frame.grid(row=2, column=0, padx=10, pady=10, sticky="nsew")
+        self.list_frame.grid_columnconfigure(0, weight=1)
+        self.list_frame.grid_rowconfigure(0, weight=1)
+        self.tree = ttk.Treeview(self.list_frame, columns=[name for name, _, _ in self.COLUMNS],
+                                 show="headings", selectmode="browse")
+        for name, heading, width in self.COLUMNS:
+            self.tree.heading(name, text=heading, command=lambda key=name: self.sort_by(key))
+            self.tree.column(name, width=width, stretch=(name == "path"))
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self.list_frame, command=self.tree.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self.tree.bind("<<TreeviewSelect>>", self.open_selected)
+
+        self.status_label = ctk.CTkLabel(self, text="Select two folders to compare", anchor="w")
+        self.status_label.grid(row=3, column=0, padx=10, pady=(0, 10), sticky="ew")
+
+        # Runs independently of the main window's worker, so opening a pair
+        # does not cancel the folder comparison
+        self.worker = DiffWorker()
+        # Pending after() id of _poll_worker; polling only runs while a comparison does
+        self._poll_id = None
+
+    def _start_polling(self):
+        if self._poll_id is None:
+            self._poll_id = self.after(WORKER_POLL_MS, self._poll_worker)
+
+    def _poll_worker(self):
+        """Deliver queued worker callbacks on the Tk main thread until the comparison is over."""
+        self._poll_id = None
+        self.worker.drain()
+        if self.worker.busy:
+            self._start_polling()
+
+    def destroy(self):
+        """Stop the comparison and the polling along with the window."""
+        self.worker.cancel()
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+        super().destroy()
+
+    def load_folder(self, path_var):
+        """Opens a directory dialog to select one side of the comparison."""
+        folder = filedialog.askdirectory(title="Select a folder", parent=self)
+        if folder:
+            path_var.set(folder)
+
+    def compare(self):
+        """Compare the two folders in the background, listing files as they are done."""
+        folder1 = self.folder1_path.get()
+        folder2 = self.folder2_path.get()
+        mode = self.mode.get()
+        algorithm = self.app.diff_algorithm.get()
+        semantic_engine = self.app.semantic_engine.get()
+        if not folder1 or not folder2:
+            self.status_label.configure(text="Error: Please select two folders to compare.")
+            return
+
+        self.comparisons = {}
+        self.tree.delete(*self.tree.get_children())
+        self._set_busy(True)
+
+        def on_done(result):
+            self._set_busy(False)
+            counts = result.counts()
+            summary = ", ".join(f"{counts[status]} {status}" for status in directory.STATUSES if counts[status])
+            self.status_label.configure(text=f"{len(result.comparisons)} file(s): {summary or 'no YAML files'}")
+            self.sort_by(self.sort_key, toggle=False)
+
+        def on_error(e):
+            self._set_busy(False)
+            self.status_label.configure(text=f"Error: {e}")
+
+        self.worker.submit(
+            lambda progress, on_file: directory.compare_directories(folder1, folder2, mode, progress, algorithm,
+                                                                    on_file=on_file, semantic_engine=semantic_engine),
+            on_done, on_error, self._on_progress, self._add_comparison)
+        self._start_polling()
+
+    def cancel(self):
+        """Abandon the folder comparison that is currently running."""
+        if self.worker.busy:
+            self.worker.cancel()
+            self._set_busy(False)
+            self.status_label.configure(text="Cancelled")
+
+    def _set_busy(self, busy):
+        self.compare_btn.configure(state="disabled" if busy else "normal")
+        self.cancel_btn.configure(state="normal" if busy else "disabled")
+
+    def _on_progress(self, stage, fraction):
+        text = f"{stage}..." if fraction is None else f"{stage}... {fraction:.0%}"
+        self.status_label.configure(text=text)
+
+    def _add_comparison(self, comparison):
+        """Append a finished file pair to the list."""
+        self.comparisons[comparison.relpath] = comparison
+        self.tree.insert("", "end", iid=comparison.relpath,
+                         values=(comparison.status, comparison.difference_count, comparison.relpath))
+
+    def sort_by(self, key, toggle=True):
+        """Order the list by a column; choosing the same column again reverses it."""
+        if toggle:
+            self.sort_reverse = not self.sort_reverse if key == self.sort_key else key == "differences"
+        self.sort_key = key
+        ordered = directory.sort_comparisons(self.comparisons.values(), key, self.sort_reverse)
+        for position, comparison in enumerate(ordered):
+            self.tree.move(comparison.relpath, "", position)
+
+    def open_selected(self, event=None):
+        """Open the selected pair in the main window."""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        comparison = self.comparisons[selection[0]]
+        if comparison.status == directory.STATUS_ERROR:
+            self.status_label.configure(text=f"{comparison.relpath}: {comparison.error}")
+        self.app.open_file_pair(comparison.path1, comparison.path2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""
+In-memory cache of file contents and everything parsed from them.
+
+Entries are keyed by path and validated against the file's size, mtime and
+a content hash, so switching between comparison modes (or re-running a
+comparison on unchanged files) skips reading, parsing and normalizing.
+Memory is bounded by an approximate byte budget with LRU eviction.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from yamldiff_engine import YamlSource
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def content_digest(data):
+    """Hash of a file's raw bytes."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def decode_text(data):
+    """Decode file bytes the way ``open(path, encoding='utf-8')`` would, newlines included."""
+    return io.StringIO(data.decode("utf-8"), newline=None).read()
+
+
+class CacheEntry:
+    """A cached YamlSource and the file identity it was loaded from."""
+
+    __slots__ = ("size", "mtime_ns", "digest", "source")
+
+    def __init__(self, size, mtime_ns, digest, source):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.source = source
+
+
+class ContentCache:
+    """LRU cache of YamlSource objects keyed by (path, size, mtime, content hash)."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        """
+        Return the YamlSource for a file, re-reading it only if it changed.
+
+        A file whose size and mtime are unchanged is trusted without reading
+        it. Otherwise it is read and hashed; if the content turns out to be
+        the same (e.g. the file was only touched) the parsed artifacts are kept.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry.source
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = content_digest(data)
+
+        with self._lock:
+            if entry is not None and entry.digest == digest:
+                entry.size = stat.st_size
+                entry.mtime_ns = stat.st_mtime_ns
+                self.hits += 1
+            else:
+                entry = CacheEntry(stat.st_size, stat.st_mtime_ns, digest, YamlSource(decode_text(data)))
+                self.misses += 1
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            self._evict()
+            return entry.source
+
+    def _evict(self):
+        """Drop least recently used entries until the budget is met (the newest always stays)."""
+        total = sum(entry.source.size_estimate() for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.source.size_estimate()
+
+    def size_estimate(self):
+        """Approximate bytes held by all cached entries."""
+        with self._lock:
+            return sum(entry.source.size_estimate() for entry in self._entries.values())
+
+    def clear(self):
+        """Forget every cached file."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,435 @@
+"""
+Command-line entry point for the YAML Diff Tool.
+
+Runs the same comparisons as the GUI without importing tkinter, so it can be
+used from CI jobs, cron and other headless environments.
+
+With ``--stream`` the files are read incrementally and compared one
+top-level section at a time, so files larger than memory can be compared;
+only the sections that differ are printed (JSON output is one object per
+line).
+
+With ``--watch`` the files are compared again every time one of them is
+saved, redoing only the changed part; each re-comparison prints the rows
+that changed (JSON output is one object per line) until interrupted.
+
+``--timings`` measures the time and memory of every stage of the
+comparison (reading, parsing, structural diff, normalizing, dumping, line
+matching, output) and prints them to stderr, or adds them to the JSON
+output; ``--profile PREFIX`` also writes a cProfile report.
+
+``--result-cache`` keeps finished comparisons on disk, so comparing the
+same pair of files again (for example the same artifacts in every build)
+skips parsing and diffing.
+
+When both arguments are directories (or glob patterns such as
+``'overlays/dev/**/*.yaml'``) every pair of files with the same relative
+path is compared and a summary table is printed instead.
+
+Exit status follows diff(1): 0 when the files are identical, 1 when they
+differ and 2 on errors.
+"""
+
+import argparse
+import glob
+import json
+import os
+import queue
+import sys
+import time
+
+import yaml
+
+import yamldiff_directory as directory
+import yamldiff_engine as engine
+import yamldiff_linediff as linediff
+import yamldiff_stream as stream
+from yamldiff_incremental import IncrementalDiff
+from yamldiff_profile import StageProfile
+from yamldiff_resultcache import ResultCache, default_cache_dir
+from yamldiff_watch import FileWatcher
+
+MODE_CHOICES = {
+    "side-by-side": engine.MODE_SIDE_BY_SIDE,
+    "semantic": engine.MODE_SEMANTIC,
+    "normalized": engine.MODE_NORMALIZED,
+}
+
+# Failures to read or parse an input, reported with exit status 2 instead of a
+# traceback: missing, unreadable or directory paths (OSError), invalid UTF-8
+# (UnicodeDecodeError), loader and structure errors (ValueError) and YAML syntax
+INPUT_ERRORS = (OSError, UnicodeDecodeError, ValueError, yaml.YAMLError)
+
+# Single-character markers used in the text output
+TAG_MARKERS = {
+    engine.TAG_NORMAL: " ",
+    engine.TAG_CHANGED: "~",
+    engine.TAG_REMOVED: "-",
+    engine.TAG_ADDED: "+",
+    engine.TAG_EMPTY: " ",
+}
+
+
+def format_rows(rows, width=60):
+    """Render aligned rows as two text columns, like the GUI panes."""
+    output = []
+    for row in rows:
+        left = engine.format_line(row.left_num, row.left_text).rstrip("\n")
+        right = engine.format_line(row.right_num, row.right_text).rstrip("\n")
+        if len(left) > width:
+            left = left[:width - 1] + ">"
+        # Semantic rows can be highlighted on one side only
+        tag = row.left_tag if row.left_tag not in (engine.TAG_NORMAL, engine.TAG_EMPTY) else row.right_tag
+        marker = TAG_MARKERS.get(tag, " ")
+        output.append(f"{left:<{width}} {marker} {right}\n")
+    return "".join(output)
+
+
+def format_summary(result):
+    """The closing line of the text output."""
+    if result.identical:
+        return "=== Files are identical ===\n"
+    return f"=== {result.difference_count} difference(s) ===\n"
+
+
+def format_text(result, width=60):
+    """Render a DiffResult as two text columns, like the GUI panes."""
+    return format_rows(result.rows, width) + format_summary(result)
+
+
+class DocumentPrinter:
+    """
+    Prints the documents of a multi-document comparison as they finish.
+
+    Pairs complete in any order; each is written as soon as every pair before
+    it in display order has been written.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.pending = {}
+        self.next_position = 0
+
+    def __call__(self, document):
+        self.pending[document.position] = document
+        while self.next_position in self.pending:
+            sys.stdout.write(format_rows(self.pending.pop(self.next_position).result.rows, self.width))
+            sys.stdout.flush()
+            self.next_position += 1
+
+    @property
+    def printed(self):
+        """True once any document has been written."""
+        return self.next_position > 0
+
+
+def format_section(section_diff, width=60):
+    """Render one differing section of a streaming comparison."""
+    left = section_diff.left.first_line + 1 if section_diff.left is not None else "-"
+    right = section_diff.right.first_line + 1 if section_diff.right is not None else "-"
+    output = [f"=== {section_diff.label}: {section_diff.status} (line {left} / {right}) ===\n"]
+    if section_diff.error:
+        output.append(f"(compared line by line: {section_diff.error.splitlines()[0]})\n")
+    output.append(format_rows(section_diff.result.rows, width))
+    return "".join(output)
+
+
+def format_directory(result, sort="path"):
+    """Render a directory comparison as a table of status, difference count and path."""
+    output = []
+    for comparison in directory.sort_comparisons(result.comparisons, sort, reverse=(sort == "differences")):
+        line = f"{comparison.status:<11} {comparison.difference_count:>6}  {comparison.relpath}"
+        if comparison.error:
+            line += f"  ({comparison.error.splitlines()[0]})"
+        output.append(line + "\n")
+
+    counts = result.counts()
+    summary = ", ".join(f"{counts[status]} {status}" for status in directory.STATUSES if counts[status])
+    output.append(f"=== {len(result.comparisons)} file(s): {summary or 'no YAML files'} ===\n")
+    return "".join(output)
+
+
+def print_input_error(e):
+    """Report one of INPUT_ERRORS on stderr."""
+    if isinstance(e, FileNotFoundError):
+        print(f"Error: File not found.\n{e}", file=sys.stderr)
+    elif isinstance(e, yaml.YAMLError):
+        print(f"Error: Could not parse YAML file.\n{e}", file=sys.stderr)
+    elif isinstance(e, UnicodeDecodeError):
+        print(f"Error: File is not valid UTF-8.\n{e}", file=sys.stderr)
+    else:
+        print(f"Error: {e}", file=sys.stderr)
+
+
+def is_directory_argument(path):
+    """True for a directory or a glob pattern, which select directory mode."""
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def build_parser():
+    """Build the argument parser for the ``yamldiff`` command."""
+    parser = argparse.ArgumentParser(
+        prog="yamldiff",
+        description="Compare two YAML files without starting the GUI.",
+    )
+    parser.add_argument("file1", help="left-hand YAML file, directory or glob pattern")
+    parser.add_argument("file2", help="right-hand YAML file, directory or glob pattern")
+    parser.add_argument("-m", "--mode", choices=sorted(MODE_CHOICES), default="side-by-side",
+                        help="comparison mode (default: side-by-side)")
+    parser.add_argument("-a", "--algorithm", choices=linediff.ALGORITHMS, default=engine.DEFAULT_ALGORITHM,
+                        help=f"line diff algorithm (default: {engine.DEFAULT_ALGORITHM})")
+    parser.add_argument("--semantic-engine", choices=engine.SEMANTIC_ENGINES, default=engine.DEFAULT_SEMANTIC_ENGINE,
+                        help=f"structural diff used by the semantic mode (default: {engine.DEFAULT_SEMANTIC_ENGINE})")
+    parser.add_argument("-k", "--identity-key", action="append", dest="identity_keys",
+                        help="field identifying records in lists, dotted for nested fields, may be repeated "
+                             f"(default: {', '.join(engine.DEFAULT_IDENTITY_KEYS)})")
+    parser.add_argument("--yaml-backend", choices=engine.YAML_BACKENDS,
+                        help="force the libyaml (C) or pure-Python YAML backend (default: libyaml if available)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="worker processes for multi-document files (default: one per CPU for large files)")
+    parser.add_argument("-f", "--format", choices=("text", "json"), default="text",
+                        help="output format (default: text)")
+    parser.add_argument("-w", "--width", type=int, default=60,
+                        help="column width of the left pane in text output (default: 60)")
+    parser.add_argument("--result-cache", nargs="?", const=default_cache_dir(), metavar="DIR",
+                        help=f"reuse results of earlier comparisons stored in DIR (default: {default_cache_dir()})")
+    parser.add_argument("--stream", action="store_true",
+                        help="compare huge files one top-level section at a time, printing only changed sections")
+    parser.add_argument("--watch", action="store_true",
+                        help="compare again every time a file is saved, printing the rows that changed")
+    parser.add_argument("-p", "--pattern", action="append", dest="patterns",
+                        help="file name pattern searched in directories, may be repeated (default: *.yaml, *.yml)")
+    parser.add_argument("-s", "--sort", choices=directory.SORT_KEYS, default="path",
+                        help="order of the directory summary (default: path)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="print nothing, only set the exit status")
+    parser.add_argument("--timings", action="store_true",
+                        help="report the time and memory of each comparison stage (stderr, or in the JSON output)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="trace the peak memory of each stage and the largest allocations (slow; implies --timings)")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="write a cProfile report to PREFIX.prof and PREFIX.txt (implies --timings)")
+    return parser
+
+
+def main(argv=None):
+    """Run the command line tool and return its exit status."""
+    args = build_parser().parse_args(argv)
+
+    try:
+        engine.select_yaml_backend(args.yaml_backend)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    if is_directory_argument(args.file1) and is_directory_argument(args.file2):
+        if args.watch:
+            print("Error: --watch compares two files, not directories.", file=sys.stderr)
+            return 2
+        return compare_directories(args)
+    if args.stream:
+        return stream_files(args)
+    if args.watch:
+        return watch_files(args)
+
+    # Text output of multi-document files is streamed one document at a time
+    printer = DocumentPrinter(args.width) if args.format == "text" and not args.quiet else None
+    profile = build_profile(args)
+
+    try:
+        with profile.running():
+            result = engine.diff_files(args.file1, args.file2, MODE_CHOICES[args.mode], profile, args.algorithm,
+                                       on_document=printer, jobs=args.jobs, semantic_engine=args.semantic_engine,
+                                       identity_keys=args.identity_keys or engine.DEFAULT_IDENTITY_KEYS,
+                                       result_cache=ResultCache(args.result_cache) if args.result_cache else None)
+    except INPUT_ERRORS as e:
+        print_input_error(e)
+        return 2
+    finally:
+        profile.finish()
+
+    if not args.quiet:
+        with profile.stage("Formatting output"):
+            if args.format == "json":
+                payload = result.to_dict()
+                payload["file1"] = args.file1
+                payload["file2"] = args.file2
+                payload["yaml_backend"] = engine.yaml_backend
+            elif printer.printed:
+                output = format_summary(result)
+            else:
+                output = format_text(result, args.width)
+        if args.format == "json":
+            if wants_timings(args):
+                payload["timings"] = profile.to_dict()
+            output = json.dumps(payload, indent=2, default=str) + "\n"
+        sys.stdout.write(output)
+
+    write_timings(args, profile)
+    return 0 if result.identical else 1
+
+
+def wants_timings(args):
+    """True if any of the instrumentation options was given."""
+    return args.timings or args.trace_memory or args.profile is not None
+
+
+def build_profile(args):
+    """The StageProfile that times a comparison (it costs next to nothing when no timings are wanted)."""
+    return StageProfile(trace_memory=args.trace_memory, profile=args.profile is not None)
+
+
+def write_timings(args, profile):
+    """Print the stage table to stderr (unless it went into the JSON output) and write the cProfile report."""
+    if args.profile is not None:
+        paths = profile.write_report(args.profile)
+        print(f"Profile written to {', '.join(paths)}", file=sys.stderr)
+    elif wants_timings(args) and (args.format != "json" or args.quiet):
+        sys.stderr.write(profile.format_table())
+
+
+def stream_files(args):
+    """Streaming mode of ``main``: print each differing section as soon as it is found."""
+    def on_section(section_diff):
+        if args.quiet:
+            return
+        if args.format == "json":
+            json.dump(section_diff.to_dict(), sys.stdout, default=str)
+            sys.stdout.write("\n")
+        else:
+            sys.stdout.write(format_section(section_diff, args.width))
+        sys.stdout.flush()
+
+    profile = build_profile(args)
+    try:
+        with profile.running():
+            result = stream.stream_diff(args.file1, args.file2, MODE_CHOICES[args.mode], profile, args.algorithm,
+                                        on_section=on_section, semantic_engine=args.semantic_engine,
+                                        identity_keys=args.identity_keys or engine.DEFAULT_IDENTITY_KEYS)
+    except INPUT_ERRORS as e:
+        print_input_error(e)
+        return 2
+    finally:
+        profile.finish()
+
+    if not args.quiet:
+        if args.format == "json":
+            payload = result.to_dict()
+            payload["yaml_backend"] = engine.yaml_backend
+            if wants_timings(args):
+                payload["timings"] = profile.to_dict()
+            json.dump(payload, sys.stdout, default=str)
+            sys.stdout.write("\n")
+        else:
+            counts = ", ".join(f"{result.counts[status]} {status}" for status in stream.SECTION_STATUSES)
+            sys.stdout.write(f"=== {counts} section(s) ===\n")
+            sys.stdout.write(format_summary(result))
+
+    write_timings(args, profile)
+    return 0 if result.identical else 1
+
+
+def format_update(result, changed_rows, paths, elapsed, width=60):
+    """Render the rows that changed in one re-comparison of watch mode."""
+    start, _, end = changed_rows
+    rows = result.rows[start:end]
+    # Rows after an edit that added or removed lines are only renumbered; skip the unchanged tail
+    while rows and rows[-1].left_tag in (engine.TAG_NORMAL, engine.TAG_EMPTY) \
+            and rows[-1].right_tag in (engine.TAG_NORMAL, engine.TAG_EMPTY):
+        rows.pop()
+    names = ", ".join(os.path.basename(path) for path in paths)
+    header = f"=== {time.strftime('%H:%M:%S')} {names} changed, compared in {elapsed * 1000:.0f} ms ===\n"
+    return header + format_rows(rows, width) + format_summary(result)
+
+
+def write_update(args, result, changed_rows, paths, elapsed):
+    """Print one comparison of watch mode; ``paths`` is None for the first one."""
+    if args.format == "json":
+        start, _, end = changed_rows
+        payload = {
+            "changed_files": paths or [args.file1, args.file2],
+            "elapsed": elapsed,
+            "identical": result.identical,
+            "difference_count": result.difference_count,
+            "changed_rows": list(changed_rows),
+            "rows": [row.to_dict() for row in result.rows[start:end]],
+        }
+        json.dump(payload, sys.stdout, default=str)
+        sys.stdout.write("\n")
+    elif paths is None:
+        sys.stdout.write(format_text(result, args.width))
+    else:
+        sys.stdout.write(format_update(result, changed_rows, paths, elapsed, args.width))
+    sys.stdout.flush()
+
+
+def watch_files(args):
+    """Watch mode of ``main``: compare again after every save until interrupted."""
+    incremental = IncrementalDiff(MODE_CHOICES[args.mode], args.algorithm, args.semantic_engine,
+                                  args.identity_keys or engine.DEFAULT_IDENTITY_KEYS)
+    changes = queue.Queue()
+    watcher = FileWatcher((args.file1, args.file2), changes.put).start()
+    paths = None
+    status = 2
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                result, changed_rows = incremental.update(engine.read_file(args.file1),
+                                                          engine.read_file(args.file2))
+            except INPUT_ERRORS as e:
+                incremental.reset()
+                print_input_error(e)
+            else:
+                elapsed = time.perf_counter() - started
+                status = 0 if result.identical else 1
+                if changed_rows is None:
+                    changed_rows = (0, 0, len(result.rows))
+                if not args.quiet:
+                    write_update(args, result, changed_rows, paths, elapsed)
+
+            paths = changes.get()
+            # Saves that arrived meanwhile are covered by the same comparison
+            while not changes.empty():
+                paths = sorted(set(paths) | set(changes.get()))
+    except KeyboardInterrupt:
+        return status
+    finally:
+        watcher.stop()
+
+
+def compare_directories(args):
+    """Directory mode of ``main``: summarize every pair of files."""
+    profile = build_profile(args)
+    try:
+        with profile.running():
+            result = directory.compare_directories(args.file1, args.file2, MODE_CHOICES[args.mode], profile,
+                                                   algorithm=args.algorithm,
+                                                   patterns=args.patterns or directory.DEFAULT_PATTERNS,
+                                                   jobs=args.jobs, semantic_engine=args.semantic_engine,
+                                                   identity_keys=args.identity_keys or engine.DEFAULT_IDENTITY_KEYS)
+    except INPUT_ERRORS as e:
+        print_input_error(e)
+        return 2
+    finally:
+        profile.finish()
+
+    if not args.quiet:
+        if args.format == "json":
+            payload = result.to_dict()
+            payload["yaml_backend"] = engine.yaml_backend
+            if wants_timings(args):
+                payload["timings"] = profile.to_dict()
+            json.dump(payload, sys.stdout, indent=2, default=str)
+            sys.stdout.write("\n")
+        else:
+            sys.stdout.write(format_directory(result, args.sort))
+
+    write_timings(args, profile)
+    if result.counts()[directory.STATUS_ERROR]:
+        return 2
+    return 0 if result.identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Comparison of whole directory trees (or glob matches) of YAML files.
+
+Files are paired by their path relative to each side's root. Pairs with
+the same size and content hash are reported identical without being
+parsed; the rest are diffed concurrently in a process pool, and only a
+summary (status and difference count) comes back for each pair. The full
+diff of a pair is computed again when the user opens it.
+"""
+
+import fnmatch
+import glob
+import hashlib
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import yaml
+
+import yamldiff_engine as engine
+from yamldiff_documents import CANCEL_POLL_SECONDS, worker_count
+
+DEFAULT_PATTERNS = ("*.yaml", "*.yml")
+
+STATUS_IDENTICAL = "identical"
+STATUS_CHANGED = "changed"
+STATUS_ONLY_LEFT = "only-left"
+STATUS_ONLY_RIGHT = "only-right"
+STATUS_ERROR = "error"
+# Sort order of the statuses: problems first
+STATUSES = (STATUS_ERROR, STATUS_CHANGED, STATUS_ONLY_LEFT, STATUS_ONLY_RIGHT, STATUS_IDENTICAL)
+
+SORT_KEYS = ("path", "status", "differences")
+
+# Bytes read at a time when hashing files
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def collect_files(location, patterns=DEFAULT_PATTERNS):
+    """
+    Map relative paths to file paths for a directory or a glob pattern.
+
+    A directory is searched recursively for file names matching ``patterns``.
+    A glob (``overlays/dev/**/*.yaml``) is expanded as is, and its matches are
+    keyed relative to the part of the pattern before the first wildcard.
+    """
+    files = {}
+    if glob.has_magic(location):
+        root = location
+        while glob.has_magic(root):
+            root = os.path.dirname(root)
+        for path in glob.glob(location, recursive=True):
+            if os.path.isfile(path):
+                files[os.path.relpath(path, root or ".")] = path
+        return files
+
+    if not os.path.isdir(location):
+        raise FileNotFoundError(f"No such directory: {location!r}")
+    for directory, subdirectories, names in os.walk(location):
+        subdirectories.sort()
+        for name in names:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, location)] = path
+    return files
+
+
+def pair_files(location1, location2, patterns=DEFAULT_PATTERNS):
+    """Pair the files of two locations by relative path: ``(relpath, path1, path2)`` with None for a missing side."""
+    files1 = collect_files(location1, patterns)
+    files2 = collect_files(location2, patterns)
+    return [(relpath, files1.get(relpath), files2.get(relpath)) for relpath in sorted(set(files1) | set(files2))]
+
+
+def file_digest(path):
+    """Hash of a file's bytes, read in chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def same_bytes(path1, path2):
+    """True if two files have identical content; different sizes are rejected without reading."""
+    if os.path.getsize(path1) != os.path.getsize(path2):
+        return False
+    return file_digest(path1) == file_digest(path2)
+
+
+def compare_file_pair(path1, path2, mode, algorithm=engine.DEFAULT_ALGORITHM, backend=None,
+                      semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Diff one pair of files and return ``(status, difference_count, error)``.
+
+    Runs in a worker process, so it returns only the summary instead of the
+    rows. Multi-document files are compared in-process (no nested pools). Any
+    failure becomes the pair's error, so one bad file never aborts the run.
+    """
+    if backend is not None:
+        engine.select_yaml_backend(backend)
+    try:
+        result = engine.diff_files(path1, path2, mode, algorithm=algorithm, jobs=1, semantic_engine=semantic_engine,
+                                   identity_keys=identity_keys)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError) as e:
+        return STATUS_ERROR, 0, str(e)
+    except Exception as e:
+        # Unexpected failures (a recursive anchor, a too deeply nested
+        # document, ...) are reported with their type
+        return STATUS_ERROR, 0, f"{type(e).__name__}: {e}"
+    if result.identical:
+        return STATUS_IDENTICAL, 0, None
+    return STATUS_CHANGED, result.difference_count, None
+
+
+class FileComparison:
+    """Summary of one pair of files in a directory comparison."""
+
+    def __init__(self, relpath, path1, path2, status, difference_count=0, error=None):
+        self.relpath = relpath
+        self.path1 = path1
+        self.path2 = path2
+        self.status = status
+        self.difference_count = difference_count
+        self.error = error
+
+    def to_dict(self):
+        """Return a JSON-friendly representation of the comparison."""
+        return {
+            "path": self.relpath,
+            "left": self.path1,
+            "right": self.path2,
+            "status": self.status,
+            "difference_count": self.difference_count,
+            "error": self.error,
+        }
+
+
+def sort_comparisons(comparisons, key="path", reverse=False):
+    """Sort file comparisons by ``path``, ``status`` or ``differences``."""
+    if key == "path":
+        sort_key = lambda comparison: comparison.relpath  # noqa: E731
+    elif key == "status":
+        sort_key = lambda comparison: (STATUSES.index(comparison.status), comparison.relpath)  # noqa: E731
+    elif key == "differences":
+        sort_key = lambda comparison: (comparison.difference_count, comparison.relpath)  # noqa: E731
+    else:
+        raise ValueError(f"Unknown sort key: {key!r}")
+    return sorted(comparisons, key=sort_key, reverse=reverse)
+
+
+class DirectoryResult:
+    """Result of comparing two directories: one FileComparison per relative path."""
+
+    def __init__(self, mode, location1, location2, comparisons):
+        self.mode = mode
+        self.location1 = location1
+        self.location2 = location2
+        self.comparisons = comparisons
+
+    @property
+    def identical(self):
+        """True if every file exists on both sides and compares equal."""
+        return all(comparison.status == STATUS_IDENTICAL for comparison in self.comparisons)
+
+    def counts(self):
+        """Number of files per status."""
+        counts = dict.fromkeys(STATUSES, 0)
+        for comparison in self.comparisons:
+            counts[comparison.status] += 1
+        return counts
+
+    def to_dict(self):
+        """Return a JSON-friendly representation of the result."""
+        return {
+            "mode": self.mode,
+            "left": self.location1,
+            "right": self.location2,
+            "identical": self.identical,
+            "counts": self.counts(),
+            "files": [comparison.to_dict() for comparison in self.comparisons],
+        }
+
+
+def compare_directories(location1, location2, mode=engine.MODE_SIDE_BY_SIDE, progress=None,
+                        algorithm=engine.DEFAULT_ALGORITHM, patterns=DEFAULT_PATTERNS, on_file=None, jobs=None,
+                        semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Compare two directories (or glob patterns) of YAML files.
+
+    ``on_file`` is called with each FileComparison as soon as it is known:
+    one-sided and byte-identical files first, diffed pairs as they finish.
+    Returns a DirectoryResult with the comparisons sorted by path.
+    """
+    engine.report(progress, "Listing files")
+    pairs = pair_files(location1, location2, patterns)
+    comparisons = []
+
+    def finish(comparison):
+        comparisons.append(comparison)
+        if on_file is not None:
+            on_file(comparison)
+
+    # Settle everything that needs no diff
+    engine.report(progress, "Hashing files")
+    to_diff = []
+    for relpath, path1, path2 in pairs:
+        if path1 is None:
+            finish(FileComparison(relpath, path1, path2, STATUS_ONLY_RIGHT, 1))
+        elif path2 is None:
+            finish(FileComparison(relpath, path1, path2, STATUS_ONLY_LEFT, 1))
+        else:
+            try:
+                identical = same_bytes(path1, path2)
+            except OSError as e:
+                finish(FileComparison(relpath, path1, path2, STATUS_ERROR, error=str(e)))
+                continue
+            if identical:
+                finish(FileComparison(relpath, path1, path2, STATUS_IDENTICAL))
+            else:
+                to_diff.append((relpath, path1, path2))
+
+    total = len(to_diff)
+    total_bytes = sum(os.path.getsize(path1) + os.path.getsize(path2) for _, path1, path2 in to_diff)
+    workers = worker_count(jobs, total, total_bytes)
+
+    def arguments(task):
+        _, path1, path2 = task
+        return path1, path2, mode, algorithm, engine.yaml_backend, semantic_engine, identity_keys
+
+    if workers <= 1:
+        for done, task in enumerate(to_diff):
+            engine.report(progress, "Comparing files", done / total)
+            finish(FileComparison(*task, *compare_file_pair(*arguments(task))))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = {executor.submit(compare_file_pair, *arguments(task)): task for task in to_diff}
+            while pending:
+                done, _ = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    try:
+                        summary = future.result()
+                    except Exception as e:
+                        # The worker process died (out of memory, crash) or the result could not be sent back
+                        summary = STATUS_ERROR, 0, f"{type(e).__name__}: {e}"
+                    finish(FileComparison(*task, *summary))
+                engine.report(progress, "Comparing files", (total - len(pending)) / total)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return DirectoryResult(mode, location1, location2, sort_comparisons(comparisons))
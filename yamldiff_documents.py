@@ -0,0 +1,340 @@
+"""
+Document-by-document comparison of multi-document YAML streams.
+
+Kubernetes bundles and similar files hold several ``---`` separated
+documents. Comparing them as one blob either fails (the semantic parser
+expects a single document) or drowns real changes in reordering noise, so
+the semantic and normalized modes split both streams, match documents
+across the files and diff each matched pair on its own:
+
+- documents with ``kind`` and ``metadata.name`` are matched by
+  ``(kind, metadata.namespace, metadata.name)``
+- all other documents are matched by their position among the unkeyed ones
+- a document without a partner is shown as removed or added
+
+Large streams are diffed in parallel in a process pool. Each pair is
+reported through ``on_document`` as soon as it finishes, so callers can show
+partial results while the rest of the bundle is still being compared.
+"""
+
+import os
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import accumulate, chain
+
+import yamldiff_engine as engine
+
+# Streams smaller than this (both files together) are diffed in-process;
+# below it starting worker processes costs more than it saves
+PARALLEL_MIN_BYTES = 256 * 1024
+
+# How often (seconds) a pool-backed comparison checks for cancellation
+CANCEL_POLL_SECONDS = 0.1
+
+
+def document_key(data):
+    """Identity of a Kubernetes-style document, or None if it has no kind and name."""
+    if not isinstance(data, dict):
+        return None
+    metadata = data.get("metadata")
+    if not isinstance(metadata, dict):
+        return None
+    kind = data.get("kind")
+    name = metadata.get("name")
+    if kind is None or name is None:
+        return None
+    return (str(kind), str(metadata.get("namespace") or ""), str(name))
+
+
+def document_label(key, index):
+    """Human-readable name of a document: ``Kind/namespace/name`` or its position."""
+    if key is None:
+        return f"document {index + 1}"
+    kind, namespace, name = key
+    return "/".join(part for part in (kind, namespace, name) if part)
+
+
+def match_documents(documents1, documents2):
+    """
+    Pair up the documents of two streams.
+
+    Returns a list of ``(index1, index2)`` tuples in display order, with None
+    for a document that only exists on one side. Pairs follow the left-hand
+    stream; right-only documents are placed after the right-hand document
+    that precedes them.
+    """
+    keys1 = [document_key(document.data) for document in documents1]
+    keys2 = [document_key(document.data) for document in documents2]
+
+    right_by_key = {}
+    for index2, key in enumerate(keys2):
+        if key is not None:
+            right_by_key.setdefault(key, []).append(index2)
+
+    partner = {}
+    unkeyed1 = []
+    for index1, key in enumerate(keys1):
+        if key is None:
+            unkeyed1.append(index1)
+        elif right_by_key.get(key):
+            partner[index1] = right_by_key[key].pop(0)
+    unkeyed2 = [index2 for index2, key in enumerate(keys2) if key is None]
+    partner.update(zip(unkeyed1, unkeyed2))
+
+    # Sort keys: left documents by position, right-only documents right after
+    # the pair holding the previous right-hand document
+    order = {}
+    pairs = []
+    for index1 in range(len(documents1)):
+        index2 = partner.get(index1)
+        pairs.append(((index1, 0), index1, index2))
+        if index2 is not None:
+            order[index2] = (index1, 0)
+    for index2 in range(len(documents2)):
+        if index2 not in order:
+            previous = order.get(index2 - 1, (-1, 0))
+            order[index2] = (previous[0], previous[1] + 1)
+            pairs.append((order[index2], None, index2))
+
+    pairs.sort(key=lambda pair: pair[0])
+    return [(index1, index2) for _, index1, index2 in pairs]
+
+
+def offset_rows(rows, left_offset, right_offset):
+    """Shift the line numbers of AlignedRows from document-relative to file-relative."""
+    rows.shift(left_offset, right_offset)
+
+
+def diff_document_pair(source1, source2, mode, algorithm=engine.DEFAULT_ALGORITHM, backend=None, separator="---",
+                       semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Compare one matched pair of documents (None for a missing side).
+
+    Runs in a worker process for large streams, so it only takes picklable
+    arguments and selects the YAML backend itself. Semantic rows are numbered
+    by their line in the original file; normalized rows by their line in the
+    document's normalized dump, which starts with a ``separator`` line naming
+    the document.
+    """
+    if backend is not None:
+        engine.select_yaml_backend(backend)
+
+    if mode == engine.MODE_NORMALIZED:
+        lines1 = [separator] + source1.normalized_lines if source1 is not None else []
+        lines2 = [separator] + source2.normalized_lines if source2 is not None else []
+        opcodes, rows = engine.align_lines(lines1, lines2, algorithm=algorithm)
+        identical = source1 is not None and source2 is not None and source1.normalized == source2.normalized
+        return engine.DiffResult(mode, rows, identical, opcodes=opcodes)
+
+    if source1 is None or source2 is None:
+        # The whole document was added or removed
+        if source1 is None:
+            rows = engine.AlignedRows([], source2.lines)
+            rows.append_span(engine.SPAN_RIGHT, 0, 0, engine.PAIR_ADDED * len(source2.lines))
+            offset_rows(rows, 0, source2.first_line)
+        else:
+            rows = engine.AlignedRows(source1.lines, [])
+            rows.append_span(engine.SPAN_LEFT, 0, 0, engine.PAIR_REMOVED * len(source1.lines))
+            offset_rows(rows, source1.first_line, 0)
+        return engine.DiffResult(mode, rows, False)
+
+    result = engine.semantic_diff(source1, source2, semantic_engine=semantic_engine, identity_keys=identity_keys)
+    offset_rows(result.rows, source1.first_line, source2.first_line)
+    return result
+
+
+class DocumentDiff:
+    """The comparison of one matched pair of documents from two streams."""
+
+    def __init__(self, position, total, left_index, right_index, label, result):
+        # Place of the pair in display order, out of ``total`` pairs
+        self.position = position
+        self.total = total
+        self.left_index = left_index
+        self.right_index = right_index
+        self.label = label
+        self.result = result
+
+    @property
+    def status(self):
+        """``identical``, ``changed``, ``removed`` (left only) or ``added`` (right only)."""
+        if self.right_index is None:
+            return "removed"
+        if self.left_index is None:
+            return "added"
+        return "identical" if self.result.identical else "changed"
+
+    @property
+    def difference_count(self):
+        """Differences inside the pair; a one-sided document counts as one."""
+        if self.left_index is None or self.right_index is None:
+            return 1
+        return self.result.difference_count
+
+    def to_dict(self):
+        """Return a JSON-friendly summary of the pair (rows are in the stream result)."""
+        return {
+            "label": self.label,
+            "status": self.status,
+            "left_document": self.left_index,
+            "right_document": self.right_index,
+            "difference_count": self.difference_count,
+            "opcodes": [list(opcode) for opcode in self.result.opcodes],
+            "changes": self.result.changes,
+        }
+
+
+class CombinedRows:
+    """
+    The rows of several results one after the other, without copying them.
+
+    A read-only sequence of DiffRows over AlignedRows (or lists of rows):
+    indexing a row looks up its part, slicing returns a list.
+    """
+
+    def __init__(self, parts):
+        self.parts = [rows for rows in parts if len(rows)]
+        # Index of the first row of every part, and the total at the end
+        self._starts = list(accumulate(map(len, self.parts), initial=0))
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def __iter__(self):
+        return chain.from_iterable(self.parts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            rows = []
+            part = bisect_right(self._starts, start) - 1
+            while start < stop:
+                part_start = self._starts[part]
+                end = min(self._starts[part + 1], stop)
+                rows.extend(self.parts[part][start - part_start:end - part_start])
+                start = end
+                part += 1
+            return rows
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        part = bisect_right(self._starts, index) - 1
+        return self.parts[part][index - self._starts[part]]
+
+
+def combine_rows(documents):
+    """The rows of the finished pairs (None entries are skipped) in display order."""
+    return CombinedRows(document.result.rows for document in documents if document is not None)
+
+
+class StreamDiffResult(engine.DiffResult):
+    """DiffResult of two multi-document streams, with the per-document results."""
+
+    def __init__(self, mode, documents):
+        changes = {}
+        changed_keys = set()
+        for document in documents:
+            if document.status in ("removed", "added"):
+                changes.setdefault(f"document_{document.status}", []).append(document.label)
+                continue
+            for category, paths in document.result.changes.items():
+                changes.setdefault(category, []).extend(f"{document.label}: {path}" for path in paths)
+            changed_keys.update(document.result.changed_keys)
+
+        identical = all(document.status == "identical" for document in documents)
+        super().__init__(mode, combine_rows(documents), identical, changes=changes, changed_keys=changed_keys)
+        self.documents = documents
+
+    @property
+    def difference_count(self):
+        """Sum of the per-document difference counts."""
+        return sum(document.difference_count for document in self.documents)
+
+    def to_dict(self):
+        """Return a JSON-friendly representation, including one entry per document pair."""
+        result = super().to_dict()
+        result["documents"] = [document.to_dict() for document in self.documents]
+        return result
+
+
+def worker_count(jobs, pair_count, total_bytes):
+    """Number of processes for ``pair_count`` tasks: ``jobs`` if given, else one per CPU for large inputs."""
+    if jobs is None:
+        jobs = (os.cpu_count() or 1) if total_bytes >= PARALLEL_MIN_BYTES else 1
+    return max(1, min(jobs, pair_count))
+
+
+def diff_streams(source1, source2, mode, progress=None, algorithm=engine.DEFAULT_ALGORITHM,
+                 on_document=None, jobs=None, semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE,
+                 identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Compare two YAML streams document by document (semantic or normalized mode).
+
+    ``on_document`` is called with each DocumentDiff as soon as it finishes,
+    in completion order. Returns a StreamDiffResult once every pair is done.
+    """
+    source1 = engine.as_source(source1)
+    source2 = engine.as_source(source2)
+    documents1 = source1.documents
+    documents2 = source2.documents
+
+    # Parsing stays in this process: matching needs the data, and parsed
+    # documents are kept by the content cache for the next comparison
+    report_total = max(len(documents1) + len(documents2), 1)
+    for number, document in enumerate(documents1 + documents2):
+        engine.report(progress, "Parsing YAML", number / report_total)
+        document.parsed
+
+    engine.report(progress, "Matching documents")
+    pairs = match_documents(documents1, documents2)
+    total = len(pairs)
+    finished = [None] * total
+
+    def describe(index1, index2):
+        index, documents = (index1, documents1) if index1 is not None else (index2, documents2)
+        key = document_key(documents[index].data)
+        label = document_label(key, index)
+        return label, f"--- # {label}" if key is not None else "---"
+
+    tasks = []
+    for position, (index1, index2) in enumerate(pairs):
+        label, separator = describe(index1, index2)
+        tasks.append((position, index1, index2, label, separator))
+
+    def finish(task, result):
+        position, index1, index2, label, _ = task
+        finished[position] = DocumentDiff(position, total, index1, index2, label, result)
+        if on_document is not None:
+            on_document(finished[position])
+        done = sum(1 for document in finished if document is not None)
+        engine.report(progress, "Comparing documents", done / total)
+
+    def arguments(task):
+        _, index1, index2, _, separator = task
+        left = documents1[index1] if index1 is not None else None
+        right = documents2[index2] if index2 is not None else None
+        return left, right, mode, algorithm, engine.yaml_backend, separator, semantic_engine, identity_keys
+
+    workers = worker_count(jobs, total, len(source1.text) + len(source2.text))
+    if workers <= 1:
+        for task in tasks:
+            engine.report(progress, "Comparing documents", task[0] / total)
+            finish(task, diff_document_pair(*arguments(task)))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            pending = {executor.submit(diff_document_pair, *arguments(task)): task for task in tasks}
+            while pending:
+                done, _ = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(pending.pop(future), future.result())
+                if not done:
+                    # Lets a DiffCancelled from the progress callback stop the loop
+                    engine.report(progress, "Comparing documents", (total - len(pending)) / total)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return StreamDiffResult(mode, finished)
@@ -0,0 +1,1262 @@
+"""
+Headless diff engine for the YAML Diff Tool.
+
+Everything in here is pure Python and returns structured results, so it can
+be driven by the GUI in ``yamldiff.py`` or by the command-line entry point in
+``yamldiff_cli.py`` without ever importing tkinter.
+"""
+
+import datetime
+import difflib
+import hashlib
+import marshal
+import re
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import chain, repeat
+from operator import attrgetter, itemgetter
+
+import yaml
+
+import yamldiff_linediff as linediff
+from yamldiff_linediff import DEFAULT_ALGORITHM
+
+# YAML backends: libyaml's C parser/emitter when PyYAML was built with it,
+# otherwise the pure-Python implementation. Both produce the same data and
+# byte-identical normalized dumps (see benchmarks/bench_yaml_backend.py).
+YAML_BACKEND_LIBYAML = "libyaml"
+YAML_BACKEND_PYTHON = "python"
+YAML_BACKENDS = (YAML_BACKEND_LIBYAML, YAML_BACKEND_PYTHON)
+LIBYAML_AVAILABLE = getattr(yaml, "__with_libyaml__", False)
+
+_YAML_CLASSES = {YAML_BACKEND_PYTHON: (yaml.SafeLoader, yaml.SafeDumper)}
+if LIBYAML_AVAILABLE:
+    _YAML_CLASSES[YAML_BACKEND_LIBYAML] = (yaml.CSafeLoader, yaml.CSafeDumper)
+
+yaml_backend = YAML_BACKEND_LIBYAML if LIBYAML_AVAILABLE else YAML_BACKEND_PYTHON
+
+# Display tags shared by every renderer
+TAG_NORMAL = "normal"
+TAG_CHANGED = "changed"
+TAG_REMOVED = "removed"
+TAG_ADDED = "added"
+TAG_EMPTY = "empty"
+
+# Tags as AlignedRows stores them: each row is one byte holding the index of
+# its left tag in the high nibble and of its right tag in the low one
+ROW_TAGS = (TAG_NORMAL, TAG_CHANGED, TAG_REMOVED, TAG_ADDED, TAG_EMPTY)
+
+# Comparison modes
+MODE_SIDE_BY_SIDE = "Side-by-Side"
+MODE_SEMANTIC = "Semantic"
+MODE_NORMALIZED = "Normalized"
+MODES = (MODE_SIDE_BY_SIDE, MODE_SEMANTIC, MODE_NORMALIZED)
+
+# Two lines in a replace block that are at least this similar are shown as
+# "changed" instead of "removed" + "added"
+SIMILARITY_THRESHOLD = 0.3
+
+# Line pairs remembered by the similarity and intra-line span caches
+SIMILARITY_CACHE_SIZE = 65536
+
+# DeepDiff categories that mark a path as semantically different
+SEMANTIC_CATEGORIES = (
+    "dictionary_item_added",
+    "dictionary_item_removed",
+    "values_changed",
+    "type_changes",
+    "iterable_item_added",
+    "iterable_item_removed",
+)
+
+# Semantic diff engines: the built-in structural tree diff (see
+# yamldiff_treediff.py) or DeepDiff with ignore_order
+SEMANTIC_ENGINE_TREE = "tree"
+SEMANTIC_ENGINE_DEEPDIFF = "deepdiff"
+SEMANTIC_ENGINES = (SEMANTIC_ENGINE_TREE, SEMANTIC_ENGINE_DEEPDIFF)
+DEFAULT_SEMANTIC_ENGINE = SEMANTIC_ENGINE_TREE
+
+# Fields (dotted for nested ones) that identify a record in a list, tried in
+# order; the tree engine matches changed list items by them
+DEFAULT_IDENTITY_KEYS = ("name", "id", "metadata.name")
+
+# Categories whose paths only exist in the right / left document
+RIGHT_ONLY_CATEGORIES = ("dictionary_item_added", "iterable_item_added")
+LEFT_ONLY_CATEGORIES = ("dictionary_item_removed", "iterable_item_removed")
+
+GAP_TEXT = "     | \n"
+
+# Lines that start and end a document in a multi-document stream
+DOCUMENT_START = re.compile(r"---(?:\s|$)")
+DOCUMENT_END = re.compile(r"\.\.\.(?:\s|$)")
+
+# Sort rank of each kind of value in normalized lists: mixed-type lists order
+# by type first, so 1 and "1" never collide the way their str() forms do
+(RANK_NONE, RANK_BOOL, RANK_NUMBER, RANK_STRING, RANK_BYTES, RANK_DATE,
+ RANK_LIST, RANK_DICT, RANK_OTHER) = range(9)
+
+# Leading entries of a dict or list that take part in its sort key before
+# the content digest; enough to order typical lists of records by their
+# first fields
+SORT_PREFIX_ENTRIES = 4
+
+# Containers with at most this many entries, nested ones included, use their
+# flattened entry keys as their sort key; only bigger ones pay for a prefix
+# and a content digest
+SMALL_KEY_ENTRIES = 32
+
+# Number of aligned rows built between two progress reports
+PROGRESS_INTERVAL = 5000
+
+
+class DiffCancelled(Exception):
+    """Raised from a progress callback to abandon a comparison that is no longer wanted."""
+
+
+def report(progress, stage, fraction=None):
+    """Forward a progress update if a callback was given (fraction None means unknown)."""
+    if progress is not None:
+        progress(stage, fraction)
+
+
+def format_line(line_num, text):
+    """Format one display line as ``NUM | text``; a None line number is a gap."""
+    if line_num is None:
+        return GAP_TEXT
+    return f"{line_num:4d} | {text}\n"
+
+
+class DiffRow:
+    """One aligned row of a side-by-side diff (a None line number is a gap)."""
+
+    __slots__ = ("left_num", "left_text", "left_tag", "right_num", "right_text", "right_tag")
+
+    def __init__(self, left_num, left_text, left_tag, right_num, right_text, right_tag):
+        self.left_num = left_num
+        self.left_text = left_text
+        self.left_tag = left_tag
+        self.right_num = right_num
+        self.right_text = right_text
+        self.right_tag = right_tag
+
+    def to_dict(self):
+        """Return a JSON-friendly representation of the row."""
+        return {
+            "left": {"line": self.left_num, "text": self.left_text, "tag": self.left_tag},
+            "right": {"line": self.right_num, "text": self.right_text, "tag": self.right_tag},
+        }
+
+
+def tag_pair(left_tag, right_tag):
+    """The AlignedRows byte of a row with these tags, as a one-byte ``bytes`` to repeat."""
+    return bytes((ROW_TAGS.index(left_tag) << 4 | ROW_TAGS.index(right_tag),))
+
+
+PAIR_EQUAL = tag_pair(TAG_NORMAL, TAG_NORMAL)
+PAIR_CHANGED = tag_pair(TAG_CHANGED, TAG_CHANGED)
+PAIR_REPLACED = tag_pair(TAG_REMOVED, TAG_ADDED)
+PAIR_REMOVED = tag_pair(TAG_REMOVED, TAG_EMPTY)
+PAIR_ADDED = tag_pair(TAG_EMPTY, TAG_ADDED)
+
+# Tag of each side by AlignedRows tag byte
+_LEFT_TAG_NAMES = tuple(ROW_TAGS[code >> 4] if code >> 4 < len(ROW_TAGS) else None for code in range(256))
+_RIGHT_TAG_NAMES = tuple(ROW_TAGS[code & 15] if code & 15 < len(ROW_TAGS) else None for code in range(256))
+
+# Which sides a span of AlignedRows takes lines from
+SPAN_LEFT = 1
+SPAN_RIGHT = 2
+SPAN_BOTH = SPAN_LEFT | SPAN_RIGHT
+
+
+class AlignedRows:
+    """
+    The aligned rows of a diff, stored compactly.
+
+    Rows come in spans that take consecutive lines from the left list, the
+    right list or both (opposite a gap on the other side): about one span
+    per opcode block, so an equal block of any length is a few integers.
+    Each span keeps its first row and first line index on each side in
+    arrays, and every row adds one byte with its pair of tags. The line
+    lists are referenced, never copied, so the rows of a diff cost about a
+    byte per row on top of the files instead of a DiffRow per row.
+
+    The object is a read-only sequence of DiffRows: indexing, slicing and
+    iterating build the rows asked for on the fly, so changing one of them
+    does not change the sequence. Line numbers are the line's index + 1 plus
+    ``left_offset`` / ``right_offset`` (see ``shift()``).
+    """
+
+    __slots__ = ("lines1", "lines2", "left_offset", "right_offset",
+                 "_row_starts", "_left_starts", "_right_starts", "_sides", "_tags")
+
+    def __init__(self, lines1, lines2):
+        self.lines1 = lines1
+        self.lines2 = lines2
+        self.left_offset = 0
+        self.right_offset = 0
+        self._row_starts = array("i")
+        self._left_starts = array("i")
+        self._right_starts = array("i")
+        self._sides = bytearray()
+        self._tags = bytearray()
+
+    def append_span(self, sides, left_start, right_start, tags):
+        """
+        Add a row for every byte of ``tags`` (see ``tag_pair()``).
+
+        The rows take consecutive lines from ``sides`` (SPAN_LEFT,
+        SPAN_RIGHT or SPAN_BOTH), starting at these line indexes; the start
+        of a side without lines is ignored. A span that continues the last
+        one is merged into it.
+        """
+        if not tags:
+            return
+        row = len(self._tags)
+        if self._sides and self._sides[-1] == sides:
+            length = row - self._row_starts[-1]
+            if ((not sides & SPAN_LEFT or self._left_starts[-1] + length == left_start) and
+                    (not sides & SPAN_RIGHT or self._right_starts[-1] + length == right_start)):
+                self._tags += tags
+                return
+        self._row_starts.append(row)
+        self._left_starts.append(left_start)
+        self._right_starts.append(right_start)
+        self._sides.append(sides)
+        self._tags += tags
+
+    def append_rows(self, rows, start=0, stop=None, left_shift=0, right_shift=0):
+        """
+        Add rows ``start`` to ``stop`` of another AlignedRows.
+
+        Their line indexes move by ``left_shift`` / ``right_shift`` into this
+        object's line lists; line number offsets of ``rows`` are ignored.
+        """
+        stop = len(rows) if stop is None else stop
+        span = max(bisect_right(rows._row_starts, start) - 1, 0)
+        while start < stop:
+            span_start = rows._row_starts[span]
+            span_end = rows._row_starts[span + 1] if span + 1 < len(rows._sides) else len(rows._tags)
+            end = min(span_end, stop)
+            self.append_span(rows._sides[span],
+                             rows._left_starts[span] + start - span_start + left_shift,
+                             rows._right_starts[span] + start - span_start + right_shift,
+                             rows._tags[start:end])
+            start = end
+            span += 1
+
+    def shift(self, left_offset, right_offset):
+        """Add to the line numbers of every row (e.g. from document-relative to file-relative)."""
+        self.left_offset += left_offset
+        self.right_offset += right_offset
+
+    def pane_lines(self, side, start=0, stop=None):
+        """Iterate ``(line_num, text, tag)`` of one side ("left" or "right") of rows ``start`` to ``stop``."""
+        if side == "left":
+            lines, line_starts, offset, span_side, tag_names = (self.lines1, self._left_starts, self.left_offset,
+                                                                SPAN_LEFT, _LEFT_TAG_NAMES)
+        else:
+            lines, line_starts, offset, span_side, tag_names = (self.lines2, self._right_starts, self.right_offset,
+                                                                SPAN_RIGHT, _RIGHT_TAG_NAMES)
+        tags = self._tags
+        row_starts = self._row_starts
+        stop = len(tags) if stop is None else stop
+        parts = []
+        span = bisect_right(row_starts, start) - 1
+        while start < stop:
+            span_start = row_starts[span]
+            end = min(row_starts[span + 1] if span + 1 < len(row_starts) else len(tags), stop)
+            span_tags = map(tag_names.__getitem__, tags[start:end])
+            if self._sides[span] & span_side:
+                first_line = line_starts[span] + start - span_start
+                last_line = first_line + end - start
+                parts.append(zip(range(first_line + 1 + offset, last_line + 1 + offset),
+                                 lines[first_line:last_line], span_tags))
+            else:
+                parts.append(zip(repeat(None), repeat(None), span_tags))
+            start = end
+            span += 1
+        return chain.from_iterable(parts)
+
+    def find(self, pair, start=0, stop=None):
+        """Yield the index of every row between ``start`` and ``stop`` whose tag byte is ``pair``."""
+        tags = self._tags
+        stop = len(tags) if stop is None else stop
+        index = tags.find(pair, start, stop)
+        while index >= 0:
+            yield index
+            index = tags.find(pair, index + 1, stop)
+
+    def _rows(self, start, stop):
+        """Yield the DiffRows of rows ``start`` to ``stop``."""
+        for left, right in zip(self.pane_lines("left", start, stop), self.pane_lines("right", start, stop)):
+            yield DiffRow(*left, *right)
+
+    def __len__(self):
+        return len(self._tags)
+
+    def __iter__(self):
+        return self._rows(0, len(self._tags))
+
+    def __getitem__(self, index):
+        """A DiffRow, or a list of them for a slice."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._tags))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return list(self._rows(start, stop))
+        if index < 0:
+            index += len(self._tags)
+        if not 0 <= index < len(self._tags):
+            raise IndexError("row index out of range")
+        return next(self._rows(index, index + 1))
+
+    def to_columns(self):
+        """The rows as ``(lines1, lines2, left_offset, right_offset, spans, tags)``; see ``from_columns()``."""
+        spans = (self._row_starts.tobytes(), self._left_starts.tobytes(), self._right_starts.tobytes(),
+                 bytes(self._sides))
+        return self.lines1, self.lines2, self.left_offset, self.right_offset, spans, bytes(self._tags)
+
+    @classmethod
+    def from_columns(cls, lines1, lines2, left_offset, right_offset, spans, tags):
+        """Rebuild the rows saved by ``to_columns()``."""
+        rows = cls(lines1, lines2)
+        rows.shift(left_offset, right_offset)
+        row_starts, left_starts, right_starts, sides = spans
+        rows._row_starts.frombytes(row_starts)
+        rows._left_starts.frombytes(left_starts)
+        rows._right_starts.frombytes(right_starts)
+        rows._sides[:] = sides
+        rows._tags[:] = tags
+        if not len(rows._row_starts) == len(rows._left_starts) == len(rows._right_starts) == len(sides):
+            raise ValueError("Span columns differ in length")
+        return rows
+
+
+def pane_runs(rows, side, start=0, end=None):
+    """
+    Coalesce one pane of aligned rows (``rows[start:end]``) into ``(text, tag)`` runs.
+
+    Consecutive lines that share a tag are joined into a single string so a
+    renderer can push a whole pane to its widget in a handful of calls.
+    """
+    if isinstance(rows, AlignedRows):
+        # Read the side straight from the spans, without building DiffRows
+        lines = rows.pane_lines(side, start, len(rows) if end is None else min(end, len(rows)))
+    else:
+        if side == "left":
+            get_line = attrgetter("left_num", "left_text", "left_tag")
+        else:
+            get_line = attrgetter("right_num", "right_text", "right_tag")
+        lines = map(get_line, rows[start:end])
+
+    runs = []
+    current_tag = None
+    current_lines = []
+    for line_num, text, tag in lines:
+        if tag != current_tag:
+            if current_lines:
+                runs.append(("".join(current_lines), current_tag))
+            current_tag = tag
+            current_lines = []
+        current_lines.append(format_line(line_num, text))
+    if current_lines:
+        runs.append(("".join(current_lines), current_tag))
+    return runs
+
+
+def changed_rows(rows, start=0, end=None):
+    """Yield ``(index, row)`` for the rows of ``rows[start:end]`` tagged "changed" on both sides."""
+    if isinstance(rows, AlignedRows):
+        for index in rows.find(PAIR_CHANGED, start, len(rows) if end is None else min(end, len(rows))):
+            yield index, rows[index]
+        return
+    for index, row in enumerate(rows[start:end], start):
+        if row.left_tag == TAG_CHANGED and row.right_tag == TAG_CHANGED:
+            yield index, row
+
+
+class DiffResult:
+    """Structured result of comparing two YAML documents."""
+
+    def __init__(self, mode, rows, identical, opcodes=None, changes=None, changed_keys=None):
+        self.mode = mode
+        self.rows = rows
+        self.identical = identical
+        self.opcodes = opcodes or []
+        self.changes = changes or {}
+        self.changed_keys = changed_keys or set()
+
+    @property
+    def difference_count(self):
+        """Number of differences: semantic keys, or non-equal opcode blocks."""
+        if self.mode == MODE_SEMANTIC:
+            return len(self.changed_keys)
+        return sum(1 for opcode in self.opcodes if opcode[0] != "equal")
+
+    def to_dict(self):
+        """Return a JSON-friendly representation of the result."""
+        return {
+            "mode": self.mode,
+            "identical": self.identical,
+            "difference_count": self.difference_count,
+            "opcodes": [list(opcode) for opcode in self.opcodes],
+            "changes": self.changes,
+            "changed_keys": sorted(self.changed_keys),
+            "rows": [row.to_dict() for row in self.rows],
+        }
+
+
+def select_yaml_backend(name=None):
+    """
+    Choose the YAML backend used for all parsing and dumping.
+
+    ``None`` picks libyaml when available. Asking for libyaml when PyYAML was
+    built without it raises ValueError. Returns the active backend name.
+    """
+    global yaml_backend
+    if name is None:
+        name = YAML_BACKEND_LIBYAML if LIBYAML_AVAILABLE else YAML_BACKEND_PYTHON
+    if name not in _YAML_CLASSES:
+        if name == YAML_BACKEND_LIBYAML:
+            raise ValueError("PyYAML was built without libyaml; the C backend is not available")
+        raise ValueError(f"Unknown YAML backend: {name!r}")
+    yaml_backend = name
+    return yaml_backend
+
+
+def yaml_loader(backend=None):
+    """SafeLoader class of a backend (the active one by default)."""
+    return _YAML_CLASSES[backend or yaml_backend][0]
+
+
+def yaml_dumper(backend=None):
+    """SafeDumper class of a backend (the active one by default)."""
+    return _YAML_CLASSES[backend or yaml_backend][1]
+
+
+def read_file(path):
+    """Read a YAML file as UTF-8 text."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def split_documents(text):
+    """
+    Split a ``---`` separated YAML stream into ``(first_line, text)`` chunks.
+
+    Every chunk parses as a single document and the chunks concatenate back
+    to the original text, so line numbers map by adding ``first_line``
+    (0-based). Leading comments and directives stay with the document that
+    follows them, and trailing comments with the one before; like
+    ``yaml.safe_load_all``, a comment-only prologue is not a document.
+    """
+    chunks = []
+    first_line = 0
+    lines = []
+    started = False  # the chunk has a "---" marker or content
+    for number, line in enumerate(text.splitlines(keepends=True)):
+        if DOCUMENT_START.match(line):
+            if started:
+                chunks.append((first_line, "".join(lines)))
+                first_line = number
+                lines = []
+            started = True
+            lines.append(line)
+        elif DOCUMENT_END.match(line):
+            lines.append(line)
+            chunks.append((first_line, "".join(lines)))
+            first_line = number + 1
+            lines = []
+            started = False
+        else:
+            lines.append(line)
+            stripped = line.strip()
+            if stripped and not stripped.startswith(("#", "%")):
+                started = True
+
+    if started or not chunks:
+        chunks.append((first_line, "".join(lines)))
+    elif lines:
+        # Only comments after the last document end
+        last_first_line, last_text = chunks[-1]
+        chunks[-1] = (last_first_line, last_text + "".join(lines))
+    return chunks
+
+
+def extract_key_from_path(path):
+    """Extract the key name from a DeepDiff path like root['key']['subkey']."""
+    # Extract all keys from the path
+    keys = re.findall(r"\['([^']+)'\]", str(path))
+    # Return the last (most specific) key
+    return keys[-1] if keys else ""
+
+
+def load_with_line_index(content, backend=None):
+    """
+    Parse one YAML document and record where every node lives in the source.
+
+    Returns ``(data, index)``. The index maps a path tuple (dict keys and list
+    positions, as they appear in the loaded data) to the 0-based, inclusive
+    ``(first_line, last_line)`` range of that entry; a mapping entry starts at
+    its key. The document is composed once and constructed from the same node
+    tree, so this costs no more than ``yaml.safe_load``.
+    """
+    loader = yaml_loader(backend)(content)
+    try:
+        root = loader.get_single_node()
+        if root is None:
+            return None, {}
+
+        index = {}
+        walked = set()
+        stack = [((), root, root)]
+        while stack:
+            path, start_node, node = stack.pop()
+            end_mark = node.end_mark
+            # A block collection ends where the next token starts; when only
+            # indentation precedes it there, the collection ended on an
+            # earlier line (blank and comment lines are trimmed when marking)
+            last_line = end_mark.line
+            if not content[end_mark.index - end_mark.column:end_mark.index].strip():
+                last_line -= 1
+            first_line = start_node.start_mark.line
+            index[path] = (first_line, max(first_line, last_line))
+
+            # Aliased (or recursive) collections are only indexed where they are defined
+            if id(node) in walked:
+                continue
+            walked.add(id(node))
+
+            if isinstance(node, yaml.MappingNode):
+                # Resolve merge keys (``<<: *base``) into the merged entries, as
+                # the constructor does; the mapping's own keys override them
+                loader.flatten_mapping(node)
+                entries = {}
+                for key_node, value_node in node.value:
+                    key = loader.construct_object(key_node, deep=True)
+                    try:
+                        entries[key] = (key_node, value_node)
+                    except TypeError:
+                        # Unhashable complex key; its entry falls back to the parent
+                        continue
+                for key, (key_node, value_node) in entries.items():
+                    stack.append((path + (key,), key_node, value_node))
+            elif isinstance(node, yaml.SequenceNode):
+                for position, item_node in enumerate(node.value):
+                    stack.append((path + (position,), item_node, item_node))
+
+        return loader.construct_document(root), index
+    finally:
+        loader.dispose()
+
+
+def lookup_line_range(index, path):
+    """Line range for a path, falling back to the closest indexed ancestor."""
+    path = tuple(path)
+    while path not in index and path:
+        path = path[:-1]
+    return index.get(path)
+
+
+def mark_line_range(flags, lines, line_range):
+    """Flag the lines of a range, skipping trailing blank and comment lines."""
+    first_line, last_line = line_range
+    last_line = min(last_line, len(lines) - 1)
+    while last_line > first_line and (not lines[last_line].strip() or lines[last_line].lstrip().startswith("#")):
+        last_line -= 1
+    flags[first_line:last_line + 1] = b"\x01" * (last_line + 1 - first_line)
+
+
+def scalar_sort_key(value):
+    """Canonical sort key of a scalar: its type rank, then its value."""
+    if value is None:
+        return (RANK_NONE,)
+    if isinstance(value, bool):
+        return (RANK_BOOL, value)
+    if isinstance(value, (int, float)):
+        if value != value:
+            # NaN compares unequal to everything; sort it after all numbers
+            return (RANK_NUMBER, 1, 0, "float")
+        return (RANK_NUMBER, 0, value, type(value).__name__)
+    if isinstance(value, str):
+        return (RANK_STRING, value)
+    if isinstance(value, bytes):
+        return (RANK_BYTES, value)
+    if isinstance(value, datetime.date):
+        # Naive and aware datetimes (and dates) cannot be compared directly
+        return (RANK_DATE, value.isoformat())
+    if isinstance(value, (set, frozenset)):
+        return (RANK_OTHER, type(value).__name__, tuple(sorted(scalar_sort_key(item) for item in value)))
+    return (RANK_OTHER, type(value).__name__, repr(value))
+
+
+def _container_key(rank, entries, size):
+    """
+    Canonical key of a dict or list from the sorted keys of its entries.
+
+    ``size`` counts the entries of the container and of all its nested
+    containers. Small containers (flat records, short scalar lists) are keyed
+    ``(rank, 0, flat)``, where ``flat`` concatenates the entry keys and a
+    nested container contributes its rank, its length and its own ``flat``:
+    comparing that tuple compares the content, and building it needs no
+    hashing. Bigger ones are keyed ``(rank, 1, prefix, digest)`` so that
+    sorting and hashing them stays cheap however large the subtree is. The
+    prefix flattens the scalar keys of the
+    first few entries (just the rank for a nested container), so lists of
+    big dicts sort much like their ``str()`` forms did and a modified item
+    keeps its place. The digest covers the whole subtree and breaks ties. It
+    hashes a version-0 marshal dump, which (unlike ``hash()`` or later marshal
+    versions) depends only on the values, so it is the same in every process.
+    Small containers sort before big ones of the same type.
+    """
+    if size <= SMALL_KEY_ENTRIES:
+        flat = []
+        for entry in entries:
+            for part in entry:
+                if part[0] == RANK_LIST or part[0] == RANK_DICT:
+                    flat.append(part[0])
+                    flat.append(len(part[2]))
+                    flat.extend(part[2])
+                else:
+                    flat.extend(part)
+        return (rank, 0, tuple(flat))
+    prefix = []
+    for entry in entries[:SORT_PREFIX_ENTRIES]:
+        for part in entry:
+            if part[0] == RANK_LIST or part[0] == RANK_DICT:
+                prefix.append(part[0])
+            else:
+                prefix.extend(part)
+    digest = hashlib.blake2b(marshal.dumps(entries, 0), digest_size=16).digest()
+    return (rank, 1, tuple(prefix), digest)
+
+
+def _scalar_list_form(items):
+    """``(key, normalized)`` of a list without nested containers, or None if it has some."""
+    item_types = set(map(type, items))
+    if item_types == {str}:
+        normalized = sorted(items)
+        if len(normalized) <= SMALL_KEY_ENTRIES:
+            # The small key directly: RANK_STRING before every string
+            flat = [RANK_STRING] * (2 * len(normalized))
+            flat[1::2] = normalized
+            return (RANK_LIST, 0, tuple(flat)), normalized
+        entries = [((RANK_STRING, item),) for item in normalized]
+    elif item_types & {dict, list}:
+        return None
+    else:
+        forms = sorted(((scalar_sort_key(item), item) for item in items), key=itemgetter(0))
+        normalized = [item for _, item in forms]
+        entries = [(item_key,) for item_key, _ in forms]
+    return _container_key(RANK_LIST, entries, len(entries)), normalized
+
+
+def _small_dict_form(node, done, sizes):
+    """
+    ``((key, normalized), size)`` of a small dict with string keys, or None.
+
+    Records (Kubernetes metadata, user entries, ...) are the common case, and
+    string keys sort the same with and without their canonical keys, so the
+    small key is built in one pass over the sorted keys. Returns None when a
+    key is not a string, a nested dict is not done yet or the dict turns out
+    too big; canonical_forms() then takes the general path.
+    """
+    try:
+        keys = sorted(node)
+    except TypeError:
+        return None
+    size = len(keys)
+    flat = []
+    normalized = {}
+    for key in keys:
+        if type(key) is not str:
+            return None
+        value = node[key]
+        value_type = type(value)
+        if value_type is str:
+            flat += (RANK_STRING, key, RANK_STRING, value)
+        elif value_type is dict or value_type is list:
+            value_id = id(value)
+            if value_id not in done:
+                form = _scalar_list_form(value) if value_type is list else None
+                if form is None:
+                    return None
+                done[value_id] = form
+                sizes[value_id] = len(value)
+            size += sizes[value_id]
+            if size > SMALL_KEY_ENTRIES:
+                return None
+            value_key, value = done[value_id]
+            flat += (RANK_STRING, key, value_key[0], len(value_key[2]))
+            flat += value_key[2]
+        elif value_type is int:
+            flat += (RANK_STRING, key, RANK_NUMBER, 0, value, "int")
+        elif value_type is bool:
+            flat += (RANK_STRING, key, RANK_BOOL, value)
+        else:
+            flat += (RANK_STRING, key)
+            flat += scalar_sort_key(value)
+        normalized[key] = value
+    if size > SMALL_KEY_ENTRIES:
+        return None
+    return ((RANK_DICT, 0, tuple(flat)), normalized), size
+
+
+def canonical_forms(data):
+    """
+    Canonical key and normalized form of every container in data.
+
+    Returns a dict mapping ``id(container)`` to ``(key, normalized)``; the
+    ids are only meaningful while ``data`` is alive. Keys order values by
+    type rank and then content, and two values have the same key exactly
+    when they normalize to the same data (dict keys AND list items sorted).
+    Every container is visited once, bottom up, with an explicit stack: each
+    node's key is computed once and reused by all of its ancestors' sorts
+    (and by every alias of the node), instead of calling ``str()`` on whole
+    subtrees at every level. Deeply nested documents cannot hit the
+    recursion limit.
+
+    Raises ValueError for recursive structures (an anchor used inside itself).
+    """
+    done = {}  # id(container) -> (key, normalized)
+    if type(data) is not dict and type(data) is not list:
+        return done
+
+    sizes = {}  # id(container) -> number of entries, nested ones included
+    in_progress = set()
+    stack = [data]
+    by_key = itemgetter(0)
+    while stack:
+        node = stack.pop()
+        node_id = id(node)
+        if node_id in done:
+            continue
+        is_dict = type(node) is dict
+        if is_dict:
+            small = _small_dict_form(node, done, sizes)
+            if small is not None:
+                done[node_id], sizes[node_id] = small
+                in_progress.discard(node_id)
+                continue
+        else:
+            # Lists of plain scalars (tags, ids, ports, ...) are the common case
+            form = _scalar_list_form(node)
+            if form is not None:
+                done[node_id] = form
+                sizes[node_id] = len(node)
+                continue
+
+        # (key, normalized) for every child; scalar keys are inlined for the
+        # common types and scalar lists are finished on the spot
+        forms = []
+        pending = []
+        size = len(node)
+        for key, value in (node.items() if is_dict else enumerate(node)):
+            value_type = type(value)
+            if value_type is dict or value_type is list:
+                value_id = id(value)
+                if value_id not in done:
+                    form = _scalar_list_form(value) if value_type is list else None
+                    if form is None:
+                        pending.append(value)
+                        continue
+                    done[value_id] = form
+                    sizes[value_id] = len(value)
+                size += sizes[value_id]
+                value_key, value = done[value_id]
+            elif value_type is str:
+                value_key = (RANK_STRING, value)
+            else:
+                value_key = scalar_sort_key(value)
+            if is_dict:
+                forms.append(((RANK_STRING, key) if type(key) is str else scalar_sort_key(key), value_key, key, value))
+            else:
+                forms.append((value_key, value))
+        if pending:
+            # Finish the children first, then come back to this node
+            if node_id in in_progress:
+                raise ValueError("Cannot normalize a recursive YAML structure")
+            in_progress.add(node_id)
+            stack.append(node)
+            for child in pending:
+                if id(child) in in_progress:
+                    raise ValueError("Cannot normalize a recursive YAML structure")
+                stack.append(child)
+            continue
+
+        forms.sort(key=by_key)
+        if is_dict:
+            normalized = {key: value for _, _, key, value in forms}
+            canonical_key = _container_key(RANK_DICT, [(key_key, value_key) for key_key, value_key, _, _ in forms],
+                                           size)
+        else:
+            normalized = [item for _, item in forms]
+            canonical_key = _container_key(RANK_LIST, [(item_key,) for item_key, _ in forms], size)
+        done[node_id] = (canonical_key, normalized)
+        sizes[node_id] = size
+        in_progress.discard(node_id)
+    return done
+
+
+def canonicalize(data):
+    """Normalize data and compute its canonical key: ``(normalized, key)`` (see canonical_forms())."""
+    if type(data) is not dict and type(data) is not list:
+        return data, scalar_sort_key(data)
+    canonical_key, normalized = canonical_forms(data)[id(data)]
+    return normalized, canonical_key
+
+
+def normalize_data(data):
+    """Normalize data: sort dict keys AND list items (see canonicalize())."""
+    return canonicalize(data)[0]
+
+
+def dump_sorted(data, backend=None):
+    """Dump already normalized data with consistent formatting."""
+    return yaml.dump(data, Dumper=yaml_dumper(backend), sort_keys=True, default_flow_style=False,
+                     allow_unicode=True)
+
+
+def dump_normalized(data, backend=None):
+    """Normalize parsed YAML and dump it with consistent formatting."""
+    return dump_sorted(normalize_data(data), backend)
+
+
+class YamlSource:
+    """
+    One YAML text plus everything the comparison modes derive from it.
+
+    Each artifact (split lines, parsed data with its line index, normalized
+    dump) is computed on first use and then reused, so comparing the same
+    source in several modes parses and normalizes it only once. Reusing the
+    same line strings also means their hashes, which Python caches on the
+    string object, are only computed once when lines are interned.
+
+    Sources are shared between worker threads through the content cache, so
+    an artifact is only ever published whole, in a single assignment: two
+    threads may both compute it, but neither sees a half-finished one.
+    """
+
+    def __init__(self, text, first_line=0):
+        self.text = text
+        # Offset of the text in its file (non-zero for one document of a stream)
+        self.first_line = first_line
+        self._documents = None
+        self._lines = None
+        self._digest = None
+        self._parsed = None
+        self._sorted = None
+        self._normalized = None
+        self._normalized_lines = None
+
+    @property
+    def lines(self):
+        """The text split into lines."""
+        if self._lines is None:
+            self._lines = self.text.splitlines()
+        return self._lines
+
+    @property
+    def digest(self):
+        """Hash of the text, which identifies the source in the on-disk result cache."""
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self.text.encode("utf-8"), digest_size=16).hexdigest()
+        return self._digest
+
+    @property
+    def documents(self):
+        """
+        The documents of a multi-document stream as YamlSources.
+
+        A single document is returned as ``[self]``, so its artifacts are
+        shared with the whole-file views.
+        """
+        if self._documents is None:
+            if self.text.startswith("---") or "\n---" in self.text:
+                chunks = split_documents(self.text)
+            else:
+                chunks = [(0, self.text)]
+            if len(chunks) > 1:
+                self._documents = [YamlSource(text, self.first_line + first_line) for first_line, text in chunks]
+            else:
+                self._documents = [self]
+        return self._documents
+
+    @property
+    def is_stream(self):
+        """True if the text holds more than one YAML document."""
+        return len(self.documents) > 1
+
+    @property
+    def parsed(self):
+        """``(data, line_index)`` as returned by load_with_line_index()."""
+        if self._parsed is None:
+            self._parsed = load_with_line_index(self.text)
+        return self._parsed
+
+    @property
+    def data(self):
+        """The loaded YAML document (shared; do not modify)."""
+        return self.parsed[0]
+
+    def normalize(self):
+        """
+        Sort the document's keys and lists, unless it was already dumped.
+
+        The sorted data is only kept until ``normalized`` dumps it; calling
+        this first lets the two steps be timed as separate stages.
+        """
+        if self._normalized is None and self._sorted is None:
+            sorted_data = normalize_data(self.data)
+            # Keep it only if no other thread has dumped the document meanwhile
+            if self._normalized is None:
+                self._sorted = sorted_data
+
+    @property
+    def normalized(self):
+        """The document dumped with sorted keys and lists."""
+        normalized = self._normalized
+        if normalized is None:
+            # Another thread may dump and drop the sorted data at any point,
+            # so work from a local reference and sort again if it is gone
+            sorted_data = self._sorted
+            if sorted_data is None:
+                sorted_data = normalize_data(self.data)
+            normalized = dump_sorted(sorted_data)
+            self._normalized = normalized
+            self._sorted = None
+        return normalized
+
+    @property
+    def normalized_lines(self):
+        """The normalized dump split into lines."""
+        if self._normalized_lines is None:
+            self._normalized_lines = self.normalized.splitlines()
+        return self._normalized_lines
+
+    def size_estimate(self):
+        """Rough number of bytes held by the text and the artifacts computed so far."""
+        text_size = len(self.text)
+        size = text_size
+        if self._lines is not None:
+            size += text_size + 56 * len(self._lines)
+        if self._parsed is not None:
+            # Loaded objects plus the line index run at several times the text size
+            size += 8 * text_size
+        if self._normalized is not None:
+            size += len(self._normalized)
+        if self._normalized_lines is not None:
+            size += len(self._normalized) + 56 * len(self._normalized_lines)
+        if self._documents is not None and self._documents[0] is not self:
+            size += sum(document.size_estimate() for document in self._documents)
+        return size
+
+
+def as_source(content):
+    """Wrap YAML text in a YamlSource; sources are passed through unchanged."""
+    if isinstance(content, YamlSource):
+        return content
+    return YamlSource(content)
+
+
+@lru_cache(maxsize=SIMILARITY_CACHE_SIZE)
+def is_modification(left_line, right_line):
+    """
+    True if two paired lines of a replace block are similar enough to be "changed".
+
+    Equivalent to ``SequenceMatcher.ratio() > SIMILARITY_THRESHOLD``, but the
+    cheap upper bounds (length-only, then character multiset) reject most
+    unrelated pairs before the full matcher runs.
+    """
+    if left_line == right_line:
+        return True
+    matcher = difflib.SequenceMatcher(None, left_line, right_line)
+    return (matcher.real_quick_ratio() > SIMILARITY_THRESHOLD and
+            matcher.quick_ratio() > SIMILARITY_THRESHOLD and
+            matcher.ratio() > SIMILARITY_THRESHOLD)
+
+
+@lru_cache(maxsize=SIMILARITY_CACHE_SIZE)
+def changed_spans(left_line, right_line):
+    """
+    Character ranges that differ between two changed lines.
+
+    Returns ``(left_spans, right_spans)``, each a tuple of ``(start, end)``
+    offsets into the line. Renderers call this only for rows on screen.
+    """
+    matcher = difflib.SequenceMatcher(None, left_line, right_line, autojunk=False)
+    left_spans = []
+    right_spans = []
+    for opcode, i1, i2, j1, j2 in matcher.get_opcodes():
+        if opcode == "equal":
+            continue
+        if i1 < i2:
+            left_spans.append((i1, i2))
+        if j1 < j2:
+            right_spans.append((j1, j2))
+    return tuple(left_spans), tuple(right_spans)
+
+
+def align_lines(lines1, lines2, progress=None, algorithm=DEFAULT_ALGORITHM):
+    """
+    Align two lists of lines with one of the ``yamldiff_linediff`` algorithms.
+
+    Returns ``(opcodes, rows)`` where the AlignedRows pair up lines like VIMDIFF does:
+    equal lines side by side, similar replaced lines as "changed", and gaps
+    opposite lines that exist on one side only.
+    """
+    report(progress, "Matching lines")
+    opcodes = linediff.diff_opcodes(lines1, lines2, algorithm)
+    report(progress, "Aligning lines", 0.0)
+    rows = AlignedRows(lines1, lines2)
+    total_lines = max(len(lines1) + len(lines2), 1)
+    next_report = PROGRESS_INTERVAL
+
+    for opcode, i1, i2, j1, j2 in opcodes:
+        if len(rows) >= next_report:
+            report(progress, "Aligning lines", (i1 + j1) / total_lines)
+            next_report = len(rows) + PROGRESS_INTERVAL
+
+        if opcode == 'equal':
+            # Lines are the same - show them normally
+            rows.append_span(SPAN_BOTH, i1, j1, PAIR_EQUAL * (i2 - i1))
+
+        elif opcode == 'replace':
+            # Lines in this block differ - pair them up and pad with gaps as needed.
+            # Paired lines that are similar enough are a modification, the
+            # others are one line removed and one added
+            paired = min(i2 - i1, j2 - j1)
+            rows.append_span(SPAN_BOTH, i1, j1, b"".join(
+                PAIR_CHANGED if is_modification(lines1[i1 + k], lines2[j1 + k]) else PAIR_REPLACED
+                for k in range(paired)))
+            rows.append_span(SPAN_LEFT, i1 + paired, j2, PAIR_REMOVED * (i2 - i1 - paired))
+            rows.append_span(SPAN_RIGHT, i2, j1 + paired, PAIR_ADDED * (j2 - j1 - paired))
+
+        elif opcode == 'delete':
+            # Lines only in left file - removed
+            rows.append_span(SPAN_LEFT, i1, j1, PAIR_REMOVED * (i2 - i1))
+
+        elif opcode == 'insert':
+            # Lines only in right file - added
+            rows.append_span(SPAN_RIGHT, i1, j1, PAIR_ADDED * (j2 - j1))
+
+    return opcodes, rows
+
+
+def side_by_side_diff(content1, content2, progress=None, algorithm=DEFAULT_ALGORITHM):
+    """Line-by-line diff of the raw file contents (text or YamlSource)."""
+    source1 = as_source(content1)
+    source2 = as_source(content2)
+    opcodes, rows = align_lines(source1.lines, source2.lines, progress, algorithm)
+    return DiffResult(MODE_SIDE_BY_SIDE, rows, source1.text == source2.text, opcodes=opcodes)
+
+
+def deepdiff_changes(data1, data2):
+    """
+    Order-agnostic diff of two parsed documents with DeepDiff.
+
+    Returns the same ``{category: [(path, left_path, right_path)]}`` mapping
+    as ``yamldiff_treediff.diff_trees``.
+    """
+    # DeepDiff is slow to import, so only pay for it when it is needed
+    from deepdiff import DeepDiff
+
+    ddiff = DeepDiff(data1, data2, ignore_order=True, view="tree")
+    changes = {}
+    for category in SEMANTIC_CATEGORIES:
+        if category in ddiff:
+            changes[category] = [(level.path(), level.path(output_format="list"),
+                                  level.path(output_format="list", use_t2=True)) for level in ddiff[category]]
+    return changes
+
+
+def semantic_diff(content1, content2, progress=None, semantic_engine=DEFAULT_SEMANTIC_ENGINE,
+                  identity_keys=DEFAULT_IDENTITY_KEYS):
+    """
+    Order-agnostic structural diff of two YAML documents.
+
+    Lines are paired by position. Each changed path is looked up in a line
+    index built while parsing, so exactly the lines of the changed entries
+    are tagged "changed" (on the left for the old document, on the right for
+    the new one). ``semantic_engine`` picks the structural tree diff (which
+    matches list records by ``identity_keys``) or DeepDiff.
+    """
+    source1 = as_source(content1)
+    source2 = as_source(content2)
+
+    if source1.text == source2.text:
+        # Same text, same data: nothing to parse or compare
+        found = {}
+    else:
+        report(progress, "Parsing YAML")
+        data1, index1 = source1.parsed
+        data2, index2 = source2.parsed
+
+        report(progress, "Comparing structure")
+        if semantic_engine == SEMANTIC_ENGINE_TREE:
+            import yamldiff_treediff
+            found = yamldiff_treediff.diff_trees(data1, data2, identity_keys)
+        else:
+            found = deepdiff_changes(data1, data2)
+
+    report(progress, "Highlighting lines")
+    lines1 = source1.lines
+    lines2 = source2.lines
+    flags1 = bytearray(len(lines1))
+    flags2 = bytearray(len(lines2))
+
+    # Extract paths that have semantic differences
+    changes = {}
+    changed_keys = set()
+    for category in SEMANTIC_CATEGORIES:
+        if category not in found:
+            continue
+        paths = []
+        for path, left_path, right_path in found[category]:
+            paths.append(path)
+            changed_keys.add(extract_key_from_path(path))
+            if category not in RIGHT_ONLY_CATEGORIES:
+                line_range = lookup_line_range(index1, left_path)
+                if line_range:
+                    mark_line_range(flags1, lines1, line_range)
+            if category not in LEFT_ONLY_CATEGORIES:
+                line_range = lookup_line_range(index2, right_path)
+                if line_range:
+                    mark_line_range(flags2, lines2, line_range)
+        changes[category] = sorted(paths)
+
+    rows = semantic_rows(lines1, flags1, lines2, flags2)
+    return DiffResult(MODE_SEMANTIC, rows, not found, changes=changes, changed_keys=changed_keys)
+
+
+# Tag byte of each side of a semantic row by the line's changed flag (see
+# tag_pair()): a zero flag is "normal", any other "changed"; the "only"
+# tables are for rows whose other side is past the end of its file
+_RIGHT_FLAG_TAGS = bytes([ROW_TAGS.index(TAG_NORMAL)] + [ROW_TAGS.index(TAG_CHANGED)] * 255)
+_LEFT_FLAG_TAGS = bytes(code << 4 for code in _RIGHT_FLAG_TAGS)
+_LEFT_ONLY_FLAG_TAGS = bytes(code | ROW_TAGS.index(TAG_EMPTY) for code in _LEFT_FLAG_TAGS)
+_RIGHT_ONLY_FLAG_TAGS = bytes(ROW_TAGS.index(TAG_EMPTY) << 4 | code for code in _RIGHT_FLAG_TAGS)
+
+
+def semantic_rows(lines1, flags1, lines2, flags2):
+    """
+    The rows of a semantic comparison: lines paired by position.
+
+    ``flags1`` and ``flags2`` hold a non-zero byte for every changed line.
+    """
+    rows = AlignedRows(lines1, lines2)
+    paired = min(len(lines1), len(lines2))
+    # Combine the tag bytes of both sides of all paired rows at once, as one big integer
+    left = int.from_bytes(flags1[:paired].translate(_LEFT_FLAG_TAGS), "little")
+    right = int.from_bytes(flags2[:paired].translate(_RIGHT_FLAG_TAGS), "little")
+    rows.append_span(SPAN_BOTH, 0, 0, (left | right).to_bytes(paired, "little"))
+    rows.append_span(SPAN_LEFT, paired, paired, flags1[paired:len(lines1)].translate(_LEFT_ONLY_FLAG_TAGS))
+    rows.append_span(SPAN_RIGHT, paired, paired, flags2[paired:len(lines2)].translate(_RIGHT_ONLY_FLAG_TAGS))
+    return rows
+
+
+def normalized_diff(content1, content2, progress=None, algorithm=DEFAULT_ALGORITHM):
+    """Normalize both documents (sorted keys and lists) and diff the dumps line by line."""
+    source1 = as_source(content1)
+    source2 = as_source(content2)
+
+    # Each property computes its stage on first access; touch them in order
+    # so progress reports line up with the work being done
+    report(progress, "Parsing YAML")
+    source1.parsed
+    source2.parsed
+
+    report(progress, "Normalizing")
+    source1.normalize()
+    source2.normalize()
+
+    report(progress, "Dumping YAML")
+    lines1 = source1.normalized_lines
+    lines2 = source2.normalized_lines
+
+    opcodes, rows = align_lines(lines1, lines2, progress, algorithm)
+    return DiffResult(MODE_NORMALIZED, rows, source1.normalized == source2.normalized, opcodes=opcodes)
+
+
+_MODE_FUNCTIONS = {
+    MODE_SIDE_BY_SIDE: side_by_side_diff,
+    MODE_SEMANTIC: semantic_diff,
+    MODE_NORMALIZED: normalized_diff,
+}
+
+
+def diff_contents(content1, content2, mode=MODE_SIDE_BY_SIDE, progress=None, algorithm=DEFAULT_ALGORITHM,
+                  on_document=None, jobs=None, semantic_engine=DEFAULT_SEMANTIC_ENGINE,
+                  identity_keys=DEFAULT_IDENTITY_KEYS):
+    """
+    Compare two YAML strings (or YamlSource objects) in the given mode.
+
+    ``progress`` is called as ``progress(stage, fraction)`` between stages; it
+    may raise DiffCancelled to stop the comparison early. ``algorithm`` picks
+    the line diff used by the side-by-side and normalized modes.
+
+    In the semantic and normalized modes, multi-document streams are compared
+    document by document (see ``yamldiff_documents``): ``on_document`` is
+    called with each DocumentDiff as it finishes and ``jobs`` caps the number
+    of worker processes.
+
+    ``semantic_engine`` (``tree`` or ``deepdiff``) and ``identity_keys`` only
+    apply to the semantic mode.
+    """
+    try:
+        diff_function = _MODE_FUNCTIONS[mode]
+    except KeyError:
+        raise ValueError(f"Unknown comparison mode: {mode!r}") from None
+    if semantic_engine not in SEMANTIC_ENGINES:
+        raise ValueError(f"Unknown semantic engine: {semantic_engine!r}")
+    if mode != MODE_SIDE_BY_SIDE:
+        content1 = as_source(content1)
+        content2 = as_source(content2)
+        if content1.is_stream or content2.is_stream:
+            # Imported here because yamldiff_documents builds on this module
+            import yamldiff_documents
+            return yamldiff_documents.diff_streams(content1, content2, mode, progress, algorithm, on_document, jobs,
+                                                   semantic_engine, identity_keys)
+    if mode == MODE_SEMANTIC:
+        # Semantic rows are paired by position, there is no line diff to pick
+        return diff_function(content1, content2, progress, semantic_engine, identity_keys)
+    return diff_function(content1, content2, progress, algorithm)
+
+
+def diff_files(path1, path2, mode=MODE_SIDE_BY_SIDE, progress=None, algorithm=DEFAULT_ALGORITHM, cache=None,
+               on_document=None, jobs=None, semantic_engine=DEFAULT_SEMANTIC_ENGINE,
+               identity_keys=DEFAULT_IDENTITY_KEYS, result_cache=None):
+    """
+    Read two YAML files and compare them in the given mode.
+
+    With a ``yamldiff_cache.ContentCache`` the files are only re-read and
+    re-parsed when they changed since the last comparison. With a
+    ``yamldiff_resultcache.ResultCache`` a pair compared before (in the same
+    mode, with the same options) is loaded from disk instead of being parsed
+    and diffed; ``on_document`` is not called for a cached result.
+    """
+    report(progress, "Reading files")
+    if cache is not None:
+        content1 = cache.load(path1)
+        content2 = cache.load(path2)
+    else:
+        content1 = read_file(path1)
+        content2 = read_file(path2)
+    if result_cache is None:
+        return diff_contents(content1, content2, mode, progress, algorithm, on_document, jobs, semantic_engine,
+                             identity_keys)
+
+    # Imported here because yamldiff_resultcache builds on this module
+    import yamldiff_resultcache
+    content1 = as_source(content1)
+    content2 = as_source(content2)
+    report(progress, "Checking result cache")
+    key = yamldiff_resultcache.result_key(content1, content2, mode, algorithm, semantic_engine, identity_keys)
+    result = result_cache.get(key)
+    if result is None:
+        result = diff_contents(content1, content2, mode, progress, algorithm, on_document, jobs, semantic_engine,
+                               identity_keys)
+        report(progress, "Caching result")
+        result_cache.put(key, result)
+    return result
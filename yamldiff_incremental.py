@@ -0,0 +1,612 @@
+"""
+Incremental re-diffing of two files that are being edited.
+
+Watch mode (see ``yamldiff_watch``) compares the files again every time one
+of them is saved. A fresh comparison costs as much as the first one, so
+IncrementalDiff keeps the previous comparison and only redoes the part an
+edit touched:
+
+- the changed line range of each file is found by comparing the new lines
+  with the previous ones from both ends
+- aligned rows (side-by-side and normalized) are realigned only in a window
+  around that range, cut inside unchanged stretches, and spliced into the
+  previous rows and opcodes
+- the semantic and normalized modes keep mapping documents per top-level
+  key: only the entries whose text changed are parsed, diffed or
+  normalized again
+
+Rows outside the changed range keep their spans of the compact rows (see
+``engine.AlignedRows``); when an edit adds or removes lines they are
+renumbered, and the semantic mode (which pairs lines by position) rebuilds
+its rows from the changed-line flags. Anything the incremental
+path cannot handle (multi-document files, top-level sequences, entries that
+do not parse on their own) is compared in full.
+
+A realigned window may pair lines differently than a full comparison of
+the whole files would; the rows are always a valid alignment, and a full
+Compare re-aligns everything.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, islice
+
+import yaml
+
+import yamldiff_engine as engine
+from yamldiff_treediff import format_path
+
+# Unchanged lines re-diffed on each side of an edit, so the realigned window
+# can anchor on them
+CONTEXT_LINES = 3
+
+# Lines compared per step when looking for the unchanged start and end of
+# two versions of a file
+COMPARE_CHUNK = 1024
+
+
+class NotIncremental(Exception):
+    """Raised when a text cannot be compared entry by entry; it is compared in full instead."""
+
+
+def common_prefix(lines1, lines2):
+    """Number of leading lines two lists have in common."""
+    limit = min(len(lines1), len(lines2))
+    start = 0
+    while start < limit:
+        end = min(start + COMPARE_CHUNK, limit)
+        if lines1[start:end] != lines2[start:end]:
+            while lines1[start] == lines2[start]:
+                start += 1
+            return start
+        start = end
+    return limit
+
+
+def common_suffix(lines1, lines2, limit):
+    """Number of trailing lines two lists have in common, at most ``limit``."""
+    end1 = len(lines1)
+    end2 = len(lines2)
+    count = 0
+    while count < limit:
+        size = min(COMPARE_CHUNK, limit - count)
+        if lines1[end1 - count - size:end1 - count] != lines2[end2 - count - size:end2 - count]:
+            while lines1[end1 - count - 1] == lines2[end2 - count - 1]:
+                count += 1
+            return count
+        count += size
+    return limit
+
+
+def changed_range(old_lines, new_lines):
+    """
+    Where two versions of a file differ.
+
+    Returns ``(start, old_end, new_end)``: ``old_lines[start:old_end]`` was
+    replaced by ``new_lines[start:new_end]``. Returns None if they are equal.
+    """
+    start = common_prefix(old_lines, new_lines)
+    if start == len(old_lines) == len(new_lines):
+        return None
+    suffix = common_suffix(old_lines, new_lines, min(len(old_lines), len(new_lines)) - start)
+    return start, len(old_lines) - suffix, len(new_lines) - suffix
+
+
+def _join_opcodes(opcodes, more):
+    """Append opcodes, merging an "equal" block that continues the previous one."""
+    if opcodes and more and opcodes[-1][0] == more[0][0] == "equal":
+        _, i1, _, j1, _ = opcodes[-1]
+        opcodes[-1] = ("equal", i1, more[0][2], j1, more[0][4])
+        more = islice(more, 1, None)
+    opcodes.extend(more)
+
+
+class LineAlignment:
+    """
+    Aligned rows and opcodes of two lists of lines, realigned after edits.
+
+    ``update()`` re-runs the line diff only on a window around the changed
+    lines. The window is cut inside "equal" blocks (CONTEXT_LINES away from
+    the change) or at block boundaries, where both files are in step, so
+    everything outside it stays valid.
+    """
+
+    def __init__(self, lines1, lines2, progress=None, algorithm=engine.DEFAULT_ALGORITHM):
+        self.algorithm = algorithm
+        self.lines1 = lines1
+        self.lines2 = lines2
+        self.opcodes, self.rows = engine.align_lines(lines1, lines2, progress, algorithm)
+
+    def _window(self, changes):
+        """
+        The opcode cut points ``(index, offset)`` where the realigned window starts and ends.
+
+        ``changes`` holds ``(side, (start, old_end, new_end))`` for each
+        changed side (0 for the left lines, 1 for the right ones).
+        """
+        opcodes = self.opcodes
+        starts = ([opcode[1] for opcode in opcodes], [opcode[3] for opcode in opcodes])
+
+        def containing(side, position):
+            return max(bisect_right(starts[side], position) - 1, 0)
+
+        def length(index):
+            _, i1, i2, j1, j2 = opcodes[index]
+            return max(i2 - i1, j2 - j1)
+
+        first = min(containing(side, start) for side, (start, _, _) in changes)
+        if opcodes[first][0] == "equal":
+            offset = min(start - starts[side][first] for side, (start, _, _) in changes)
+            offset = max(offset - CONTEXT_LINES, 0)
+        else:
+            offset = 0
+            if first > 0 and opcodes[first - 1][0] == "equal":
+                first -= 1
+                offset = max(length(first) - CONTEXT_LINES, 0)
+
+        last = max(containing(side, max(old_end - 1, start)) for side, (start, old_end, _) in changes)
+        if opcodes[last][0] == "equal":
+            end_offset = max(old_end - starts[side][last] for side, (_, old_end, _) in changes) + CONTEXT_LINES
+        else:
+            last += 1
+            end_offset = CONTEXT_LINES if last < len(opcodes) and opcodes[last][0] == "equal" else 0
+        if last < len(opcodes) and end_offset >= length(last):
+            last += 1
+            end_offset = 0
+        return (first, offset), (last, end_offset)
+
+    def update(self, lines1, lines2, progress=None):
+        """
+        Realign after the lines changed to ``lines1`` and ``lines2``.
+
+        Returns ``(start, old_end, new_end)``: ``rows[start:new_end]``
+        replaced ``rows[start:old_end]`` of the previous alignment (up to the
+        last row when line numbers shifted), or None if nothing changed. The
+        alignment is only modified after the last progress report, so a
+        cancelled update leaves it as it was.
+        """
+        change1 = changed_range(self.lines1, lines1)
+        change2 = changed_range(self.lines2, lines2)
+        if change1 is None and change2 is None:
+            return None
+        if not self.opcodes:
+            # Both sides were empty: there is nothing to splice into
+            old_count = len(self.rows)
+            self.__init__(lines1, lines2, progress, self.algorithm)
+            return 0, old_count, len(self.rows)
+
+        changes = [(side, change) for side, change in enumerate((change1, change2)) if change is not None]
+        (first, offset), (last, end_offset) = self._window(changes)
+        opcodes = self.opcodes
+        row_starts = list(accumulate((max(i2 - i1, j2 - j1) for _, i1, i2, j1, j2 in opcodes), initial=0))
+
+        # The window in old line numbers, and its size in the new ones
+        _, i1, _, j1, _ = opcodes[first]
+        left_start, right_start = i1 + offset, j1 + offset
+        if last < len(opcodes):
+            _, i1, _, j1, _ = opcodes[last]
+            left_end, right_end = i1 + end_offset, j1 + end_offset
+        else:
+            left_end, right_end = len(self.lines1), len(self.lines2)
+        left_shift = len(lines1) - len(self.lines1)
+        right_shift = len(lines2) - len(self.lines2)
+
+        engine.report(progress, "Realigning changed lines")
+        window_opcodes, window_rows = engine.align_lines(lines1[left_start:left_end + left_shift],
+                                                         lines2[right_start:right_end + right_shift],
+                                                         progress, self.algorithm)
+
+        # Nothing below reports progress, so the update can no longer be cancelled
+        row_start = row_starts[first] + offset
+        row_end = row_starts[last] + end_offset
+
+        spliced = list(opcodes[:first])
+        if offset:
+            tag, i1, _, j1, _ = opcodes[first]
+            spliced.append((tag, i1, i1 + offset, j1, j1 + offset))
+        _join_opcodes(spliced, [(tag, i1 + left_start, i2 + left_start, j1 + right_start, j2 + right_start)
+                                for tag, i1, i2, j1, j2 in window_opcodes])
+        after = []
+        if last < len(opcodes):
+            tag, i1, i2, j1, j2 = opcodes[last]
+            after.append((tag, i1 + end_offset, i2, j1 + end_offset, j2))
+            after.extend(islice(opcodes, last + 1, None))
+        if left_shift or right_shift:
+            after = [(tag, i1 + left_shift, i2 + left_shift, j1 + right_shift, j2 + right_shift)
+                     for tag, i1, i2, j1, j2 in after]
+        _join_opcodes(spliced, after)
+
+        # Splice the rows' spans: the lines outside the window are the same
+        # in the new lists, only moved by the shift after it
+        old_count = len(self.rows)
+        rows = engine.AlignedRows(lines1, lines2)
+        rows.append_rows(self.rows, 0, row_start)
+        rows.append_rows(window_rows, left_shift=left_start, right_shift=right_start)
+        rows.append_rows(self.rows, row_end, left_shift=left_shift, right_shift=right_shift)
+        self.rows = rows
+        self.opcodes = spliced
+        self.lines1 = lines1
+        self.lines2 = lines2
+        if left_shift or right_shift:
+            return row_start, old_count, len(self.rows)
+        return row_start, row_end, row_start + len(window_rows)
+
+
+def entry_starts(lines, start, end):
+    """
+    Lines of ``lines[start:end]`` that begin a top-level entry, and those that are document markers.
+
+    An entry starts at any line that is not indented, blank or a comment;
+    ``---`` / ``...`` markers and ``%`` directives are reported separately.
+    """
+    starts = []
+    markers = []
+    for number in range(start, end):
+        line = lines[number]
+        if line[:1] in ("", " ", "\t", "#"):
+            continue
+        if line.startswith("%") or engine.DOCUMENT_START.match(line) or engine.DOCUMENT_END.match(line):
+            markers.append(number)
+        else:
+            starts.append(number)
+    return starts, markers
+
+
+def parse_entry(lines, start, key_line, end):
+    """
+    Parse the lines of one top-level entry on their own; returns ``(key, source)``.
+
+    ``key_line`` is the line of the entry's key; the lines above it may only
+    be comments, blank lines and directives.
+    """
+    source = engine.YamlSource("\n".join(lines[start:end]) + "\n")
+    try:
+        data, index = source.parsed
+    except yaml.YAMLError as e:
+        raise NotIncremental(f"entry at line {key_line + 1} does not parse on its own") from e
+    if type(data) is not dict or len(data) != 1:
+        raise NotIncremental(f"line {key_line + 1} does not start a mapping entry")
+    key = next(iter(data))
+    if index.get((key,), (None,))[0] != key_line - start:
+        raise NotIncremental(f"content above the entry at line {key_line + 1}")
+    return key, source
+
+
+class MappingEntries:
+    """
+    One mapping document cut into its top-level entries, one per key.
+
+    ``starts`` holds the first line of every entry and ``sources`` a parsed
+    YamlSource per entry. The first entry also owns the comments, directives
+    and ``---`` above it; comments after an entry belong to it. Raises
+    NotIncremental for anything else (several documents, a top-level
+    sequence or scalar, duplicate keys, entries that need another entry's
+    anchors).
+    """
+
+    def __init__(self, lines, starts, markers, keys, sources):
+        if not starts:
+            raise NotIncremental("no top-level entries")
+        if markers and markers[-1] > starts[0]:
+            raise NotIncremental("several documents")
+        self.lines = lines
+        self.starts = starts
+        self.markers = markers
+        self.keys = keys
+        self.sources = sources
+        self.positions = {key: position for position, key in enumerate(keys)}
+        if len(self.positions) != len(keys):
+            raise NotIncremental("duplicate top-level keys")
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Cut and parse every entry of a document."""
+        starts, markers = entry_starts(lines, 0, len(lines))
+        keys, sources = cls._parse(lines, starts, 0, len(starts))
+        return cls(lines, starts, markers, keys, sources)
+
+    @staticmethod
+    def _parse(lines, starts, first, last):
+        """Parse entries ``first`` to ``last`` (exclusive) of a document."""
+        keys = []
+        sources = []
+        for position in range(first, last):
+            start = starts[position] if position else 0
+            end = starts[position + 1] if position + 1 < len(starts) else len(lines)
+            key, source = parse_entry(lines, start, starts[position], end)
+            keys.append(key)
+            sources.append(source)
+        return keys, sources
+
+    def span(self, position):
+        """``(start, end)`` lines of an entry."""
+        start = self.starts[position] if position else 0
+        end = self.starts[position + 1] if position + 1 < len(self.starts) else len(self.lines)
+        return start, end
+
+    def edited(self, lines, change):
+        """
+        The entries after ``lines[start:old_end]`` became ``lines[start:new_end]``.
+
+        Only the entries that overlap the change (and the one before it,
+        which may have gained or lost trailing lines) are parsed again.
+        Returns ``(entries, keys)``: the new MappingEntries and the keys
+        whose entry was replaced, added or removed.
+        """
+        start, old_end, new_end = change
+        shift = new_end - old_end
+        before = bisect_left(self.starts, start)
+        after = bisect_left(self.starts, old_end)
+        # Entries [first, last) are replaced; the first one also owns the prologue
+        first = max(before - 1, 0)
+        last = max(after, 1)
+
+        window_starts, window_markers = entry_starts(lines, start, new_end)
+        starts = self.starts[:before] + window_starts + [line + shift for line in islice(self.starts, after, None)]
+        markers = ([line for line in self.markers if line < start] + window_markers
+                   + [line + shift for line in self.markers if line >= old_end])
+        if not starts:
+            raise NotIncremental("no top-level entries")
+        if first == len(starts) - (len(self.starts) - last):
+            # Every entry up to the first kept one was removed: that one now owns the prologue
+            last += 1
+        keys, sources = self._parse(lines, starts, first, len(starts) - (len(self.starts) - last))
+
+        changed = set(self.keys[first:last])
+        changed.update(keys)
+        entries = MappingEntries(lines, starts, markers, self.keys[:first] + keys + self.keys[last:],
+                                 self.sources[:first] + sources + self.sources[last:])
+        return entries, changed
+
+
+def entry_changes(key, source1, source2, semantic_engine, identity_keys):
+    """
+    Semantic comparison of one top-level entry (None for a missing side).
+
+    Returns ``(flags1, flags2, changes, changed_keys)``: the changed-line
+    flags of each entry's lines (None for a missing side) and the changes
+    as a whole-document comparison would report them.
+    """
+    if source1 is not None and source2 is not None:
+        result = engine.semantic_diff(source1, source2, semantic_engine=semantic_engine,
+                                      identity_keys=identity_keys)
+        rows = result.rows
+        flags1 = bytearray(row.left_tag == engine.TAG_CHANGED for row in islice(rows, len(source1.lines)))
+        flags2 = bytearray(row.right_tag == engine.TAG_CHANGED for row in islice(rows, len(source2.lines)))
+        return flags1, flags2, result.changes, result.changed_keys
+
+    # The key exists on one side only
+    source = source1 if source1 is not None else source2
+    flags = bytearray(len(source.lines))
+    line_range = engine.lookup_line_range(source.parsed[1], (key,))
+    if line_range:
+        engine.mark_line_range(flags, source.lines, line_range)
+    path = format_path((key,))
+    if source1 is not None:
+        return flags, None, {"dictionary_item_removed": [path]}, {engine.extract_key_from_path(path)}
+    return None, flags, {"dictionary_item_added": [path]}, {engine.extract_key_from_path(path)}
+
+
+class IncrementalDiff:
+    """
+    Compares two texts over and over, redoing only what changed since the last comparison.
+
+    ``update()`` takes the current texts of both files and returns the
+    comparison in ``mode``, as ``engine.diff_contents`` would (with
+    ``algorithm``, ``semantic_engine`` and ``identity_keys`` applying to the
+    same modes), plus the range of rows that changed. Updates may come from
+    a worker thread; they run one at a time.
+    """
+
+    def __init__(self, mode=engine.MODE_SIDE_BY_SIDE, algorithm=engine.DEFAULT_ALGORITHM,
+                 semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+        if mode not in engine.MODES:
+            raise ValueError(f"Unknown comparison mode: {mode!r}")
+        if semantic_engine not in engine.SEMANTIC_ENGINES:
+            raise ValueError(f"Unknown semantic engine: {semantic_engine!r}")
+        self.mode = mode
+        self.algorithm = algorithm
+        self.semantic_engine = semantic_engine
+        self.identity_keys = identity_keys
+        self.result = None
+        self._lock = threading.Lock()
+        # Previous comparison; None after a full comparison that cannot be updated
+        self._lines = None
+        self._entries = None
+        self._alignment = None
+        self._flags = None
+        self._entry_changes = None
+
+    def reset(self):
+        """Forget the previous comparison, so the next update compares in full."""
+        with self._lock:
+            self.result = None
+            self._lines = self._entries = self._alignment = self._flags = self._entry_changes = None
+
+    def update(self, text1, text2, progress=None):
+        """
+        Compare the current texts of both files.
+
+        Returns ``(result, changed_rows)``. ``changed_rows`` is
+        ``(start, old_end, new_end)`` when ``result.rows[start:new_end]``
+        replaced ``rows[start:old_end]`` of the previous result and every
+        other row is unchanged, or None when the rows were built from
+        scratch (the first update, or a full comparison).
+        """
+        with self._lock:
+            lines = (text1.splitlines(), text2.splitlines())
+            if self.result is not None and self._lines is not None:
+                changes = (changed_range(self._lines[0], lines[0]), changed_range(self._lines[1], lines[1]))
+                if changes == (None, None):
+                    return self.result, (0, 0, 0)
+                try:
+                    if self.mode == engine.MODE_SIDE_BY_SIDE:
+                        return self._update_side_by_side(text1, text2, lines, progress)
+                    if self.mode == engine.MODE_SEMANTIC:
+                        return self._update_semantic(lines, changes, progress)
+                    return self._update_normalized(lines, changes, progress)
+                except NotIncremental:
+                    pass
+            return self._compare(text1, text2, lines, progress), None
+
+    # --- Full comparisons ---
+
+    def _compare(self, text1, text2, lines, progress):
+        """Compare in full and keep what the next update needs."""
+        self._lines = self._entries = self._alignment = self._flags = self._entry_changes = None
+        if self.mode == engine.MODE_SIDE_BY_SIDE:
+            alignment = LineAlignment(lines[0], lines[1], progress, self.algorithm)
+            self._alignment = alignment
+            self._lines = lines
+            self.result = engine.DiffResult(self.mode, alignment.rows, text1 == text2, opcodes=alignment.opcodes)
+            return self.result
+
+        try:
+            engine.report(progress, "Parsing YAML")
+            entries = (MappingEntries.from_lines(lines[0]), MappingEntries.from_lines(lines[1]))
+            if self.mode == engine.MODE_SEMANTIC:
+                result = self._compare_semantic(entries, lines, progress)
+            else:
+                result = self._compare_normalized(entries, progress)
+        except NotIncremental:
+            self.result = engine.diff_contents(text1, text2, self.mode, progress, self.algorithm,
+                                               semantic_engine=self.semantic_engine,
+                                               identity_keys=self.identity_keys)
+            return self.result
+        self._entries = entries
+        self._lines = lines
+        self.result = result
+        return result
+
+    def _compare_semantic(self, entries, lines, progress):
+        engine.report(progress, "Comparing structure")
+        flags = (bytearray(len(lines[0])), bytearray(len(lines[1])))
+        per_key = {}
+        self._diff_entries(entries, set(entries[0].keys) | set(entries[1].keys), flags, per_key)
+        self._flags = flags
+        self._entry_changes = per_key
+        return self._semantic_result(engine.semantic_rows(lines[0], flags[0], lines[1], flags[1]), per_key)
+
+    def _compare_normalized(self, entries, progress):
+        engine.report(progress, "Normalizing")
+        lines1 = self._normalized_lines(entries[0])
+        lines2 = self._normalized_lines(entries[1])
+        alignment = LineAlignment(lines1, lines2, progress, self.algorithm)
+        self._alignment = alignment
+        return engine.DiffResult(self.mode, alignment.rows, lines1 == lines2, opcodes=alignment.opcodes)
+
+    # --- Incremental updates ---
+
+    def _update_side_by_side(self, text1, text2, lines, progress):
+        alignment = self._alignment
+        changed_rows = alignment.update(lines[0], lines[1], progress)
+        self._lines = lines
+        self.result = engine.DiffResult(self.mode, alignment.rows, text1 == text2, opcodes=alignment.opcodes)
+        return self.result, changed_rows
+
+    def _edit_entries(self, lines, changes, progress):
+        """Re-cut and re-parse the changed entries of both sides."""
+        engine.report(progress, "Parsing changed entries")
+        entries = list(self._entries)
+        changed_keys = set()
+        for side, change in enumerate(changes):
+            if change is not None:
+                entries[side], keys = entries[side].edited(lines[side], change)
+                changed_keys.update(keys)
+        return tuple(entries), changed_keys
+
+    def _update_semantic(self, lines, changes, progress):
+        entries, changed_keys = self._edit_entries(lines, changes, progress)
+        engine.report(progress, "Comparing changed entries")
+        flags = (bytearray(self._flags[0]), bytearray(self._flags[1]))
+        for side, change in enumerate(changes):
+            if change is not None:
+                start, old_end, new_end = change
+                flags[side][start:old_end] = bytes(new_end - start)
+        per_key = dict(self._entry_changes)
+        spans = self._diff_entries(entries, changed_keys, flags, per_key)
+
+        # Rows pair lines by position: the rows of every changed line, and
+        # everything after an edit that added or removed lines, changed.
+        # Rebuilding all rows from the flags is a few byte operations
+        edits = [change for change in changes if change is not None]
+        first = min([start for start, _, _ in edits] + [start for start, _ in spans])
+        old_count = len(self.result.rows)
+        new_count = max(len(lines[0]), len(lines[1]))
+        if any(old_end != new_end for _, old_end, new_end in edits):
+            old_last, new_last = old_count, new_count
+        else:
+            old_last = new_last = max([new_end for _, _, new_end in edits] + [end for _, end in spans])
+        rows = engine.semantic_rows(lines[0], flags[0], lines[1], flags[1])
+
+        self._entries = entries
+        self._lines = lines
+        self._flags = flags
+        self._entry_changes = per_key
+        self.result = self._semantic_result(rows, per_key)
+        return self.result, (first, old_last, new_last)
+
+    def _diff_entries(self, entries, keys, flags, per_key):
+        """
+        Compare the entries of ``keys`` and write their flags and changes.
+
+        Returns the ``(start, end)`` line spans whose flags were rewritten.
+        """
+        spans = []
+        for key in keys:
+            positions = [side_entries.positions.get(key) for side_entries in entries]
+            sources = [None if position is None else side_entries.sources[position]
+                       for side_entries, position in zip(entries, positions)]
+            if sources == [None, None]:
+                per_key.pop(key, None)
+                continue
+            *entry_flags, changes, changed_keys = entry_changes(key, sources[0], sources[1], self.semantic_engine,
+                                                               self.identity_keys)
+            for side in (0, 1):
+                if positions[side] is not None:
+                    start, end = entries[side].span(positions[side])
+                    flags[side][start:end] = entry_flags[side]
+                    spans.append((start, end))
+            if changes:
+                per_key[key] = (changes, changed_keys)
+            else:
+                per_key.pop(key, None)
+        return spans
+
+    def _semantic_result(self, rows, per_key):
+        changes = {}
+        changed_keys = set()
+        for key_changes, key_changed_keys in per_key.values():
+            for category, paths in key_changes.items():
+                changes.setdefault(category, []).extend(paths)
+            changed_keys.update(key_changed_keys)
+        changes = {category: sorted(changes[category]) for category in engine.SEMANTIC_CATEGORIES
+                   if category in changes}
+        return engine.DiffResult(self.mode, rows, not changes, changes=changes, changed_keys=changed_keys)
+
+    def _update_normalized(self, lines, changes, progress):
+        entries, _ = self._edit_entries(lines, changes, progress)
+        engine.report(progress, "Normalizing changed entries")
+        lines1 = self._normalized_lines(entries[0])
+        lines2 = self._normalized_lines(entries[1])
+        alignment = self._alignment
+        changed_rows = alignment.update(lines1, lines2, progress) or (0, 0, 0)
+        self._entries = entries
+        self._lines = lines
+        self.result = engine.DiffResult(self.mode, alignment.rows, lines1 == lines2, opcodes=alignment.opcodes)
+        return self.result, changed_rows
+
+    @staticmethod
+    def _normalized_lines(entries):
+        """
+        The normalized dump of a mapping document, put together from its entries' dumps.
+
+        The dump sorts the top-level keys, and every entry is dumped the same
+        way on its own as inside the whole document.
+        """
+        if not all(type(key) is str for key in entries.keys):
+            raise NotIncremental("non-string top-level keys")
+        lines = []
+        for key in sorted(entries.keys):
+            lines.extend(entries.sources[entries.positions[key]].normalized_lines)
+        return lines
@@ -0,0 +1,348 @@
+"""
+Line-diff algorithms for the side-by-side and normalized views.
+
+All algorithms work on interned lines (each distinct line is replaced by a
+small integer) and return opcodes in the same format as
+``difflib.SequenceMatcher.get_opcodes()``, so the aligner does not care
+which one produced them.
+
+- ``histogram``: git's histogram diff; anchors on unique lines like
+  patience, then splits the gaps on their rarest common lines
+- ``patience``: anchors on lines that are unique in both files
+- ``myers``: the classic minimal edit script (linear-space variant)
+- ``difflib``: ``difflib.SequenceMatcher``, kept as a fallback
+
+Histogram and patience fall back to Myers for regions without suitable
+anchor lines. Every algorithm uses an explicit work stack instead of
+recursion, so long files cannot hit the recursion limit.
+"""
+
+import difflib
+from bisect import bisect_left
+
+ALGORITHM_HISTOGRAM = "histogram"
+ALGORITHM_PATIENCE = "patience"
+ALGORITHM_MYERS = "myers"
+ALGORITHM_DIFFLIB = "difflib"
+ALGORITHMS = (ALGORITHM_HISTOGRAM, ALGORITHM_PATIENCE, ALGORITHM_MYERS, ALGORITHM_DIFFLIB)
+DEFAULT_ALGORITHM = ALGORITHM_HISTOGRAM
+
+# Histogram diff ignores lines that occur more often than this in a region
+# (blank lines, closing braces, ...) when choosing split points
+MAX_CHAIN_LENGTH = 64
+
+# Myers gives up on a minimal script after this many edit steps in one region
+# and splits at the furthest point reached instead, which bounds the
+# O(N*D) worst case on heavily reordered files
+MYERS_MAX_COST = 256
+
+
+def intern_lines(lines1, lines2):
+    """Map both line lists to integer ids so equal lines compare as equal ints."""
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in lines1]
+    b = [ids.setdefault(line, len(ids)) for line in lines2]
+    return a, b
+
+
+def blocks_to_opcodes(blocks, n, m):
+    """Turn sorted ``(i, j, size)`` matching blocks into SequenceMatcher-style opcodes."""
+    opcodes = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(n, m, 0)]:
+        if i < block_i and j < block_j:
+            opcodes.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(("delete", i, block_i, j, block_j))
+        elif j < block_j:
+            opcodes.append(("insert", i, block_i, j, block_j))
+        i, j = block_i + size, block_j + size
+        if size:
+            opcodes.append(("equal", block_i, i, block_j, j))
+    return opcodes
+
+
+def merge_blocks(blocks):
+    """Sort matching blocks and merge the ones that touch."""
+    merged = []
+    for i, j, size in sorted(blocks):
+        if merged:
+            last_i, last_j, last_size = merged[-1]
+            if last_i + last_size == i and last_j + last_size == j:
+                merged[-1] = (last_i, last_j, last_size + size)
+                continue
+        merged.append((i, j, size))
+    return merged
+
+
+def _trim(a, b, a_lo, a_hi, b_lo, b_hi, blocks):
+    """Strip a common prefix and suffix off a region, recording them as blocks."""
+    start = a_lo
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    if a_lo > start:
+        blocks.append((start, b_lo - (a_lo - start), a_lo - start))
+
+    end = a_hi
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+    if a_hi < end:
+        blocks.append((a_hi, b_hi, end - a_hi))
+    return a_lo, a_hi, b_lo, b_hi
+
+
+def _bisect(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Find the middle snake of a region (Myers 1986, section 4b).
+
+    Returns the split point ``(x, y)`` relative to the region, or None when
+    the two sides share no lines at all. Past ``MYERS_MAX_COST`` steps the
+    furthest point reached by the front path is returned instead.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    # If the total number of lines is odd the front path collides with the reverse path
+    front = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    furthest = None
+    furthest_sum = 0
+
+    for d in range(max_d):
+        # Walk the front path one step
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 <= n and y1 <= m and x1 + y1 > furthest_sum:
+                furthest = (x1, y1)
+                furthest_sum = x1 + y1
+            if x1 > n:
+                k1_end += 2
+            elif y1 > m:
+                k1_start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return x1, y1
+
+        # Walk the reverse path one step
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return x1, y1
+
+        if d >= MYERS_MAX_COST and furthest is not None and furthest_sum < n + m:
+            return furthest
+
+    return None
+
+
+def _myers_region(a, b, region, blocks, stack):
+    """Diff one region with Myers, pushing the halves around its middle snake."""
+    a_lo, a_hi, b_lo, b_hi = _trim(a, b, *region, blocks)
+    if a_lo == a_hi or b_lo == b_hi:
+        return
+    split = _bisect(a, b, a_lo, a_hi, b_lo, b_hi)
+    if split is None:
+        return
+    x, y = split
+    stack.append((a_lo + x, a_hi, b_lo + y, b_hi))
+    stack.append((a_lo, a_lo + x, b_lo, b_lo + y))
+
+
+def _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Longest in-order chain of lines that occur exactly once on each side of a region.
+
+    Returns ``(i, j)`` pairs, empty when the sides share no unique line.
+    """
+    # line -> position, or -1 once the line is seen twice
+    unique_a = {}
+    for i in range(a_lo, a_hi):
+        unique_a[a[i]] = -1 if a[i] in unique_a else i
+    unique_b = {}
+    for j in range(b_lo, b_hi):
+        line = b[j]
+        if unique_a.get(line, -1) != -1:
+            unique_b[line] = -1 if line in unique_b else j
+
+    pairs = sorted((unique_a[line], j) for line, j in unique_b.items() if j != -1)
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence of b positions (patience sorting)
+    tails = []
+    tail_indices = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[pile] = j
+            tail_indices[pile] = index
+        previous[index] = tail_indices[pile - 1] if pile else None
+
+    anchors = []
+    index = tail_indices[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _split_on_anchors(anchors, a_lo, a_hi, b_lo, b_hi, blocks, stack):
+    """Record anchors as one-line blocks and push the gaps between them as new regions."""
+    i, j = a_lo, b_lo
+    for anchor_i, anchor_j in anchors:
+        blocks.append((anchor_i, anchor_j, 1))
+        if i < anchor_i or j < anchor_j:
+            stack.append((i, anchor_i, j, anchor_j))
+        i, j = anchor_i + 1, anchor_j + 1
+    if i < a_hi or j < b_hi:
+        stack.append((i, a_hi, j, b_hi))
+
+
+def _patience_region(a, b, region, blocks, stack):
+    """Diff one region by anchoring on lines that occur exactly once on each side."""
+    a_lo, a_hi, b_lo, b_hi = _trim(a, b, *region, blocks)
+    if a_lo == a_hi or b_lo == b_hi:
+        return
+    anchors = _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+    if not anchors:
+        _myers_region(a, b, (a_lo, a_hi, b_lo, b_hi), blocks, stack)
+        return
+    _split_on_anchors(anchors, a_lo, a_hi, b_lo, b_hi, blocks, stack)
+
+
+def _histogram_region(a, b, region, blocks, stack):
+    """
+    Diff one region on its rarest common lines.
+
+    Lines unique to both sides are anchored in order first, as patience does:
+    splitting around the single longest unique run would pair a moved block
+    and push every other block out of alignment. Only a region without unique
+    common lines is split around the longest run of its lowest-occurrence
+    lines.
+    """
+    a_lo, a_hi, b_lo, b_hi = _trim(a, b, *region, blocks)
+    if a_lo == a_hi or b_lo == b_hi:
+        return
+
+    anchors = _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+    if anchors:
+        _split_on_anchors(anchors, a_lo, a_hi, b_lo, b_hi, blocks, stack)
+        return
+
+    positions = {}
+    for i in range(a_lo, a_hi):
+        positions.setdefault(a[i], []).append(i)
+
+    best = None
+    best_length = 0
+    best_count = MAX_CHAIN_LENGTH + 1
+    j = b_lo
+    while j < b_hi:
+        chain = positions.get(b[j])
+        next_j = j + 1
+        if chain is None or len(chain) > best_count:
+            j = next_j
+            continue
+
+        for i in chain:
+            # Extend the match in both directions, tracking its rarest line
+            count = len(chain)
+            start_i, start_j = i, j
+            while start_i > a_lo and start_j > b_lo and a[start_i - 1] == b[start_j - 1]:
+                start_i -= 1
+                start_j -= 1
+                count = min(count, len(positions[a[start_i]]))
+            end_i, end_j = i + 1, j + 1
+            while end_i < a_hi and end_j < b_hi and a[end_i] == b[end_j]:
+                count = min(count, len(positions[a[end_i]]))
+                end_i += 1
+                end_j += 1
+
+            next_j = max(next_j, end_j)
+            length = end_i - start_i
+            if count < best_count or (count == best_count and length > best_length):
+                best = (start_i, start_j, length)
+                best_length = length
+                best_count = count
+        j = next_j
+
+    if best is None:
+        # Only very common lines left; histogram cannot pick a split
+        _myers_region(a, b, (a_lo, a_hi, b_lo, b_hi), blocks, stack)
+        return
+
+    start_i, start_j, length = best
+    blocks.append(best)
+    stack.append((start_i + length, a_hi, start_j + length, b_hi))
+    stack.append((a_lo, start_i, b_lo, start_j))
+
+
+_REGION_FUNCTIONS = {
+    ALGORITHM_HISTOGRAM: _histogram_region,
+    ALGORITHM_PATIENCE: _patience_region,
+    ALGORITHM_MYERS: _myers_region,
+}
+
+
+def matching_blocks(a, b, algorithm=DEFAULT_ALGORITHM):
+    """Return merged ``(i, j, size)`` blocks of equal lines between two id lists."""
+    region_function = _REGION_FUNCTIONS[algorithm]
+    blocks = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        region_function(a, b, stack.pop(), blocks, stack)
+    return merge_blocks(blocks)
+
+
+def diff_opcodes(lines1, lines2, algorithm=DEFAULT_ALGORITHM):
+    """Diff two lists of lines and return SequenceMatcher-style opcodes."""
+    if algorithm == ALGORITHM_DIFFLIB:
+        return difflib.SequenceMatcher(None, lines1, lines2).get_opcodes()
+    if algorithm not in _REGION_FUNCTIONS:
+        raise ValueError(f"Unknown line diff algorithm: {algorithm!r}")
+
+    a, b = intern_lines(lines1, lines2)
+    return blocks_to_opcodes(matching_blocks(a, b, algorithm), len(a), len(b))
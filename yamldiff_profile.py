@@ -0,0 +1,246 @@
+"""
+Per-stage timing and memory instrumentation of a comparison.
+
+Every diff function already reports the stage it enters through its
+``progress`` callback ("Reading files", "Parsing YAML", "Comparing
+structure", "Normalizing", "Dumping YAML", "Matching lines", ...).
+StageProfile is such a callback: it notes when the stage changes and
+forwards the report, so the engine needs no timers of its own and single
+files, multi-document streams, streaming and incremental comparisons are
+all covered. Work outside the engine (rendering in the GUI, formatting the
+output in the CLI) is timed with ``StageProfile.stage()``.
+
+Memory is measured two ways:
+
+- always, the process's peak resident set size at the end of every stage
+  (where the ``resource`` module exists, i.e. not on Windows)
+- with ``trace_memory``, tracemalloc traces the peak of every stage and the
+  allocation sites holding the most memory at the end; this slows the
+  comparison down severalfold
+
+With ``profile`` a cProfile profiler also runs across the comparison, and
+``write_report()`` saves its stats (``.prof``, for pstats or snakeviz) next
+to a text report.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from yamldiff_engine import report
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Functions listed in the text report, by cumulative time
+REPORT_FUNCTIONS = 30
+
+# Allocation sites listed in the text report, by size
+REPORT_ALLOCATIONS = 20
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+# tracemalloc is process-wide: it is started by the first profile that
+# traces memory and stopped when the last one finishes
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def max_rss():
+    """Peak resident set size of the process in bytes, or None where it is not available."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+def format_bytes(size):
+    """A byte count in MB for reports."""
+    return f"{size / 1e6:.1f} MB"
+
+
+class StageTiming:
+    """Time and memory spent in one stage (summed if the stage is entered more than once)."""
+
+    __slots__ = ("stage", "seconds", "max_rss", "peak_traced")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.seconds = 0.0
+        self.max_rss = None
+        self.peak_traced = None
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "seconds": self.seconds,
+            "max_rss_bytes": self.max_rss,
+            "peak_traced_bytes": self.peak_traced,
+        }
+
+
+class StageProfile:
+    """
+    A progress callback that times every stage of a comparison.
+
+    Pass the profile wherever a ``progress`` callback goes; reports are
+    forwarded to ``progress``, so cancellation keeps working. The
+    comparison has to run inside ``running()`` (or ``stage()``), and
+    ``finish()`` must be called once it is over to stop tracing memory;
+    stages timed after that get no traced peak.
+    """
+
+    def __init__(self, progress=None, trace_memory=False, profile=False):
+        self.progress = progress
+        self.trace_memory = trace_memory
+        self.profiler = cProfile.Profile() if profile else None
+        # Stage name -> StageTiming, in the order the stages were first entered
+        self.stages = {}
+        self.total_seconds = 0.0
+        # (size, count, "file:line") of the largest allocation sites, once finished
+        self.allocations = []
+        self._current = None
+        self._stage_started = None
+        self._tracing = False
+        self._finished = False
+
+    def __call__(self, stage, fraction=None):
+        if stage != self._current:
+            self._switch(stage)
+        report(self.progress, stage, fraction)
+
+    def _switch(self, stage):
+        """Close the current stage and start ``stage`` (None to stop timing)."""
+        now = time.perf_counter()
+        if self._current is not None:
+            timing = self.stages.get(self._current)
+            if timing is None:
+                timing = self.stages[self._current] = StageTiming(self._current)
+            timing.seconds += now - self._stage_started
+            timing.max_rss = max_rss()
+            if self._tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                timing.peak_traced = max(peak, timing.peak_traced or 0)
+        if self._tracing and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._current = stage
+        self._stage_started = now
+
+    @contextmanager
+    def running(self):
+        """Time (and profile) the code in the block, which runs on the calling thread."""
+        if self.trace_memory and not self._tracing and not self._finished:
+            _start_tracing()
+            self._tracing = True
+        if self.profiler is not None:
+            self.profiler.enable()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self._switch(None)
+            self.total_seconds += time.perf_counter() - started
+            if self.profiler is not None:
+                self.profiler.disable()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the code in the block as stage ``name``."""
+        with self.running():
+            self._switch(name)
+            yield self
+
+    def finish(self):
+        """Stop tracing memory, keeping the largest allocation sites; returns the profile."""
+        if self._tracing:
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:REPORT_ALLOCATIONS]
+            self.allocations = [(stat.size, stat.count, str(stat.traceback)) for stat in statistics]
+            _stop_tracing()
+            self._tracing = False
+        self._finished = True
+        return self
+
+    @property
+    def max_rss(self):
+        """Peak resident set size of the process at the end of the last stage."""
+        return max((timing.max_rss or 0 for timing in self.stages.values()), default=0) or None
+
+    def summary(self):
+        """One line for a status bar: the time of every stage and the total."""
+        parts = [f"{timing.stage} {timing.seconds * 1000:.0f} ms" for timing in self.stages.values()]
+        text = f"{', '.join(parts)} (total {self.total_seconds * 1000:.0f} ms"
+        if self.max_rss:
+            text += f", peak RSS {format_bytes(self.max_rss)}"
+        return text + ")"
+
+    def format_table(self):
+        """The stages as a text table of time, share of the total and memory."""
+        total = self.total_seconds or 1.0
+        lines = [f"{'stage':<28} {'ms':>9} {'%':>5} {'peak RSS':>10} {'traced':>10}"]
+        for timing in self.stages.values():
+            rss = format_bytes(timing.max_rss) if timing.max_rss else "-"
+            traced = format_bytes(timing.peak_traced) if timing.peak_traced is not None else "-"
+            lines.append(f"{timing.stage:<28} {timing.seconds * 1000:>9.1f} {timing.seconds / total:>5.0%} "
+                         f"{rss:>10} {traced:>10}")
+        lines.append(f"{'total':<28} {self.total_seconds * 1000:>9.1f}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        return {
+            "total_seconds": self.total_seconds,
+            "max_rss_bytes": self.max_rss,
+            "stages": [timing.to_dict() for timing in self.stages.values()],
+            "allocations": [{"size_bytes": size, "count": count, "location": location}
+                            for size, count, location in self.allocations],
+        }
+
+    def format_report(self):
+        """The full text report: stage table, largest allocation sites and hottest functions."""
+        output = [self.format_table()]
+        if self.allocations:
+            output.append("\nLargest allocation sites (still allocated at the end):\n")
+            output.extend(f"{format_bytes(size):>10} {count:>9} blocks  {location}\n"
+                          for size, count, location in self.allocations)
+        if self.profiler is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_FUNCTIONS)
+            output.append("\n" + stream.getvalue())
+        return "".join(output)
+
+    def write_report(self, prefix):
+        """
+        Write ``prefix.txt`` (see ``format_report``) and, when profiling, ``prefix.prof``.
+
+        Returns the paths written.
+        """
+        paths = [prefix + ".txt"]
+        with open(paths[0], "w", encoding="utf-8") as f:
+            f.write(self.format_report())
+        if self.profiler is not None:
+            paths.append(prefix + ".prof")
+            self.profiler.dump_stats(paths[1])
+        return paths
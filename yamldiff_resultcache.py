@@ -0,0 +1,275 @@
+"""
+On-disk cache of finished comparisons.
+
+Comparing the same pair of files again (the same release artifacts for
+every build, or simply relaunching the tool) finds the result on disk and
+shows it without parsing or diffing either file. Entries are keyed by the
+content hashes of both texts, the mode and the options that apply to that
+mode, plus a fingerprint of the diff modules' source, so a code change never
+serves results computed by older code. DeepDiff results also carry the
+installed DeepDiff version, so upgrading it has the same effect.
+
+Each entry is one file: a zlib-compressed marshal dump in which every
+distinct line text is stored once in a string table, both files' lines are
+arrays of integers referring to it and the rows are the span and tag
+columns of their AlignedRows (see ``engine.AlignedRows``). Files are evicted
+least recently used first (a hit refreshes the file's mtime) once the
+directory grows past its byte budget. The cache is best effort: unreadable
+or outdated entries count as misses and write errors are ignored.
+"""
+
+import hashlib
+import importlib.metadata
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from functools import lru_cache
+
+import yamldiff_engine as engine
+
+# Bumped whenever the entry layout changes
+RESULT_FORMAT_VERSION = 2
+
+DEFAULT_RESULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# zlib level: entries are written once and read many times, but a large
+# result is written while the user waits, so favour speed over size
+COMPRESSION_LEVEL = 1
+
+ENTRY_SUFFIX = ".yamldiff"
+
+# Modules whose code decides what a comparison returns
+_RESULT_MODULES = ("yamldiff_engine", "yamldiff_linediff", "yamldiff_treediff", "yamldiff_documents")
+
+
+def default_cache_dir():
+    """The per-user cache directory (``$XDG_CACHE_HOME/yamldiff/results`` or the platform's equivalent)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or tempfile.gettempdir()
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "yamldiff", "results")
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint():
+    """Hash of the source of the modules that compute results (just the format version if unavailable)."""
+    digest = hashlib.blake2b(str(RESULT_FORMAT_VERSION).encode(), digest_size=16)
+    for name in _RESULT_MODULES:
+        module = sys.modules.get(name) or __import__(name)
+        try:
+            with open(module.__file__, "rb") as f:
+                digest.update(f.read())
+        except (OSError, AttributeError, TypeError):
+            pass
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def deepdiff_version():
+    """Installed DeepDiff version, read without importing it (None if it is not installed)."""
+    try:
+        return importlib.metadata.version("deepdiff")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def result_key(source1, source2, mode, algorithm=engine.DEFAULT_ALGORITHM,
+               semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    The cache key of comparing two YamlSources.
+
+    Options that do not affect the mode are left out, so e.g. semantic
+    results are shared between line diff algorithms.
+    """
+    if mode == engine.MODE_SEMANTIC:
+        options = (semantic_engine, tuple(identity_keys))
+        if semantic_engine == engine.SEMANTIC_ENGINE_DEEPDIFF:
+            # Its code is not in code_fingerprint(), but its output decides the result
+            options += (deepdiff_version(),)
+    else:
+        options = (algorithm,)
+    parts = (code_fingerprint(), source1.digest, source2.digest, mode) + options
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=20).hexdigest()
+
+
+class _StringTable:
+    """Assigns each distinct string an index; index 0 is None."""
+
+    def __init__(self):
+        self.strings = [None]
+        self._index = {None: 0}
+
+    def __call__(self, text):
+        index = self._index.get(text)
+        if index is None:
+            index = self._index[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+
+def _pack_result(result, table):
+    """The marshal-friendly form of a DiffResult; line texts refer to ``table``."""
+    documents = getattr(result, "documents", None)
+    if documents is not None:
+        # Stream results rebuild their rows and changes from the documents
+        rows = None
+        documents = tuple((document.position, document.total, document.left_index, document.right_index,
+                           document.label, _pack_result(document.result, table)) for document in documents)
+    else:
+        lines1, lines2, *columns = result.rows.to_columns()
+        rows = (array("i", map(table, lines1)).tobytes(), array("i", map(table, lines2)).tobytes(), *columns)
+    return (result.mode, result.identical, tuple(map(tuple, result.opcodes)), result.changes,
+            frozenset(result.changed_keys), rows, documents)
+
+
+def _unpack_result(packed, strings):
+    """Rebuild the DiffResult packed by _pack_result()."""
+    mode, identical, opcodes, changes, changed_keys, rows, documents = packed
+    if documents is not None:
+        # Imported here because yamldiff_documents builds on the engine
+        import yamldiff_documents
+        return yamldiff_documents.StreamDiffResult(mode, [
+            yamldiff_documents.DocumentDiff(position, total, left_index, right_index, label,
+                                            _unpack_result(document, strings))
+            for position, total, left_index, right_index, label, document in documents])
+
+    line_bytes1, line_bytes2, *columns = rows
+    lines = []
+    for line_bytes in (line_bytes1, line_bytes2):
+        indexes = array("i")
+        indexes.frombytes(line_bytes)
+        lines.append([strings[index] for index in indexes])
+    rows = engine.AlignedRows.from_columns(*lines, *columns)
+    return engine.DiffResult(mode, rows, identical, opcodes=list(opcodes), changes=changes,
+                             changed_keys=set(changed_keys))
+
+
+def encode_result(result):
+    """Serialize a DiffResult (or StreamDiffResult) to compact bytes."""
+    table = _StringTable()
+    packed = _pack_result(result, table)
+    return zlib.compress(marshal.dumps((RESULT_FORMAT_VERSION, table.strings, packed)), COMPRESSION_LEVEL)
+
+
+def decode_result(data):
+    """Rebuild a result from encode_result() bytes; raises ValueError for anything else."""
+    try:
+        version, strings, packed = marshal.loads(zlib.decompress(data))
+        if version != RESULT_FORMAT_VERSION:
+            raise ValueError(f"format version {version}, expected {RESULT_FORMAT_VERSION}")
+        return _unpack_result(packed, strings)
+    except (zlib.error, EOFError, TypeError, ValueError, IndexError) as e:
+        raise ValueError(f"Not a cached result: {e}") from None
+
+
+class ResultCache:
+    """A directory of encoded results with a byte budget and LRU eviction."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_RESULT_CACHE_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """The cached result for ``key``, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            result = decode_result(data)
+        except OSError:
+            result = None
+        except ValueError:
+            # Damaged or from another format version: drop it
+            self._remove(path)
+            result = None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        try:
+            # The mtime is the entry's last use for LRU eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, result):
+        """Store a result, then evict old entries beyond the budget; returns False if it could not be written."""
+        data = encode_result(result)
+        if len(data) > self.max_bytes:
+            return False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write under a temporary name so readers never see half an entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                self._remove(temp_path)
+                raise
+        except OSError:
+            return False
+        self._evict()
+        return True
+
+    def _entries(self):
+        """``(mtime, size, path)`` of every entry in the directory."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if name.endswith(ENTRY_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Delete least recently used entries until the directory fits the budget."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def size(self):
+        """Bytes held by the cached entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """Delete every cached result."""
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def __len__(self):
+        return len(self._entries())
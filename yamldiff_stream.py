@@ -0,0 +1,487 @@
+"""
+Streaming comparison of YAML files too large to load at once.
+
+The other modes read both files completely, parse them and build every
+display row, so multi-gigabyte dumps and logs cannot be compared. The
+streaming mode reads both files incrementally and cuts them into top-level
+sections: one per top-level key of a mapping, one per item of a top-level
+sequence, split again at ``---`` document markers. Sections are matched
+across the files and every matched pair is diffed on its own (in any mode)
+and handed to the caller as soon as it is known:
+
+- mapping sections are matched by their key, within the same document
+- sequence items are matched by an identity field (``name``, ``id``, ...)
+  like in the tree diff, otherwise by equal content
+- unmatched sequence items are paired by position at the end; anything left
+  over is reported removed or added
+
+Only the location, key and content hash of a section are kept while it waits
+for its partner; its text is read again from the file when the pair is
+diffed. Peak memory therefore follows the largest section and how far apart
+matching sections are in the two files, not the file size. Identical
+sections are recognized by hash and never parsed: sequence items are only
+parsed (in batches) when no item with the same content turned up on the
+other side.
+
+Sections are parsed on their own, so aliases to anchors in another section
+cannot be resolved; such pairs fall back to a line diff.
+"""
+
+import hashlib
+import os
+import re
+from collections import deque
+
+import yaml
+
+import yamldiff_engine as engine
+import yamldiff_treediff as treediff
+from yamldiff_documents import diff_document_pair, offset_rows
+
+# Sections read between two progress reports
+PROGRESS_SECTIONS = 1000
+
+# Unmatched sequence items waiting to be parsed for their identity field
+RESOLVE_BATCH = 256
+
+# A ``key: value`` line with a plain (unquoted, simple) key
+PLAIN_KEY = re.compile(r"([^\s#'\"?{}\[\]!&*%@`|>,-][^#:]*?|-[^\s#:][^#:]*?)\s*:(?:\s|$)")
+
+# Kinds of sections
+SECTION_KEY = "key"
+SECTION_ITEM = "item"
+SECTION_OTHER = "other"
+
+SECTION_STATUSES = ("identical", "changed", "removed", "added")
+
+
+class Section:
+    """Location and identity of one top-level section of a file (its text stays on disk)."""
+
+    __slots__ = ("document", "kind", "identity", "resolved", "matched", "label",
+                 "first_line", "offset", "length", "digest")
+
+    def __init__(self, document, kind, identity, label, first_line, offset, length, digest):
+        self.document = document
+        self.kind = kind
+        # Hashable key the partner section must share, None if there is none;
+        # only known for sequence items once they have been resolved
+        self.identity = identity
+        self.resolved = kind != SECTION_ITEM
+        # Set once the section has been paired
+        self.matched = False
+        self.label = label
+        # 0-based line of the section in its file, and its bytes
+        self.first_line = first_line
+        self.offset = offset
+        self.length = length
+        self.digest = digest
+
+    @property
+    def match_key(self):
+        """Key the partner section must have (only for sections with an identity)."""
+        return self.document, self.kind, self.identity
+
+    @property
+    def content_key(self):
+        """Key of a section with the same content."""
+        return self.document, self.kind, self.digest
+
+
+def _starts_section(line):
+    """True for a line that starts a top-level entry (not indented, not a comment)."""
+    return line[:1] not in (b" ", b"\t", b"#", b"\n", b"\r", b"")
+
+
+def _is_item(line):
+    """True for a line that starts a sequence item at column 0 (``- ...``)."""
+    return line[:1] == b"-" and line[1:2] in (b" ", b"\t", b"\n", b"\r", b"")
+
+
+def _is_marker(line):
+    """True for ``---`` / ``...`` document markers and ``%`` directives."""
+    return line.startswith((b"---", b"...", b"%")) and (len(line) == 3 or line[3:4].isspace() or line[:1] == b"%")
+
+
+def _first_line(text):
+    """The first line of a section that is not blank or a comment."""
+    for line in text.splitlines():
+        if line.strip() and not line.startswith("#"):
+            return line
+    return ""
+
+
+def describe_section(text, document, item_number):
+    """
+    Kind, identity and label of a section from its text.
+
+    Mapping entries are identified by the text of their key, which is only
+    parsed when it is not a plain key; sequence items start out without an
+    identity (see resolve_item()).
+    """
+    prefix = f"document {document + 1}: " if document else ""
+    first_line = _first_line(text)
+
+    if first_line.startswith("-") and first_line[1:2] in ("", " ", "\t"):
+        return SECTION_ITEM, None, f"{prefix}item {item_number + 1}"
+
+    match = PLAIN_KEY.match(first_line)
+    if match:
+        key = match.group(1)
+        return SECTION_KEY, key, f"{prefix}{key}"
+    try:
+        data = yaml.load(first_line, Loader=engine.yaml_loader())
+    except yaml.YAMLError:
+        data = None
+    if isinstance(data, dict) and len(data) == 1:
+        key = next(iter(data))
+        # A quoted key matches the same key written plainly in the other file
+        return SECTION_KEY, key if isinstance(key, str) else engine.scalar_sort_key(key), f"{prefix}{key}"
+    return SECTION_OTHER, None, f"{prefix}line {first_line.strip()[:40]}"
+
+
+def resolve_item(section, text, identity_fields):
+    """Parse a sequence item section and set its identity (and label) from its identity fields."""
+    section.resolved = True
+    try:
+        data = yaml.load(text, Loader=engine.yaml_loader())
+    except yaml.YAMLError:
+        return
+    if not isinstance(data, list) or len(data) != 1:
+        return
+    identity = treediff.item_identity(data[0], identity_fields)
+    if identity is None:
+        return
+    fields = identity_fields[identity[0]]
+    value = data[0]
+    for field in fields:
+        value = value[field]
+    section.identity = identity
+    prefix = f"document {section.document + 1}: " if section.document else ""
+    section.label = f"{prefix}- {'.'.join(fields)}: {value}"
+
+
+def read_sections(path):
+    """
+    Yield the top-level Sections of a YAML file, reading it line by line.
+
+    Comment and blank lines belong to the section before them (or, at the
+    start of a document, the one after them). Sequence items written at
+    column 0 under a top-level key (``key:`` then ``- a``) are that key's
+    value and stay in its section. Only the current section is held in
+    memory.
+    """
+    document = 0
+    document_used = False
+    item_number = 0
+    buffer = []
+    buffer_started = False
+    # True while the current section is a top-level key rather than a sequence item
+    key_section = False
+    first_line = offset = 0
+    line_number = position = 0
+
+    def close():
+        data = b"".join(buffer)
+        kind, identity, label = describe_section(data.decode("utf-8"), document, item_number)
+        return Section(document, kind, identity, label, first_line, offset, len(data),
+                       hashlib.blake2b(data, digest_size=16).digest())
+
+    with open(path, "rb") as f:
+        for line in f:
+            marker = _is_marker(line)
+            splits = _starts_section(line) and not (key_section and _is_item(line))
+            if buffer_started and (marker or splits):
+                section = close()
+                yield section
+                document_used = True
+                if section.kind == SECTION_ITEM:
+                    item_number += 1
+            if marker or (buffer_started and splits):
+                buffer = []
+                buffer_started = False
+            if marker:
+                if line.startswith(b"---") and document_used:
+                    document += 1
+                    document_used = False
+                    item_number = 0
+                # Content after ``---`` on the same line starts a section
+                if not line.startswith(b"---") or not line[3:].split(b"#", 1)[0].strip():
+                    line_number += 1
+                    position += len(line)
+                    continue
+            if not buffer:
+                first_line = line_number
+                offset = position
+            if _starts_section(line) and not buffer_started:
+                buffer_started = True
+                key_section = not _is_item(line)
+            buffer.append(line)
+            line_number += 1
+            position += len(line)
+        if buffer_started:
+            yield close()
+
+
+def read_section_text(handle, section):
+    """The text of a section, read again from its file."""
+    handle.seek(section.offset)
+    return handle.read(section.length).decode("utf-8")
+
+
+def diff_section_pair(section1, section2, text1, text2, mode, algorithm=engine.DEFAULT_ALGORITHM,
+                      semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Diff one pair of sections (None for a missing side).
+
+    Returns ``(result, error)``. Rows are numbered by their line in the
+    file; in the normalized mode by their line in the section's dump, which
+    starts with a comment naming the section. A section that cannot be
+    parsed on its own is compared line by line, with the error returned.
+    """
+    source1 = engine.YamlSource(text1, section1.first_line) if section1 is not None else None
+    source2 = engine.YamlSource(text2, section2.first_line) if section2 is not None else None
+    label = (section1 or section2).label
+    if mode != engine.MODE_SIDE_BY_SIDE:
+        try:
+            return diff_document_pair(source1, source2, mode, algorithm, separator=f"# {label}",
+                                      semantic_engine=semantic_engine, identity_keys=identity_keys), None
+        except yaml.YAMLError as e:
+            error = str(e)
+    else:
+        error = None
+    if source1 is None or source2 is None:
+        # Row building for one-sided sections is the same in every line mode
+        return diff_document_pair(source1, source2, engine.MODE_SEMANTIC), error
+    result = engine.side_by_side_diff(source1, source2, algorithm=algorithm)
+    offset_rows(result.rows, source1.first_line, source2.first_line)
+    return result, error
+
+
+class SectionDiff:
+    """The comparison of one matched pair of sections (result is None for identical ones)."""
+
+    def __init__(self, section1, section2, result=None, error=None):
+        self.left = section1
+        self.right = section2
+        self.result = result
+        self.error = error
+
+    @property
+    def label(self):
+        """Name of the section (key, identity or position)."""
+        return (self.left or self.right).label
+
+    @property
+    def status(self):
+        """``identical``, ``changed``, ``removed`` (left only) or ``added`` (right only)."""
+        if self.right is None:
+            return "removed"
+        if self.left is None:
+            return "added"
+        return "identical" if self.result is None or self.result.identical else "changed"
+
+    @property
+    def difference_count(self):
+        """Differences inside the pair; a one-sided section counts as one."""
+        if self.left is None or self.right is None:
+            return 1
+        return self.result.difference_count if self.result is not None else 0
+
+    def to_dict(self):
+        """Return a JSON-friendly representation of the pair, with its rows."""
+        return {
+            "label": self.label,
+            "status": self.status,
+            "left_line": self.left.first_line + 1 if self.left is not None else None,
+            "right_line": self.right.first_line + 1 if self.right is not None else None,
+            "difference_count": self.difference_count,
+            "error": self.error,
+            "result": self.result.to_dict() if self.result is not None else None,
+        }
+
+
+def iter_section_diffs(path1, path2, mode=engine.MODE_SIDE_BY_SIDE, progress=None,
+                       algorithm=engine.DEFAULT_ALGORITHM, semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE,
+                       identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Compare two YAML files section by section, yielding a SectionDiff per pair.
+
+    Pairs are yielded as soon as both sections are known, identical ones
+    included (without rows); unpaired sections come last. ``progress`` may
+    raise DiffCancelled between sections.
+    """
+    identity_fields = treediff.parse_identity_keys(identity_keys)
+    sizes = (max(os.path.getsize(path1), 1), max(os.path.getsize(path2), 1))
+    readers = (read_sections(path1), read_sections(path2))
+    consumed = [0, 0]
+    finished = [False, False]
+    # Sections waiting for a partner, per side: by identity and by content
+    by_identity = ({}, {})
+    by_content = ({}, {})
+    unresolved = []
+    handles = (open(path1, "rb"), open(path2, "rb"))
+
+    def take(index, key):
+        """Pop the first section filed under ``key``."""
+        queue = index.get(key)
+        if not queue:
+            return None
+        section = queue.popleft()
+        if not queue:
+            del index[key]
+        return section
+
+    def discard(side, section):
+        """Remove a paired section from the waiting indexes it is still filed in."""
+        section.matched = True
+        for index, key in ((by_identity[side], section.match_key), (by_content[side], section.content_key)):
+            queue = index.get(key)
+            if queue and section in queue:
+                queue.remove(section)
+                if not queue:
+                    del index[key]
+
+    def compare(section1, section2):
+        for side, section in enumerate((section1, section2)):
+            if section is not None:
+                discard(side, section)
+        if section1 is not None and section2 is not None and section1.digest == section2.digest:
+            return SectionDiff(section1, section2)
+        text1 = read_section_text(handles[0], section1) if section1 is not None else None
+        text2 = read_section_text(handles[1], section2) if section2 is not None else None
+        result, error = diff_section_pair(section1, section2, text1, text2, mode, algorithm,
+                                          semantic_engine, identity_keys)
+        return SectionDiff(section1, section2, result, error)
+
+    def pair(side, section, partner):
+        return compare(section, partner) if side == 0 else compare(partner, section)
+
+    def match_identity(side, section):
+        """Pair a section by identity, or file it to wait for its partner."""
+        partner = take(by_identity[1 - side], section.match_key)
+        if partner is not None:
+            return pair(side, section, partner)
+        by_identity[side].setdefault(section.match_key, deque()).append(section)
+        return None
+
+    def resolve():
+        """Parse the waiting sequence items and pair those whose identity matches."""
+        for side, section in unresolved:
+            if section.matched:
+                continue
+            resolve_item(section, read_section_text(handles[side], section), identity_fields)
+            if section.identity is not None:
+                section_diff = match_identity(side, section)
+                if section_diff is not None:
+                    yield section_diff
+        unresolved.clear()
+
+    try:
+        count = 0
+        while not all(finished):
+            # Read from the side that is further behind, so matching
+            # sections of similar files arrive close together
+            side = 0 if finished[1] or (not finished[0] and consumed[0] / sizes[0] <= consumed[1] / sizes[1]) else 1
+            section = next(readers[side], None)
+            if section is None:
+                finished[side] = True
+                continue
+            consumed[side] = section.offset + section.length
+            count += 1
+            if count % PROGRESS_SECTIONS == 0:
+                engine.report(progress, "Streaming sections", sum(consumed) / sum(sizes))
+
+            if section.identity is not None:
+                section_diff = match_identity(side, section)
+                if section_diff is not None:
+                    yield section_diff
+                continue
+            # Equal content first: identical items are never parsed
+            partner = take(by_content[1 - side], section.content_key)
+            if partner is not None:
+                yield pair(side, section, partner)
+                continue
+            by_content[side].setdefault(section.content_key, deque()).append(section)
+            if not section.resolved:
+                unresolved.append((side, section))
+                if len(unresolved) >= RESOLVE_BATCH:
+                    yield from resolve()
+
+        engine.report(progress, "Comparing unmatched sections")
+        yield from resolve()
+
+        # Sections without an identity that found no equal partner: pair by
+        # position per document; the rest only exist on one side
+        leftovers = []
+        for side in (0, 1):
+            waiting = {id(section): section for index in (by_identity[side], by_content[side])
+                       for queue in index.values() for section in queue}
+            leftovers.append(sorted(waiting.values(), key=lambda section: section.offset))
+        unkeyed = {}
+        for section in leftovers[1]:
+            if section.identity is None:
+                unkeyed.setdefault(section.document, deque()).append(section)
+        for section in leftovers[0]:
+            partners = unkeyed.get(section.document)
+            if section.identity is None and partners:
+                yield compare(section, partners.popleft())
+            else:
+                yield compare(section, None)
+        for section in leftovers[1]:
+            if not section.matched:
+                yield compare(None, section)
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+class StreamResult:
+    """Summary of a streaming comparison; the section diffs themselves are not kept."""
+
+    def __init__(self, mode, path1, path2, counts, difference_count):
+        self.mode = mode
+        self.path1 = path1
+        self.path2 = path2
+        self.counts = counts
+        self.difference_count = difference_count
+
+    @property
+    def identical(self):
+        """True if every section has an identical partner."""
+        return all(self.counts[status] == 0 for status in SECTION_STATUSES if status != "identical")
+
+    def to_dict(self):
+        """Return a JSON-friendly representation of the summary."""
+        return {
+            "mode": self.mode,
+            "left": self.path1,
+            "right": self.path2,
+            "identical": self.identical,
+            "difference_count": self.difference_count,
+            "sections": dict(self.counts),
+        }
+
+
+def stream_diff(path1, path2, mode=engine.MODE_SIDE_BY_SIDE, progress=None, algorithm=engine.DEFAULT_ALGORITHM,
+                on_section=None, semantic_engine=engine.DEFAULT_SEMANTIC_ENGINE,
+                identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Stream-compare two YAML files and return a StreamResult.
+
+    ``on_section`` is called with every SectionDiff that is not identical, in
+    the order they are found.
+    """
+    if mode not in engine.MODES:
+        raise ValueError(f"Unknown comparison mode: {mode!r}")
+    if semantic_engine not in engine.SEMANTIC_ENGINES:
+        raise ValueError(f"Unknown semantic engine: {semantic_engine!r}")
+    counts = dict.fromkeys(SECTION_STATUSES, 0)
+    difference_count = 0
+    for section_diff in iter_section_diffs(path1, path2, mode, progress, algorithm, semantic_engine, identity_keys):
+        status = section_diff.status
+        counts[status] += 1
+        difference_count += section_diff.difference_count
+        if status != "identical" and on_section is not None:
+            on_section(section_diff)
+    return StreamResult(mode, path1, path2, counts, difference_count)
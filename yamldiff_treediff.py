@@ -0,0 +1,217 @@
+"""
+Structural, order-agnostic diff of two parsed YAML documents.
+
+This is the default engine of the semantic mode and a faster alternative to
+``DeepDiff(ignore_order=True)``, which hashes every list element and tries
+to pair it with every other one; on lists of thousands of records that gets
+very slow and memory hungry. Here both trees are walked once:
+
+- the canonical key of every container is computed up front (see
+  ``yamldiff_engine.canonical_forms``), so equal subtrees are skipped
+  without being visited
+- list items with equal content are paired first
+- the remaining records are paired by an identity field such as ``name``,
+  ``id`` or ``metadata.name``, and records without one by their overlap
+- whatever is left is reported as added or removed
+
+Changes are reported under DeepDiff's category names, so the semantic
+highlighting works the same with either engine.
+"""
+
+import yamldiff_engine as engine
+
+# Leftover records on both sides of a list are only paired by overlap when
+# there are at most this many (left, right) candidates to score
+PAIRING_MAX_CANDIDATES = 250000
+
+# Share of top-level entries two records must have in common to be paired
+PAIRING_MIN_OVERLAP = 0.5
+
+
+def format_path(path):
+    """DeepDiff-style path string: ``root['spec'][0]``."""
+    return "root" + "".join(f"[{step!r}]" for step in path)
+
+
+def parse_identity_keys(identity_keys):
+    """Split dotted identity keys (``metadata.name``) into field tuples."""
+    return [tuple(key.split(".")) for key in identity_keys]
+
+
+def item_identity(item, identity_fields):
+    """
+    Identity of a list item: the first identity field it has, as a hashable key.
+
+    Returns None for items that are not mappings or have none of the fields
+    (or only container values under them).
+    """
+    if type(item) is not dict:
+        return None
+    for position, fields in enumerate(identity_fields):
+        value = item
+        for field in fields:
+            if type(value) is not dict or field not in value:
+                value = None
+                break
+            value = value[field]
+        if value is not None and type(value) is not dict and type(value) is not list:
+            return position, engine.scalar_sort_key(value)
+    return None
+
+
+def overlap_pairs(items1, items2, positions1, positions2, value_key1, value_key2):
+    """
+    Pair leftover records (mappings) of two lists by their shared entries.
+
+    Each record is scored against every other one by the share of
+    ``(key, value)`` entries they have in common; pairs are taken greedily,
+    best first, down to PAIRING_MIN_OVERLAP.
+    """
+    records1 = [i for i in positions1 if type(items1[i]) is dict and items1[i]]
+    records2 = [j for j in positions2 if type(items2[j]) is dict and items2[j]]
+    if not records1 or not records2 or len(records1) * len(records2) > PAIRING_MAX_CANDIDATES:
+        return []
+
+    def entries(record, value_key):
+        return {(engine.scalar_sort_key(key), value_key(value)) for key, value in record.items()}
+
+    entries2 = [(j, entries(items2[j], value_key2)) for j in records2]
+    candidates = []
+    for i in records1:
+        left = entries(items1[i], value_key1)
+        for j, right in entries2:
+            score = len(left & right) / max(len(left), len(right))
+            if score >= PAIRING_MIN_OVERLAP:
+                candidates.append((-score, i, j))
+    candidates.sort()
+
+    pairs = []
+    taken1 = set()
+    taken2 = set()
+    for _, i, j in candidates:
+        if i not in taken1 and j not in taken2:
+            taken1.add(i)
+            taken2.add(j)
+            pairs.append((i, j))
+    return pairs
+
+
+def match_items(items1, items2, value_key1, value_key2, identity_fields):
+    """
+    Pair the items of two lists, ignoring order.
+
+    ``value_key1`` and ``value_key2`` return the canonical key of an item of
+    each list. Returns ``(pairs, removed, added)``: ``(i, j)`` positions of
+    items that differ but belong together, and the positions only found on
+    the left or the right. Items that are equal on both sides are left out.
+    """
+    # Equal content: pair by canonical key, duplicates in order
+    unmatched2 = {}
+    for j, item in enumerate(items2):
+        unmatched2.setdefault(value_key2(item), []).append(j)
+    for positions in unmatched2.values():
+        positions.reverse()
+    left = []
+    for i, item in enumerate(items1):
+        positions = unmatched2.get(value_key1(item))
+        if positions:
+            positions.pop()
+        else:
+            left.append(i)
+    right = sorted(j for positions in unmatched2.values() for j in positions)
+    if not left or not right:
+        return [], left, right
+
+    # Same identity field value: the same record, changed
+    right_by_identity = {}
+    unkeyed2 = []
+    for j in right:
+        identity = item_identity(items2[j], identity_fields)
+        if identity is None:
+            unkeyed2.append(j)
+        else:
+            right_by_identity.setdefault(identity, []).append(j)
+    pairs = []
+    removed = []
+    unkeyed1 = []
+    for i in left:
+        identity = item_identity(items1[i], identity_fields)
+        if identity is None:
+            unkeyed1.append(i)
+        elif right_by_identity.get(identity):
+            pairs.append((i, right_by_identity[identity].pop(0)))
+        else:
+            removed.append(i)
+    added = [j for positions in right_by_identity.values() for j in positions]
+
+    # Records without an identity: pair the most similar ones
+    similar = overlap_pairs(items1, items2, unkeyed1, unkeyed2, value_key1, value_key2)
+    pairs.extend(similar)
+    paired1 = {i for i, _ in similar}
+    paired2 = {j for _, j in similar}
+    removed.extend(i for i in unkeyed1 if i not in paired1)
+    added.extend(j for j in unkeyed2 if j not in paired2)
+    return sorted(pairs), sorted(removed), sorted(added)
+
+
+def diff_trees(data1, data2, identity_keys=engine.DEFAULT_IDENTITY_KEYS):
+    """
+    Compare two parsed documents, ignoring the order of list items.
+
+    Returns a dict mapping DeepDiff category names to lists of
+    ``(path, left_path, right_path)``: the path string as DeepDiff prints it
+    and the path tuples of the entry in each document (None for the side
+    where it does not exist). List positions in the tuples are the items'
+    positions in the original documents.
+    """
+    forms1 = engine.canonical_forms(data1)
+    forms2 = engine.canonical_forms(data2)
+    identity_fields = parse_identity_keys(identity_keys)
+    scalar_sort_key = engine.scalar_sort_key
+
+    def key_function(forms):
+        def value_key(value):
+            if type(value) is dict or type(value) is list:
+                return forms[id(value)][0]
+            return scalar_sort_key(value)
+        return value_key
+
+    value_key1 = key_function(forms1)
+    value_key2 = key_function(forms2)
+
+    changes = {}
+
+    def record(category, path, left_path, right_path):
+        changes.setdefault(category, []).append((format_path(path), left_path, right_path))
+
+    # (left value, right value, left path, right path); an explicit stack
+    # so deeply nested documents do not hit the recursion limit
+    stack = [(data1, data2, (), ())]
+    while stack:
+        value1, value2, path1, path2 = stack.pop()
+        if type(value1) is not type(value2):
+            record("type_changes", path1, path1, path2)
+        elif type(value1) is dict:
+            if forms1[id(value1)][0] == forms2[id(value2)][0]:
+                continue
+            for key, child in value1.items():
+                if key in value2:
+                    stack.append((child, value2[key], path1 + (key,), path2 + (key,)))
+                else:
+                    record("dictionary_item_removed", path1 + (key,), path1 + (key,), None)
+            for key in value2:
+                if key not in value1:
+                    record("dictionary_item_added", path1 + (key,), None, path2 + (key,))
+        elif type(value1) is list:
+            if forms1[id(value1)][0] == forms2[id(value2)][0]:
+                continue
+            pairs, removed, added = match_items(value1, value2, value_key1, value_key2, identity_fields)
+            for i, j in pairs:
+                stack.append((value1[i], value2[j], path1 + (i,), path2 + (j,)))
+            for i in removed:
+                record("iterable_item_removed", path1 + (i,), path1 + (i,), None)
+            for j in added:
+                record("iterable_item_added", path1 + (j,), None, path2 + (j,))
+        elif scalar_sort_key(value1) != scalar_sort_key(value2):
+            record("values_changed", path1, path1, path2)
+    return changes
@@ -0,0 +1,284 @@
+"""
+Virtualized side-by-side diff view.
+
+The aligned diff rows stay in memory and only the rows around the viewport
+(plus a small buffer) are materialized into the two text widgets, so memory
+use and scroll latency do not grow with file size.
+"""
+
+import tkinter.font as tkfont
+
+import yamldiff_engine as engine
+
+# Maximum number of (text, tag) runs pushed to Tk in a single insert call
+INSERT_BATCH_RUNS = 1000
+
+# Rows materialized above and below the visible area
+VIEW_BUFFER_ROWS = 200
+
+# Tag for the characters that differ inside a "changed" row
+CHANGED_SPAN_TAG = "changed_span"
+
+
+# Text mark that follows the insertion point of bulk_insert()
+INSERT_MARK = "yamldiff_insert"
+
+
+def bulk_insert(textbox, runs, index="end"):
+    """Insert (text, tag) runs into a textbox (at the end by default) using as few Tcl calls as possible."""
+    # tk.Text.insert accepts several text/tag pairs per call, but CTkTextbox.insert
+    # only forwards one, so talk to the wrapped tk.Text directly
+    text_widget = getattr(textbox, "_textbox", textbox)
+    if index != "end":
+        # A mark moves past the text inserted at it, so batches stay in order
+        text_widget.mark_set(INSERT_MARK, index)
+        index = INSERT_MARK
+    for start in range(0, len(runs), INSERT_BATCH_RUNS):
+        args = []
+        for text, tag in runs[start:start + INSERT_BATCH_RUNS]:
+            args.append(text)
+            args.append(tag)
+        text_widget.insert(index, *args)
+
+
+def banner_lines(text, tag):
+    """Split a header/footer message into ``(line, tag)`` display lines."""
+    lines = text.split("\n")
+    if text.endswith("\n"):
+        lines.pop()
+    return [(line, tag) for line in lines]
+
+
+class VirtualDiffView:
+    """
+    Drives a pair of textboxes and a shared scrollbar as one virtual document.
+
+    The document is ``header + rows + footer``: banner lines above and below
+    the aligned diff rows. ``top`` is the document line shown at the top of
+    both panes; the textboxes only ever contain the window of lines from
+    ``window_start`` to ``window_end``.
+    """
+
+    def __init__(self, left_box, right_box, scrollbar, buffer_rows=VIEW_BUFFER_ROWS):
+        self.boxes = (left_box, right_box)
+        self.text_widgets = tuple(getattr(box, "_textbox", box) for box in self.boxes)
+        self.scrollbar = scrollbar
+        self.buffer_rows = buffer_rows
+        # Highlight the changed characters of aligned "changed" rows
+        self.intraline = True
+
+        self.header = []
+        self.rows = []
+        self.footer = []
+        self.aligned = False
+        self.top = 0
+        self.window_start = 0
+        self.window_end = 0
+        self._line_height = None
+
+        for text_widget in self.text_widgets:
+            text_widget.configure(yscrollcommand=self._on_text_scrolled)
+        left_box.bind("<Configure>", lambda event: self.refresh(), add="+")
+
+    # --- Document model ---
+
+    @property
+    def line_count(self):
+        """Number of lines in the whole virtual document."""
+        return len(self.header) + len(self.rows) + len(self.footer)
+
+    def set_content(self, rows=(), header=(), footer=(), aligned=True, keep_position=False):
+        """
+        Replace the document and scroll back to the top.
+
+        ``aligned`` says the rows pair up matching lines, so changed rows get
+        intra-line highlighting; semantic rows are only paired by position.
+        ``keep_position`` keeps the current scroll position instead, for
+        content that grows while the user reads it.
+        """
+        self.header = list(header)
+        self.rows = rows
+        self.footer = list(footer)
+        self.aligned = aligned
+        top = min(self.top, max(0, self.line_count - self.visible_line_count())) if keep_position else 0
+        self.top = top
+        self.window_start = self.window_end = 0
+        self._materialize(top)
+
+    def update_rows(self, rows, changed_rows, header=None, footer=None):
+        """
+        Swap in the rows of an incremental re-diff, redrawing only what changed on screen.
+
+        ``changed_rows`` is ``(start, old_end, new_end)``: ``rows[start:new_end]``
+        replaced ``self.rows[start:old_end]`` and all other rows are the same.
+        Rows the panes do not currently show are not drawn at all. A header
+        or footer with a different number of lines redraws the whole window.
+        """
+        header = self.header if header is None else list(header)
+        footer = self.footer if footer is None else list(footer)
+        if len(header) != len(self.header) or len(footer) != len(self.footer):
+            self.set_content(rows, header, footer, self.aligned, keep_position=True)
+            return
+
+        start, old_end, new_end = changed_rows
+        rows_start = len(header)
+        window_at_end = self.window_end == self.line_count
+        changed_header = [line for line, (old, new) in enumerate(zip(self.header, header)) if old != new]
+        changed_footer = [line for line, (old, new) in enumerate(zip(self.footer, footer)) if old != new]
+        self.header = header
+        self.rows = rows
+        self.footer = footer
+
+        if old_end != new_end and (rows_start + start < self.window_end or window_at_end):
+            # Rows moved up or down inside the window: draw it again where it is
+            visible = self.visible_line_count()
+            self._materialize(max(0, min(self.top, self.line_count - visible)))
+            return
+        for line in changed_header:
+            self._redraw(line, line + 1)
+        if old_end == new_end:
+            self._redraw(rows_start + start, rows_start + new_end)
+        footer_start = rows_start + len(rows)
+        for line in changed_footer:
+            self._redraw(footer_start + line, footer_start + line + 1)
+        self._place(self.top)
+
+    def _redraw(self, start, end):
+        """Draw document lines ``start`` to ``end`` again where they are shown (same number of lines)."""
+        start = max(start, self.window_start)
+        end = min(end, self.window_end)
+        if start >= end:
+            return
+        first_index = f"{start - self.window_start + 1}.0"
+        end_index = f"{end - self.window_start + 1}.0"
+        for side, box in zip(("left", "right"), self.boxes):
+            box.configure(state="normal")
+            box.delete(first_index, end_index)
+            bulk_insert(box, self._window_runs(side, start, end), first_index)
+            box.configure(state="disabled")
+        if self.intraline and self.aligned:
+            self._highlight_changed_spans(start, end)
+
+    def show_message(self, text, tag):
+        """Replace the document with a single message (e.g. an error) in both panes."""
+        self.set_content(header=banner_lines(text, tag))
+
+    def _window_runs(self, side, start, end):
+        """Build the (text, tag) runs for document lines ``start`` to ``end`` of one pane."""
+        runs = []
+        rows_start = len(self.header)
+        rows_end = rows_start + len(self.rows)
+
+        for text, tag in self.header[start:min(end, rows_start)]:
+            runs.append((text + "\n", tag))
+        if start < rows_end and end > rows_start:
+            runs.extend(engine.pane_runs(self.rows, side, max(start - rows_start, 0), min(end, rows_end) - rows_start))
+        if end > rows_end:
+            for text, tag in self.footer[max(start - rows_end, 0):end - rows_end]:
+                runs.append((text + "\n", tag))
+        return runs
+
+    # --- Viewport ---
+
+    def visible_line_count(self):
+        """Number of lines that fit in the panes at their current height."""
+        text_widget = self.text_widgets[0]
+        if self._line_height is None:
+            self._line_height = tkfont.Font(font=text_widget.cget("font")).metrics("linespace")
+        return max(1, text_widget.winfo_height() // self._line_height)
+
+    def _materialize(self, top):
+        """Fill both textboxes with the window of lines around ``top``."""
+        visible = self.visible_line_count()
+        self.window_start = max(0, top - self.buffer_rows)
+        self.window_end = min(self.line_count, top + visible + self.buffer_rows)
+
+        for side, box in zip(("left", "right"), self.boxes):
+            box.configure(state="normal")
+            box.delete("1.0", "end")
+            bulk_insert(box, self._window_runs(side, self.window_start, self.window_end))
+            box.configure(state="disabled")
+        if self.intraline and self.aligned:
+            self._highlight_changed_spans()
+        self._place(top)
+
+    def _highlight_changed_spans(self, start=None, end=None):
+        """Tag the differing characters of the changed rows in the current window (or its lines ``start`` to ``end``)."""
+        rows_start = len(self.header)
+        first = max((self.window_start if start is None else start) - rows_start, 0)
+        last = min((self.window_end if end is None else end) - rows_start, len(self.rows))
+        left_ranges = []
+        right_ranges = []
+
+        for row_index, row in engine.changed_rows(self.rows, first, last):
+            text_line = rows_start + row_index - self.window_start + 1
+            left_spans, right_spans = engine.changed_spans(row.left_text, row.right_text)
+            left_offset = len(engine.format_line(row.left_num, "")) - 1
+            right_offset = len(engine.format_line(row.right_num, "")) - 1
+            for start, end in left_spans:
+                left_ranges.extend((f"{text_line}.{left_offset + start}", f"{text_line}.{left_offset + end}"))
+            for start, end in right_spans:
+                right_ranges.extend((f"{text_line}.{right_offset + start}", f"{text_line}.{right_offset + end}"))
+
+        # tk.Text.tag_add takes any number of index pairs in one call
+        for text_widget, ranges in zip(self.text_widgets, (left_ranges, right_ranges)):
+            if ranges:
+                text_widget.tag_add(CHANGED_SPAN_TAG, *ranges)
+
+    def set_intraline(self, enabled):
+        """Turn intra-line highlighting on or off and redraw the window."""
+        self.intraline = enabled
+        self._materialize(self.top)
+
+    def _place(self, top):
+        """Scroll both panes so that document line ``top`` is at the top."""
+        self.top = top
+        index = f"{top - self.window_start + 1}.0"
+        for text_widget in self.text_widgets:
+            text_widget.yview(index)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = self.line_count
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        visible = self.visible_line_count()
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+
+    def scroll_to(self, top):
+        """Show document line ``top`` at the top, re-materializing only if it left the window."""
+        visible = self.visible_line_count()
+        top = max(0, min(int(top), self.line_count - visible))
+        in_window = self.window_start <= top and (
+            top + visible <= self.window_end or self.window_end == self.line_count)
+        if in_window:
+            self._place(top)
+        else:
+            self._materialize(top)
+
+    def scroll(self, lines):
+        """Scroll both panes by a number of lines."""
+        self.scroll_to(self.top + lines)
+
+    def refresh(self):
+        """Re-window after the panes were resized."""
+        self.scroll_to(self.top)
+
+    # --- Tk callbacks ---
+
+    def on_scrollbar(self, action, amount, unit=None):
+        """Command for the shared scrollbar (``moveto`` / ``scroll`` protocol)."""
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.line_count)
+        elif unit == "pages":
+            self.scroll(int(amount) * self.visible_line_count())
+        else:
+            self.scroll(int(amount))
+
+    def _on_text_scrolled(self, first, last):
+        """Follow native scrolling inside a pane (keyboard, selection drags)."""
+        window_length = self.window_end - self.window_start
+        top = self.window_start + int(round(float(first) * window_length))
+        if top != self.top:
+            self.scroll_to(top)
@@ -0,0 +1,156 @@
+"""
+Watching the compared files for changes, for the live re-diff of watch mode.
+
+On Linux the watcher uses inotify (through ctypes, no extra package) on the
+directories of the watched files, so it also notices editors that save by
+writing a new file and renaming it over the old one. Where inotify is not
+available it polls the files' size and modification time instead.
+
+A change is only reported once a file's size, modification time or inode
+differs from what was last reported, and with inotify a burst of events
+(an editor writing a file in several chunks) is reported once, after a short
+quiet period.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+WATCHER_INOTIFY = "inotify"
+WATCHER_POLLING = "polling"
+
+# How often the polling watcher checks the files (and the inotify watcher
+# checks whether it was stopped)
+POLL_SECONDS = 0.5
+
+# Quiet period after the last inotify event before a change is reported
+SETTLE_SECONDS = 0.05
+
+# inotify flags and event masks (see linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+INOTIFY_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event header: wd, mask, cookie, len (followed by the name)
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def file_signature(path):
+    """``(size, mtime_ns, inode)`` of a file, or None if it does not exist (right now)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def load_inotify():
+    """The C library with the inotify functions, or None where inotify is not available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """
+    Calls ``on_change(paths)`` from a background thread whenever watched files change.
+
+    ``paths`` is the list of files that changed since the last call.
+    ``backend`` tells which mechanism ``start()`` picked (WATCHER_INOTIFY or
+    WATCHER_POLLING); ``use_inotify=False`` forces polling.
+    """
+
+    def __init__(self, paths, on_change, poll_seconds=POLL_SECONDS, use_inotify=True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.poll_seconds = poll_seconds
+        self.use_inotify = use_inotify
+        self.backend = None
+        self._signatures = {path: file_signature(path) for path in self.paths}
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start watching; returns the watcher."""
+        fd = self._open_inotify() if self.use_inotify else None
+        if fd is None:
+            self.backend = WATCHER_POLLING
+            target, args = self._poll, ()
+        else:
+            self.backend = WATCHER_INOTIFY
+            target, args = self._watch_inotify, (fd,)
+        threading.Thread(target=target, args=args, name="yamldiff-watcher", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop watching; the background thread exits within POLL_SECONDS."""
+        self._stopped.set()
+
+    def _report(self):
+        """Call ``on_change`` with the files whose signature changed since the last report."""
+        changed = []
+        for path in self.paths:
+            signature = file_signature(path)
+            # A missing file is usually an editor replacing it; wait for the new one
+            if signature is not None and signature != self._signatures[path]:
+                self._signatures[path] = signature
+                changed.append(path)
+        if changed and not self._stopped.is_set():
+            self.on_change(changed)
+
+    def _poll(self):
+        while not self._stopped.wait(self.poll_seconds):
+            self._report()
+
+    def _open_inotify(self):
+        """An inotify descriptor watching the directories of all paths, or None."""
+        libc = load_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+                os.close(fd)
+                return None
+        return fd
+
+    def _watch_inotify(self, fd):
+        names = {os.fsencode(os.path.basename(path)) for path in self.paths}
+        pending = False
+        try:
+            while not self._stopped.is_set():
+                ready, _, _ = select.select([fd], [], [], SETTLE_SECONDS if pending else self.poll_seconds)
+                if not ready:
+                    if pending:
+                        pending = False
+                        self._report()
+                    continue
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                offset = 0
+                while offset < len(data):
+                    _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                    offset += INOTIFY_EVENT.size
+                    if data[offset:offset + length].rstrip(b"\0") in names:
+                        pending = True
+                    offset += length
+        finally:
+            os.close(fd)
@@ -0,0 +1,99 @@
+"""
+Background execution of comparisons for the GUI.
+
+Diffs run on a worker thread so the Tk main loop keeps processing events.
+The worker never touches widgets: it queues callbacks that the GUI drains
+from an ``after()`` poll on the main thread. Starting a new job cancels and
+supersedes the running one.
+"""
+
+import queue
+import threading
+
+from yamldiff_engine import DiffCancelled
+
+
+class DiffJob:
+    """One submitted comparison and its cancellation flag."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+
+class DiffWorker:
+    """Runs one comparison at a time on a daemon thread."""
+
+    def __init__(self):
+        self._callbacks = queue.Queue()
+        self._job = None
+        self._next_id = 0
+
+    @property
+    def busy(self):
+        """True while a job is running and has not been cancelled."""
+        return self._job is not None and not self._job.cancelled
+
+    def submit(self, func, on_done, on_error, on_progress=None, on_partial=None):
+        """
+        Run ``func(progress)`` in the background, cancelling any running job.
+
+        ``func`` must pass ``progress`` on to the engine so that cancellation
+        is noticed between stages. With ``on_partial``, ``func`` is called as
+        ``func(progress, publish)`` and every ``publish(item)`` is delivered to
+        ``on_partial(item)`` while the job is still running. The ``on_*``
+        callbacks are invoked from ``drain()`` on the caller's thread, and
+        never for a superseded job.
+        """
+        self.cancel()
+        self._next_id += 1
+        job = DiffJob(self._next_id)
+        self._job = job
+
+        def progress(stage, fraction=None):
+            if job.cancelled:
+                raise DiffCancelled()
+            if on_progress is not None:
+                self._callbacks.put((job, on_progress, (stage, fraction), False))
+
+        def publish(item):
+            self._callbacks.put((job, on_partial, (item,), False))
+
+        def run():
+            try:
+                result = func(progress) if on_partial is None else func(progress, publish)
+            except DiffCancelled:
+                return
+            except Exception as e:
+                self._callbacks.put((job, on_error, (e,), True))
+            else:
+                self._callbacks.put((job, on_done, (result,), True))
+
+        threading.Thread(target=run, name=f"yamldiff-job-{job.job_id}", daemon=True).start()
+        return job
+
+    def cancel(self):
+        """Cancel the running job, if any; its pending callbacks are dropped."""
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+
+    def drain(self):
+        """Run queued callbacks for the current job; call this from the UI thread."""
+        while True:
+            try:
+                job, callback, args, final = self._callbacks.get_nowait()
+            except queue.Empty:
+                return
+            if job is not self._job or job.cancelled:
+                continue
+            if final:
+                self._job = None
+            callback(*args)